@@ -4,8 +4,9 @@ from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.jwt import decode_token, is_access
+from app.db.routing import ReadSessionLocal, pick_read_engine
 from app.db.session import get_session
-from app.repositories.user_repo import get_by_id
+from app.services import user_cache
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/auth/login")  # для Swagger
 
@@ -23,13 +24,22 @@ async def get_current_user(
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Access token required")
 
     user_id = int(payload["sub"])
-    user = await get_by_id(db, user_id)
+    user = await user_cache.get_user(db, user_id)
     if not user:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="User not found")
 
     request.state.user = user
     return user
 
+async def get_read_session(request: Request, current_user = Depends(get_current_user)):
+    """
+    Read-only сессия для GET-обработчиков: реплика, если она не отстаёт и пользователь
+    не писал сам в последние секунды; иначе primary (тоже READ ONLY).
+    """
+    bind = await pick_read_engine(current_user.id)
+    async with ReadSessionLocal(bind=bind) as session:
+        yield session
+
 def require_admin(current_user = Depends(get_current_user)):
     if getattr(current_user, "role", None) != "admin":
         # у нас role — Enum в моделях, но в объекте будет .role.value == 'admin'
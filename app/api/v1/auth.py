@@ -1,37 +1,34 @@
 from __future__ import annotations
-from datetime import timedelta
+from datetime import datetime, timezone
 from typing import Any
 
 from fastapi import APIRouter, Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.ext.asyncio import AsyncSession
-from redis.asyncio import Redis
 
 from app.api.deps import get_current_user
 from app.core.jwt import create_token, decode_token, is_refresh
-from app.core.security import hash_password, verify_password
-from app.core.settings import settings
+from app.core.security import hash_password_async, verify_password_async
 from app.db.session import get_session
 from app.repositories import user_repo
-from app.schemas.auth import TokenPair
+from app.services import refresh_sessions
+from app.schemas.auth import TokenPair, SessionRead
 from app.schemas.user import UserCreate, UserRead
 
 router = APIRouter()
 
-def _refresh_key(jti: str) -> str:
-    return f"refresh:{jti}"
-
-async def _store_refresh(redis: Redis, jti: str, user_id: int) -> None:
-    ttl = int(timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS).total_seconds())
-    await redis.set(_refresh_key(jti), str(user_id), ex=ttl)
-
-async def _consume_refresh(redis: Redis, jti: str) -> int | None:
-    # атомарно читаем и удаляем (rotation)
-    pipe = redis.pipeline()
-    pipe.get(_refresh_key(jti))
-    pipe.delete(_refresh_key(jti))
-    val, _ = await pipe.execute()
-    return int(val) if val is not None else None
+async def _authenticate(db: AsyncSession, email: str, password: str):
+    user = await user_repo.get_by_email(db, email)
+    if not user:
+        raise HTTPException(status_code=401, detail="Incorrect email or password")
+    ok, new_hash = await verify_password_async(password, user.password_hash)
+    if not ok:
+        raise HTTPException(status_code=401, detail="Incorrect email or password")
+    if new_hash:
+        # сменился cost-фактор — тихо перехэшируем пароль
+        await user_repo.set_password_hash(db, user, new_hash)
+        await db.commit()
+    return user
 
 @router.post("/register", response_model=UserRead, status_code=201)
 async def register(payload: UserCreate, db: AsyncSession = Depends(get_session)):
@@ -42,7 +39,7 @@ async def register(payload: UserCreate, db: AsyncSession = Depends(get_session))
     user = await user_repo.create(
         db,
         email=payload.email,
-        password_hash=hash_password(payload.password),
+        password_hash=await hash_password_async(payload.password),
         city=payload.city,
         country=payload.country,
         phone=payload.phone,
@@ -58,14 +55,12 @@ async def login(
     form: OAuth2PasswordRequestForm = Depends(),
     db: AsyncSession = Depends(get_session),
 ):
-    user = await user_repo.get_by_email(db, form.username)
-    if not user or not verify_password(form.password, user.password_hash):
-        raise HTTPException(status_code=401, detail="Incorrect email or password")
+    user = await _authenticate(db, form.username, form.password)
 
     access, _ = create_token(sub=str(user.id), type_="access", extra={"role": user.role.value})
     refresh, jti = create_token(sub=str(user.id), type_="refresh")
 
-    await _store_refresh(request.app.state.redis, jti, user.id)
+    await refresh_sessions.store(request.app.state.redis, jti, user.id)
 
     return TokenPair(access_token=access, refresh_token=refresh)
 
@@ -80,13 +75,11 @@ async def login_json(
     password = body.get("password")
     if not email or not password:
         raise HTTPException(status_code=400, detail="email and password required")
-    user = await user_repo.get_by_email(db, email)
-    if not user or not verify_password(password, user.password_hash):
-        raise HTTPException(status_code=401, detail="Incorrect email or password")
+    user = await _authenticate(db, email, password)
 
     access, _ = create_token(sub=str(user.id), type_="access", extra={"role": user.role.value})
     refresh, jti = create_token(sub=str(user.id), type_="refresh")
-    await _store_refresh(request.app.state.redis, jti, user.id)
+    await refresh_sessions.store(request.app.state.redis, jti, user.id)
     return TokenPair(access_token=access, refresh_token=refresh)
 
 @router.post("/refresh", response_model=TokenPair)
@@ -111,14 +104,12 @@ async def refresh_token(
     if not jti or not sub:
         raise HTTPException(status_code=401, detail="Malformed token")
 
-    # rotation: consume + issue new pair
-    user_id = await _consume_refresh(request.app.state.redis, jti)
-    if user_id is None or str(user_id) != str(sub):
+    # rotation: consume old jti + store new one — одним атомарным скриптом
+    new_refresh, new_jti = create_token(sub=sub, type_="refresh")
+    if not await refresh_sessions.rotate(request.app.state.redis, jti, new_jti, int(sub)):
         raise HTTPException(status_code=401, detail="Refresh token expired or already used")
 
     access, _ = create_token(sub=sub, type_="access")
-    new_refresh, new_jti = create_token(sub=sub, type_="refresh")
-    await _store_refresh(request.app.state.redis, new_jti, int(sub))
 
     return TokenPair(access_token=access, refresh_token=new_refresh)
 
@@ -129,8 +120,19 @@ async def logout(request: Request, body: dict[str, str]):
     if token:
         try:
             payload = decode_token(token)
-            if is_refresh(payload) and payload.get("jti"):
-                await request.app.state.redis.delete(_refresh_key(payload["jti"]))
+            if is_refresh(payload) and payload.get("jti") and payload.get("sub"):
+                await refresh_sessions.revoke(request.app.state.redis, payload["jti"], int(payload["sub"]))
         except Exception:
             pass
     return  # 204
+
+@router.post("/logout_all", status_code=204)
+async def logout_all(request: Request, current_user = Depends(get_current_user)):
+    # гасим все refresh-сессии пользователя (по индексу sessions:{user_id}, без SCAN)
+    await refresh_sessions.revoke_all(request.app.state.redis, current_user.id)
+    return  # 204
+
+@router.get("/sessions", response_model=list[SessionRead])
+async def list_sessions(request: Request, current_user = Depends(get_current_user)):
+    rows = await refresh_sessions.list_sessions(request.app.state.redis, current_user.id)
+    return [SessionRead(jti=jti, expires_at=datetime.fromtimestamp(exp, tz=timezone.utc)) for jti, exp in rows]
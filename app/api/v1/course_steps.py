@@ -1,16 +1,25 @@
 # app/api/v1/course_steps.py
-from fastapi import APIRouter, Depends, HTTPException
+from datetime import datetime, timezone
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import JSONResponse
+from pydantic import ValidationError
 from sqlalchemy.ext.asyncio import AsyncSession
-from app.api.deps import get_current_user, require_roles
+from app.api.deps import get_current_user, get_read_session, require_roles
+from app.core.settings import settings
 from app.db.session import get_session
-from app.repositories import course_step_repo, course_repo, course_step_progress_repo
-from app.schemas.steps import CourseStepCreate, CourseStepRead, StepCompletePayload
+from app.repositories import course_step_repo, course_repo, course_step_progress_repo, course_progress_repo
+from app.models.course_step import StepType
+from app.services import step_cache, pdf_slices
+from app.schemas.steps import (
+    CourseStepCreate, CourseStepRead, StepCompleteRequest, StepCompleteBatch, StepCompleteBatchResult, parse_metrics,
+)
 
 router = APIRouter()
 
 # админ: создать шаг
 @router.post("/courses/{course_id}/steps", response_model=CourseStepRead, dependencies=[Depends(require_roles("admin"))])
-async def create_step(course_id: int, payload: CourseStepCreate, db: AsyncSession = Depends(get_session)):
+async def create_step(course_id: int, payload: CourseStepCreate, request: Request, db: AsyncSession = Depends(get_session)):
     course = await course_repo.get(db, course_id)
     if not course:
         raise HTTPException(404, "Course not found")
@@ -25,13 +34,41 @@ async def create_step(course_id: int, payload: CourseStepCreate, db: AsyncSessio
         config=payload.config.model_dump(),
     )
     await db.commit()
+    await step_cache.bump_version(request.app.state.redis, course_id)  # каталог шагов курса изменился
     return obj
 
 # пользователь: получить шаги курса
 @router.get("/courses/{course_id}/steps", response_model=list[CourseStepRead])
-async def list_steps(course_id: int, db: AsyncSession = Depends(get_session), user=Depends(get_current_user)):
-    steps = await course_step_repo.list_by_course(db, course_id)
-    return steps
+async def list_steps(course_id: int, request: Request, db: AsyncSession = Depends(get_session), user=Depends(get_current_user)):
+    # готовый JSON из кэша — без повторной валидации config через StepConfig.
+    # Сессия — primary, не реплика: промах кэша сохраняет результат под текущей версией,
+    # и отстающая реплика закэшировала бы старый список шагов.
+    body = await step_cache.get_steps_json(db, request.app.state.redis, course_id)
+    return Response(content=body, media_type="application/json")
+
+# пользователь: PDF только со страницами reading-шага (срез режется один раз и кэшируется в S3)
+@router.get("/steps/{step_id}/pdf", response_model=dict)
+async def get_step_pdf(step_id: int, db: AsyncSession = Depends(get_read_session), user=Depends(get_current_user)):
+    found = await course_step_repo.get_with_course(db, step_id)
+    if not found or not found[1].is_public:
+        raise HTTPException(404, "Step not found")
+    step, course = found
+    if step.type != StepType.reading:
+        raise HTTPException(400, "Step has no page range")
+    start, end = int(step.config["start_page"]), int(step.config["end_page"])
+    if end < start:
+        raise HTTPException(400, "Invalid page range")
+    storage_key = step.config.get("storage_key") or course.storage_key
+    try:
+        link = await pdf_slices.get_link(storage_key, course.version, start, end,
+                                         filename=f"{course.slug}_v{course.version}_p{start}-{end}.pdf")
+    except pdf_slices.SliceOutOfRange as e:
+        raise HTTPException(416, str(e))
+    except pdf_slices.SlicePending:
+        # большой PDF: нарезка продолжается в фоне, клиент повторит запрос
+        return JSONResponse(status_code=202, content={"detail": "Slice is being prepared"},
+                            headers={"Retry-After": str(settings.PDF_SLICE_RETRY_AFTER_SECONDS)})
+    return {"url": link.url, "expires_in": link.expires_in, "start_page": start, "end_page": end}
 
 # пользователь: начать шаг
 @router.post("/steps/{step_id}/start", status_code=204)
@@ -41,10 +78,64 @@ async def start_step(step_id: int, db: AsyncSession = Depends(get_session), user
     await db.commit()
     return None
 
+def _parse_metrics(raw: dict, step_type: StepType, loc: tuple):
+    try:
+        return parse_metrics(raw, step_type.value)
+    except ValidationError as e:
+        # 422 в том же формате, что и ошибки тела запроса FastAPI
+        raise RequestValidationError([{**err, "loc": (*loc, *err["loc"][1:])} for err in e.errors()])
+
 # пользователь: завершить шаг с метриками
 @router.post("/steps/{step_id}/complete", status_code=204)
-async def complete_step(step_id: int, payload: StepCompletePayload, db: AsyncSession = Depends(get_session), user=Depends(get_current_user)):
-    # валидация payload.metrics уже сделана схемой
-    await course_step_progress_repo.complete(db, user.id, step_id, metrics=payload.metrics.model_dump())
+async def complete_step(step_id: int, payload: StepCompleteRequest, db: AsyncSession = Depends(get_session), user=Depends(get_current_user)):
+    step_type = (await course_step_repo.types_by_id(db, [step_id])).get(step_id)
+    if step_type is None:
+        raise HTTPException(404, "Step not found")
+    metrics = _parse_metrics(payload.metrics, step_type, ("body", "metrics"))
+    _, newly = await course_step_progress_repo.complete(db, user.id, step_id, metrics=metrics.model_dump())
+    if newly:
+        # счётчики прогресса курса — в той же транзакции
+        await course_progress_repo.add_completed_steps(db, user.id, [step_id])
     await db.commit()
     return None
+
+# пользователь: пачка завершений из офлайн-буфера — одна валидация, один апсерт, один коммит
+@router.post("/steps/complete:batch", response_model=list[StepCompleteBatchResult])
+async def complete_steps_batch(payload: StepCompleteBatch, db: AsyncSession = Depends(get_session), user=Depends(get_current_user)):
+    now = datetime.now(timezone.utc)
+    known = await course_step_repo.types_by_id(db, list({i.step_id for i in payload.items}))
+    # метрики типизируем по type шага; неизвестные шаги не валидируем — они уйдут как not_found
+    metrics = {
+        idx: _parse_metrics(item.metrics, known[item.step_id], ("body", "items", idx, "metrics"))
+        for idx, item in enumerate(payload.items) if item.step_id in known
+    }
+
+    # на шаг — одна запись (самая поздняя): ON CONFLICT не умеет обновлять строку дважды за запрос
+    latest: dict[int, tuple[int, datetime]] = {}
+    stamps: list[datetime] = []
+    for idx, item in enumerate(payload.items):
+        ts = item.completed_at or now
+        if ts.tzinfo is None:
+            ts = ts.replace(tzinfo=timezone.utc)
+        ts = min(ts, now)  # время из будущего не принимаем
+        stamps.append(ts)
+        if item.step_id in known and (item.step_id not in latest or ts >= latest[item.step_id][1]):
+            latest[item.step_id] = (idx, ts)
+
+    rows = [(step_id, ts, metrics[idx].model_dump()) for step_id, (idx, ts) in latest.items()]
+    written, newly = await course_step_progress_repo.complete_many(db, user.id, rows)
+    await course_progress_repo.add_completed_steps(db, user.id, newly)
+    await db.commit()
+
+    results = []
+    for idx, item in enumerate(payload.items):
+        if item.step_id not in known:
+            status = "not_found"
+        elif latest[item.step_id][0] != idx:
+            status = "duplicate"
+        elif item.step_id in written:
+            status = "applied"
+        else:
+            status = "stale"  # на сервере уже более позднее завершение
+        results.append(StepCompleteBatchResult(step_id=item.step_id, status=status))
+    return results
@@ -1,11 +1,21 @@
 from __future__ import annotations
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+import asyncio
+import secrets
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request, Response
+from fastapi.exceptions import RequestValidationError
+from pydantic import ValidationError
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
-from app.api.deps import get_current_user, require_roles
+from app.api.deps import get_current_user, get_read_session, require_roles
+from app.core.pagination import NEXT_CURSOR_HEADER, encode_cursor, decode_cursor
+from app.core.settings import settings
 from app.db.session import get_session
-from app.schemas.course import CourseCreate, CourseRead, CourseProgressRead, CourseProgressUpdate
+from app.schemas.course import (
+    CourseCreate, CourseRead, CourseProgressRead, CourseProgressUpdate, CourseDashboardItem, DashboardNextStep,
+)
 from app.repositories import course_repo, course_progress_repo
-from app.services import storage
+from app.services import storage, download_cache, progress_buffer, course_upload
+from app.tasks import pdf_ingest
 
 router = APIRouter()
 
@@ -22,17 +32,99 @@ async def create_course(payload: CourseCreate, db: AsyncSession = Depends(get_se
         raise HTTPException(status_code=409, detail="slug already exists")
     obj = await course_repo.create(db, **payload.model_dump())
     await db.commit(); await db.refresh(obj)
+    # страницы, текст и миниатюры — в фоне (app/tasks/pdf_ingest.py)
+    await pdf_ingest.enqueue(obj.id)
+    return obj
+
+# --- ADMIN: регистрация курса вместе с PDF одним запросом ---
+# Тело не буферизуется: файл частями уходит в S3 multipart upload, sha256 и число страниц считаются на лету.
+# Текстовые поля формы должны идти до файла (curl -F так и делает, см. make api-create-with-file).
+_CREATE_WITH_FILE_OPENAPI = {
+    "requestBody": {
+        "required": True,
+        "content": {"multipart/form-data": {"schema": {
+            "type": "object",
+            "required": ["slug", "title", "summary", "file"],
+            "properties": {
+                "slug": {"type": "string"},
+                "title": {"type": "string"},
+                "summary": {"type": "string"},
+                "version": {"type": "integer", "default": 1},
+                "is_public": {"type": "boolean", "default": True},
+                "file": {"type": "string", "format": "binary"},
+            },
+        }}},
+    }
+}
+
+@router.post("/create_with_file", response_model=CourseRead, status_code=201,
+             dependencies=[Depends(require_roles("admin"))], openapi_extra=_CREATE_WITH_FILE_OPENAPI)
+async def create_course_with_file(request: Request, db: AsyncSession = Depends(get_session)):
+    content_type = request.headers.get("content-type", "")
+    if not content_type.startswith("multipart/form-data"):
+        raise HTTPException(status_code=415, detail="multipart/form-data expected")
+
+    meta: CourseCreate | None = None
+
+    async def on_fields(fields: dict[str, str]) -> str:
+        # проверяем метаданные до того, как начнём лить файл в S3
+        nonlocal meta
+        try:
+            meta = CourseCreate(**{**fields, "storage_key": "-"})
+        except ValidationError as e:
+            raise RequestValidationError(e.errors())
+        exists = await course_repo.get_by_slug(db, meta.slug)
+        # короткая транзакция: не держим соединение idle in transaction, пока льётся файл (до сотен МБ)
+        await db.rollback()
+        if exists:
+            raise HTTPException(status_code=409, detail="slug already exists")
+        # суффикс — чтобы параллельная загрузка с тем же slug не перезаписала чужой объект
+        return f"courses/{meta.slug}_v{meta.version}-{secrets.token_hex(4)}.pdf"
+
+    try:
+        upload = await course_upload.stream_upload(request.stream(), content_type, on_fields=on_fields)
+    except course_upload.UploadError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+
+    # объект уже в S3: при любой ошибке дальше удаляем его, чтобы не оставлять сирот
+    try:
+        # только проверенные в on_fields поля — поля после файла stream_upload не принимает
+        payload = meta.model_copy(update={"storage_key": upload.key, "pdf_pages": upload.pages or meta.pdf_pages})
+        try:
+            obj = await course_repo.create(db, **payload.model_dump(), content_sha256=upload.sha256)
+            await db.commit()
+        except IntegrityError:
+            await db.rollback()
+            raise HTTPException(status_code=409, detail="slug already exists")
+    except BaseException:
+        await asyncio.to_thread(storage.delete_object, upload.key)
+        raise
+    await db.refresh(obj)
+    await pdf_ingest.enqueue(obj.id)
     return obj
 
 # --- AUTH: список/детали курса ---
 @router.get("", response_model=list[CourseRead])
-async def list_courses(limit: int = Query(50, ge=1, le=200), offset: int = Query(0, ge=0),
-                       db: AsyncSession = Depends(get_session),
+async def list_courses(response: Response,
+                       limit: int = Query(50, ge=1, le=200), offset: int = Query(0, ge=0),
+                       cursor: str | None = Query(None, description="keyset cursor from X-Next-Cursor header"),
+                       db: AsyncSession = Depends(get_read_session),
                        _=Depends(get_current_user)):
-    return await course_repo.list_public(db, limit=limit, offset=offset)
+    before_id = None
+    if cursor:
+        try:
+            before_id = int(decode_cursor(cursor)["id"])
+        except (ValueError, KeyError, TypeError):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+    # на одну строку больше: курсор отдаём, только если следующая страница не пустая
+    items = await course_repo.list_public(db, limit=limit + 1, offset=offset, before_id=before_id)
+    if len(items) > limit:
+        items = items[:limit]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor({"id": items[-1].id})
+    return items
 
 @router.get("/{course_id}", response_model=CourseRead)
-async def get_course(course_id: int, db: AsyncSession = Depends(get_session), _=Depends(get_current_user)):
+async def get_course(course_id: int, db: AsyncSession = Depends(get_read_session), _=Depends(get_current_user)):
     obj = await course_repo.get_by_id(db, course_id)
     if not obj or not obj.is_public:
         raise HTTPException(status_code=404, detail="Not found")
@@ -41,56 +133,112 @@ async def get_course(course_id: int, db: AsyncSession = Depends(get_session), _=
 # --- AUTH: скачать PDF (pre-signed) ---
 @router.get("/{course_id}/download", response_model=dict)
 async def download_course(course_id: int, user=Depends(get_current_user), db: AsyncSession = Depends(get_session)):
-    course = await course_repo.get(db, course_id)
-    if not course or (not course.is_public and not user):  # свои правила доступа
+    # ссылка кэшируется по (course_id, version) почти на весь срок жизни (15 минут минус запас)
+    link = await download_cache.get_link(db, course_id)
+    if not link or not user:  # свои правила доступа
         raise HTTPException(status_code=404, detail="Course not found")
-
-    url = storage.presign_get(
-        key=course.storage_key,
-        filename=f"{course.slug}_v{course.version}.pdf",
-        expires=900,  # 15 минут
-    )
-    return {"url": url, "expires_in": 900}
+    return {"url": link.url, "expires_in": link.expires_in}
 
 # --- AUTH: старт курса / мой прогресс ---
+def _progress_read(cp, buffered: dict | None = None) -> CourseProgressRead:
+    # buffered — ещё не сброшенные в БД значения из write-behind буфера (они свежее строки)
+    data = {"status": cp.status, "progress_percent": cp.progress_percent, "current_page": cp.current_page}
+    if buffered:
+        data["current_page"] = buffered["current_page"]
+        if cp.status != 2:  # завершение (по шагам) свежее паузы из буфера
+            data["status"] = buffered["status"]
+    return CourseProgressRead(course_id=cp.course_id, **data)
+
+async def _buffered(request: Request, user_id: int, course_id: int) -> dict | None:
+    if not settings.PROGRESS_WRITE_BEHIND:
+        return None
+    return await progress_buffer.read(request.app.state.redis, user_id, course_id)
+
 @router.post("/{course_id}/start", response_model=CourseProgressRead, status_code=201)
-async def start_course(course_id: int, db: AsyncSession = Depends(get_session), current_user = Depends(get_current_user)):
+async def start_course(course_id: int, request: Request, db: AsyncSession = Depends(get_session), current_user = Depends(get_current_user)):
     course = await course_repo.get_by_id(db, course_id)
     if not course or not course.is_public:
         raise HTTPException(status_code=404, detail="Not found")
 
     cp = await course_progress_repo.get(db, current_user.id, course_id)
     if cp:
-        return CourseProgressRead(course_id=course_id, status=cp.status, progress_percent=cp.progress_percent, current_page=cp.current_page)
+        return _progress_read(cp, await _buffered(request, current_user.id, course_id))
 
     cp = await course_progress_repo.create(db, current_user.id, course_id, course.version)
     await db.commit(); await db.refresh(cp)
-    return CourseProgressRead(course_id=course_id, status=cp.status, progress_percent=cp.progress_percent, current_page=cp.current_page)
+    return _progress_read(cp)
 
 @router.get("/{course_id}/progress", response_model=CourseProgressRead)
-async def get_my_progress(course_id: int, db: AsyncSession = Depends(get_session), current_user = Depends(get_current_user)):
+async def get_my_progress(course_id: int, request: Request, db: AsyncSession = Depends(get_session), current_user = Depends(get_current_user)):
     cp = await course_progress_repo.get(db, current_user.id, course_id)
     if not cp:
         raise HTTPException(status_code=404, detail="Not started")
-    return CourseProgressRead(course_id=course_id, status=cp.status, progress_percent=cp.progress_percent, current_page=cp.current_page)
+    return _progress_read(cp, await _buffered(request, current_user.id, course_id))
 
 @router.patch("/{course_id}/progress", response_model=CourseProgressRead)
-async def update_my_progress(course_id: int, payload: CourseProgressUpdate,
+async def update_my_progress(course_id: int, payload: CourseProgressUpdate, request: Request,
                              db: AsyncSession = Depends(get_session), current_user = Depends(get_current_user)):
+    # клиент двигает только страницу и паузу; progress_percent/«завершён» — из завершённых шагов
     cp = await course_progress_repo.get(db, current_user.id, course_id)
     if not cp:
         raise HTTPException(status_code=404, detail="Not started")
-    cp = await course_progress_repo.update_progress(
-        db, cp,
-        progress_percent=payload.progress_percent,
-        current_page=payload.current_page,
-        status=payload.status
-    )
+
+    if settings.PROGRESS_WRITE_BEHIND:
+        # листание страниц копим в Redis; строку в БД здесь только читаем
+        redis = request.app.state.redis
+        buffered = await progress_buffer.read(redis, current_user.id, course_id)
+        base_status = buffered["status"] if buffered else cp.status
+        new_status = base_status if payload.status is None or cp.status == 2 else payload.status
+        await progress_buffer.write(redis, current_user.id, course_id,
+                                    current_page=payload.current_page, status=new_status)
+        return _progress_read(cp, {"current_page": payload.current_page, "status": new_status})
+
+    cp = await course_progress_repo.update_progress(db, cp, current_page=payload.current_page, status=payload.status)
     await db.commit(); await db.refresh(cp)
-    return CourseProgressRead(course_id=course_id, status=cp.status, progress_percent=cp.progress_percent, current_page=cp.current_page)
+    return _progress_read(cp)
 
 # --- AUTH: список моих курсов c прогрессом ---
 @router.get("/me/list", response_model=list[CourseProgressRead])
-async def my_courses(db: AsyncSession = Depends(get_session), current_user = Depends(get_current_user)):
+async def my_courses(request: Request, db: AsyncSession = Depends(get_session), current_user = Depends(get_current_user)):
     rows = await course_progress_repo.list_for_user(db, current_user.id)
-    return [CourseProgressRead(course_id=r.course_id, status=r.status, progress_percent=r.progress_percent, current_page=r.current_page) for r in rows]
+    buffered = {}
+    if settings.PROGRESS_WRITE_BEHIND:
+        buffered = await progress_buffer.read_many(request.app.state.redis, current_user.id, [r.course_id for r in rows])
+    return [_progress_read(r, buffered.get(r.course_id)) for r in rows]
+
+# --- AUTH: главный экран — курсы + мой прогресс + следующий шаг, одним SQL-запросом ---
+@router.get("/me/dashboard", response_model=list[CourseDashboardItem])
+async def my_dashboard(request: Request, response: Response,
+                       limit: int = Query(50, ge=1, le=200),
+                       cursor: str | None = Query(None, description="keyset cursor from X-Next-Cursor header"),
+                       db: AsyncSession = Depends(get_session),
+                       current_user = Depends(get_current_user)):
+    before_id = None
+    if cursor:
+        try:
+            before_id = int(decode_cursor(cursor)["id"])
+        except (ValueError, KeyError, TypeError):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+    rows = await course_repo.dashboard(db, current_user.id, limit=limit, before_id=before_id)
+
+    buffered = {}
+    if settings.PROGRESS_WRITE_BEHIND:
+        started = [cp.course_id for _, cp, *_ in rows if cp is not None]
+        buffered = await progress_buffer.read_many(request.app.state.redis, current_user.id, started)
+
+    items = []
+    for course, cp, step_id, step_title, step_type, step_order in rows:
+        next_step = None
+        if step_id is not None:
+            next_step = DashboardNextStep(id=step_id, title=step_title, order_index=step_order,
+                                          type=getattr(step_type, "value", step_type))
+        items.append(CourseDashboardItem(
+            course=CourseRead.model_validate(course),
+            progress=_progress_read(cp, buffered.get(cp.course_id)) if cp is not None else None,
+            steps_count=course.steps_count,
+            completed_steps=cp.completed_steps if cp is not None else 0,
+            next_step=next_step,
+        ))
+    if len(rows) == limit:
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor({"id": rows[-1][0].id})
+    return items
@@ -1,9 +1,10 @@
 from __future__ import annotations
 from datetime import date
 from typing import Optional, List
-from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
 from sqlalchemy.ext.asyncio import AsyncSession
-from app.api.deps import get_current_user
+from app.api.deps import get_current_user, get_read_session
+from app.core.pagination import NEXT_CURSOR_HEADER, encode_cursor, decode_cursor
 from app.db.session import get_session
 from app.schemas.notebook import NotebookCreate, NotebookUpdate, NotebookRead
 from app.repositories import notebook_repo
@@ -20,25 +21,63 @@ def _ensure_self_or_admin(current_user: User, target_user_id: int) -> None:
 
 @router.get("", response_model=List[NotebookRead])
 async def list_entries(
+    response: Response,
     current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_session),
+    db: AsyncSession = Depends(get_read_session),
     user_id: Optional[int] = Query(None, description="admin only: user id to view"),
     limit: int = Query(50, ge=1, le=200),
     offset: int = Query(0, ge=0),
+    cursor: Optional[str] = Query(None, description="keyset cursor from X-Next-Cursor header"),
     date_from: Optional[date] = None,
     date_to: Optional[date] = None,
 ):
     target_user_id = user_id or current_user.id
     _ensure_self_or_admin(current_user, target_user_id)
-    items = await notebook_repo.list_for_user(db, target_user_id, limit=limit, offset=offset,
-                                              date_from=date_from, date_to=date_to)
+    before_date = None
+    if cursor:
+        try:
+            before_date = date.fromisoformat(decode_cursor(cursor)["d"])
+        except (ValueError, KeyError, TypeError):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+    # на одну строку больше: курсор отдаём, только если следующая страница не пустая
+    items = await notebook_repo.list_for_user(db, target_user_id, limit=limit + 1, offset=offset,
+                                              date_from=date_from, date_to=date_to, before_date=before_date)
+    if len(items) > limit:
+        items = items[:limit]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor({"d": items[-1].entry_date.isoformat()})
     return items
 
+# объявлен до /{entry_id}, иначе "search" попадёт в entry_id
+@router.get("/search", response_model=List[NotebookRead])
+async def search_entries(
+    response: Response,
+    q: str = Query(..., min_length=1, max_length=200),
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_session),
+    user_id: Optional[int] = Query(None, description="admin only: user id to search"),
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="keyset cursor from X-Next-Cursor header"),
+):
+    target_user_id = user_id or current_user.id
+    _ensure_self_or_admin(current_user, target_user_id)
+    after = None
+    if cursor:
+        try:
+            c = decode_cursor(cursor)
+            after = (float(c["r"]), int(c["id"]))
+        except (ValueError, KeyError, TypeError):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+    hits = await notebook_repo.search(db, target_user_id, q, limit=limit, after=after)
+    if len(hits) == limit:
+        entry, rank = hits[-1]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor({"r": rank, "id": entry.id})
+    return [entry for entry, _ in hits]
+
 @router.get("/{entry_id}", response_model=NotebookRead)
 async def get_entry(
     entry_id: int,
     current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_session),
+    db: AsyncSession = Depends(get_read_session),
 ):
     entry = await notebook_repo.get(db, entry_id)
     if not entry:
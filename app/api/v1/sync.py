@@ -0,0 +1,86 @@
+from __future__ import annotations
+from datetime import datetime, timedelta
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.api.deps import get_current_user
+from app.core.pagination import encode_cursor, decode_cursor
+from app.core.settings import settings
+from app.db.session import get_session
+from app.models.course_progress import CourseProgress
+from app.models.user import User
+from app.repositories import sync_repo
+from app.schemas.course import CourseProgressRead
+from app.schemas.sync import SyncResponse, StepProgressSync, SyncDeleted
+from app.services import progress_buffer
+
+router = APIRouter()
+
+# Дельта-синхронизация: всё, что изменилось у пользователя после watermark.
+# watermark = xmin снимка БД (см. sync_repo.watermark) и время его взятия. Строки помечены xid записавшей
+# транзакции (sync_xid): даже долгая транзакция, закоммиченная после ответа, попадёт в следующий.
+# Повторы безопасны — клиент делает upsert по id.
+
+def _parse_since(since: Optional[str]) -> Optional[tuple[int, datetime]]:
+    if not since:
+        return None
+    try:
+        data = decode_cursor(since)
+        ts = datetime.fromisoformat(data["t"])
+        xid = data.get("x")
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid watermark")
+    if xid is None:
+        # водяной знак по времени (до sync_xid) по строкам не сопоставить — только полная синхронизация
+        raise HTTPException(status_code=410, detail="Watermark expired, full sync required")
+    try:
+        return int(xid), ts
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid watermark")
+
+@router.get("", response_model=SyncResponse)
+async def sync(
+    request: Request,
+    since: Optional[str] = Query(None, description="watermark from the previous /sync response; omit for a full sync"),
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_session),
+):
+    parsed = _parse_since(since)
+    xmin, now = await sync_repo.watermark(db)  # до выборок
+    since_xid = None
+    if parsed is not None:
+        since_xid, since_ts = parsed
+        if since_ts < now - timedelta(days=settings.SYNC_TOMBSTONE_RETENTION_DAYS):
+            # tombstones старше уже вычищены — по дельте удаления не восстановить
+            raise HTTPException(status_code=410, detail="Watermark expired, full sync required")
+
+    uid = current_user.id
+    notebook = await sync_repo.notebook_changes(db, uid, since_xid)
+    progress = await sync_repo.course_progress_changes(db, uid, since_xid)
+    steps = await sync_repo.step_progress_changes(db, uid, since_xid)
+    deleted = await sync_repo.tombstones(db, uid, since_xid)
+
+    course_progress = {
+        cp.course_id: CourseProgressRead(course_id=cp.course_id, status=cp.status,
+                                         progress_percent=cp.progress_percent, current_page=cp.current_page)
+        for cp in progress
+    }
+    if settings.PROGRESS_WRITE_BEHIND:
+        # несброшенные страницы ещё не дошли до БД — отдаём их из буфера
+        res = await db.execute(select(CourseProgress.course_id).where(CourseProgress.user_id == uid))
+        buffered = await progress_buffer.read_many(request.app.state.redis, uid, list(res.scalars()))
+        for course_id, data in buffered.items():
+            course_progress[course_id] = CourseProgressRead(course_id=course_id, **data)
+
+    return SyncResponse(
+        watermark=encode_cursor({"x": xmin, "t": now.isoformat()}),
+        notebook=notebook,
+        course_progress=list(course_progress.values()),
+        step_progress=[
+            StepProgressSync(step_id=s.step_id, status=getattr(s.status, "value", s.status),
+                             started_at=s.started_at, completed_at=s.completed_at)
+            for s in steps
+        ],
+        deleted=[SyncDeleted(entity=t.entity, id=t.entity_id, deleted_at=t.deleted_at) for t in deleted],
+    )
@@ -1,10 +1,12 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.db.session import get_session
-from app.core.security import hash_password
+from app.core.security import hash_password_async
 from app.schemas.user import UserCreate, UserRead, UserUpdate
 from app.repositories import user_repo
-from app.api.deps import get_current_user
+from app.services import export, user_cache
+from app.api.deps import get_current_user, get_read_session
 
 router = APIRouter()
 
@@ -17,7 +19,7 @@ async def create_user(payload: UserCreate, db: AsyncSession = Depends(get_sessio
     user = await user_repo.create(
         db,
         email=payload.email,
-        password_hash=hash_password(payload.password),
+        password_hash=await hash_password_async(payload.password),
         city=payload.city,
         country=payload.country,
         phone=payload.phone,
@@ -36,7 +38,7 @@ def _ensure_self_or_admin(current_user, target_user_id: int):
 @router.get("", response_model=UserRead)
 async def get_user_by_email(
     email: str,
-    db: AsyncSession = Depends(get_session),
+    db: AsyncSession = Depends(get_read_session),
     current_user = Depends(get_current_user),
 ):
     user = await user_repo.get_by_email(db, email)
@@ -48,7 +50,7 @@ async def get_user_by_email(
 @router.get("/{user_id}", response_model=UserRead)
 async def get_user(
     user_id: int,
-    db: AsyncSession = Depends(get_session),
+    db: AsyncSession = Depends(get_read_session),
     current_user = Depends(get_current_user),
 ):
     user = await user_repo.get_by_id(db, user_id)
@@ -78,5 +80,25 @@ async def update_user(
         gender=payload.gender.value if payload.gender else None,
     )
     await db.commit()
+    # сбрасываем закэшированного принципала только после commit: иначе параллельный
+    # get_current_user успеет перечитать ещё старую строку и закэширует её на весь TTL
+    await user_cache.invalidate(user_id)
     await db.refresh(user)
     return user
+
+# выгрузка всех данных пользователя (дневник + прогресс) потоком; gzip — по Accept-Encoding
+@router.get("/{user_id}/export")
+async def export_user_data(
+    user_id: int,
+    request: Request,
+    fmt: str = Query("ndjson", alias="format", pattern="^(ndjson|csv)$"),
+    current_user = Depends(get_current_user),
+):
+    _ensure_self_or_admin(current_user, user_id)
+    use_gzip = export.accepts_gzip(request.headers.get("accept-encoding", ""))
+    headers = {"Content-Disposition": f'attachment; filename="user-{user_id}-export.{fmt}"',
+               "Cache-Control": "no-store", "Vary": "Accept-Encoding"}
+    if use_gzip:
+        headers["Content-Encoding"] = "gzip"
+    return StreamingResponse(export.stream_export(user_id, fmt, use_gzip=use_gzip),
+                             media_type=export.FORMATS[fmt], headers=headers)
@@ -1,10 +1,16 @@
 from __future__ import annotations
+import hashlib
+import time
 from datetime import datetime, timedelta, timezone
 from typing import Any, Literal, Tuple
 from uuid import uuid4
 
+import jwt as pyjwt
 from jose import jwt, JWTError
+from prometheus_client import Counter
 
+from app.core.cache import TTLCache
+from app.core.observability import REGISTRY
 from app.core.settings import settings
 
 TokenType = Literal["access", "refresh"]
@@ -41,7 +47,28 @@ def create_token(*, sub: str, type_: TokenType, extra: dict[str, Any] | None = N
     token = jwt.encode(payload, settings.JWT_SECRET, algorithm=settings.JWT_ALG)
     return token, jti
 
-def decode_token(token: str) -> dict[str, Any]:
+# Кэш уже проверенных access-токенов: клиент шлёт один и тот же токен до его exp,
+# так что парсинг + HMAC достаточно сделать один раз. Ключ — sha256 токена, живёт до exp.
+JWT_CACHE = Counter(
+    "jwt_decode_cache_total",
+    "Access token verification cache lookups",
+    ["result"],  # hit | miss
+    registry=REGISTRY,
+)
+
+_verified: TTLCache[dict[str, Any]] = TTLCache(
+    maxsize=settings.JWT_CACHE_MAXSIZE,
+    ttl=settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60,
+)
+
+def _decode(token: str) -> dict[str, Any]:
+    if settings.JWT_BACKEND == "pyjwt":
+        return pyjwt.decode(
+            token,
+            settings.JWT_SECRET,
+            algorithms=[settings.JWT_ALG],
+            audience=settings.APP_NAME,
+        )
     return jwt.decode(
         token,
         settings.JWT_SECRET,
@@ -50,6 +77,24 @@ def decode_token(token: str) -> dict[str, Any]:
         options={"verify_aud": True},
     )
 
+def decode_token(token: str) -> dict[str, Any]:
+    key = hashlib.sha256(token.encode()).digest()
+    payload = _verified.get(key)
+    if payload is not None:
+        if payload["exp"] > time.time():
+            JWT_CACHE.labels(result="hit").inc()
+            return dict(payload)
+        _verified.pop(key)
+
+    JWT_CACHE.labels(result="miss").inc()
+    payload = _decode(token)
+    # refresh-токены одноразовые — их не кэшируем
+    if is_access(payload) and "exp" in payload:
+        ttl = payload["exp"] - time.time()
+        if ttl > 0:
+            _verified.set(key, payload, ttl=ttl)
+    return dict(payload)
+
 def is_access(payload: dict[str, Any]) -> bool:
     return payload.get("type") == "access"
 
@@ -3,28 +3,69 @@ from __future__ import annotations
 import time
 import uuid
 import contextvars
-from typing import Callable, Awaitable
-from starlette.middleware.base import BaseHTTPMiddleware
+import os
+import re
+import threading
+from typing import Iterable, Pattern
+from starlette.datastructures import MutableHeaders
 from starlette.requests import Request
-from starlette.responses import Response, PlainTextResponse
+from starlette.responses import Response
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
 from prometheus_client import Counter, Histogram, CollectorRegistry, CONTENT_TYPE_LATEST, generate_latest
+from prometheus_client import multiprocess
+from prometheus_client import values as _prom_values
+
+from app.core.settings import settings
+
+# ---- Prometheus multiprocess ----
+# При нескольких воркерах uvicorn/gunicorn значения метрик пишутся в mmap-файлы в общем каталоге,
+# а /metrics агрегирует их по всем процессам. Включать до создания любых метрик.
+# Каталог очищается один раз при старте мастер-процесса (app/scripts/serve.py), не воркерами.
+MULTIPROC_DIR = settings.PROMETHEUS_MULTIPROC_DIR
+if MULTIPROC_DIR:
+    os.makedirs(MULTIPROC_DIR, exist_ok=True)
+    os.environ["PROMETHEUS_MULTIPROC_DIR"] = MULTIPROC_DIR
+    # класс значений выбирается при импорте prometheus_client (по env) — переключаем явно;
+    # метрики берут values.ValueClass в момент создания, поэтому достаточно сделать это до них
+    _prom_values.ValueClass = _prom_values.MultiProcessValue()
 
 # ---- Correlation ID ----
 request_id_ctx: contextvars.ContextVar[str] = contextvars.ContextVar("request_id", default="")
 
-class CorrelationIdMiddleware(BaseHTTPMiddleware):
+# Обе middleware — «чистый» ASGI: без BaseHTTPMiddleware (лишние таски и обёртка тела ответа,
+# ломает стриминг). Заголовки/статус перехватываем на http.response.start.
+class CorrelationIdMiddleware:
     header_name = "X-Request-ID"
 
-    async def dispatch(self, request: Request, call_next: Callable[[Request], Awaitable[Response]]) -> Response:
-        req_id = request.headers.get(self.header_name) or str(uuid.uuid4())
-        request_id_ctx.set(req_id)
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+        self._header_key = self.header_name.lower().encode("latin-1")
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        req_id = ""
+        for k, v in scope["headers"]:
+            if k == self._header_key:
+                req_id = v.decode("latin-1")
+                break
+        req_id = req_id or str(uuid.uuid4())
+        token = request_id_ctx.set(req_id)
         # прокинем в scope, чтобы логгеры/роуты могли достать
-        request.scope["request_id"] = req_id
+        scope["request_id"] = req_id
 
-        response = await call_next(request)
-        response.headers[self.header_name] = req_id
-        return response
+        async def send_with_id(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                MutableHeaders(scope=message)[self.header_name] = req_id
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            request_id_ctx.reset(token)
 
 def get_request_id() -> str:
     rid = request_id_ctx.get()
@@ -48,24 +89,155 @@ REQUEST_LATENCY = Histogram(
     registry=REGISTRY,
 )
 
-class PrometheusMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request: Request, call_next: Callable[[Request], Awaitable[Response]]) -> Response:
+REQUEST_TTFB = Histogram(
+    "http_request_ttfb_seconds",
+    "Time from request start to response start (headers sent), seconds",
+    ["method", "path", "status_code"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2, 5, 10),
+    registry=REGISTRY,
+)
+
+SERIES_OVERFLOW = Counter(
+    "http_metrics_series_overflow_total",
+    "Requests recorded under the __overflow__ label because the series budget was exhausted",
+    registry=REGISTRY,
+)
+
+UNMATCHED_PATH = "__unmatched__"
+OVERFLOW_PATH = "__overflow__"
+_KNOWN_METHODS = frozenset({"GET", "HEAD", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"})
+
+class RouteTemplateResolver:
+    """
+    Сопоставляет фактический путь с шаблоном маршрута. Таблица строится один раз из app.routes
+    при старте; всё, что не совпало ни с одним маршрутом, попадает в один бакет __unmatched__,
+    чтобы 404-сканеры не плодили серии метрик.
+    """
+
+    def __init__(self) -> None:
+        self._routes: list[tuple[Pattern[str], str]] = []
+
+    def build(self, routes: Iterable) -> None:
+        table = []
+        for r in routes:
+            regex = getattr(r, "path_regex", None)
+            template = getattr(r, "path_format", None) or getattr(r, "path", None)
+            if regex is not None and template:
+                table.append((regex, template))
+        self._routes = table
+
+    def resolve(self, path: str) -> str:
+        for regex, template in self._routes:
+            if regex.match(path):
+                return template
+        return UNMATCHED_PATH
+
+ROUTE_RESOLVER = RouteTemplateResolver()
+
+class _SeriesBudget:
+    # ограничивает число уникальных (method, path, status) наборов меток
+    def __init__(self, limit: int) -> None:
+        self.limit = limit
+        self._seen: set[tuple[str, str, str]] = set()
+        self._lock = threading.Lock()
+
+    def admit(self, key: tuple[str, str, str]) -> bool:
+        if key in self._seen:
+            return True
+        with self._lock:
+            if len(self._seen) >= self.limit:
+                return False
+            self._seen.add(key)
+            return True
+
+_series_budget = _SeriesBudget(settings.METRICS_MAX_SERIES)
+
+def _route_label(scope: Scope) -> str:
+    # роутер кладёт совпавший маршрут в scope; иначе (404/405 до роутинга) — предвычисленная таблица
+    route = scope.get("route")
+    if route is not None:
+        return route.path
+    return ROUTE_RESOLVER.resolve(scope["path"])
+
+class PrometheusMiddleware:
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
         start = time.perf_counter()
+        status = 500
+        ttfb: float | None = None
+
+        async def send_with_timing(message: Message) -> None:
+            nonlocal status, ttfb
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                ttfb = time.perf_counter() - start
+            await send(message)
+
         try:
-            response = await call_next(request)
-            status = response.status_code
-        except Exception:
-            status = 500
-            raise
+            await self.app(scope, receive, send_with_timing)
         finally:
+            # полное время — до последнего чанка тела (важно для стриминга)
             elapsed = time.perf_counter() - start
-            # стараемся получить шаблон маршрута, иначе фактический путь
-            path = request.scope.get("route").path if request.scope.get("route") else request.url.path
-            method = request.method
-            REQUEST_COUNT.labels(method=method, path=path, status_code=str(status)).inc()
-            REQUEST_LATENCY.labels(method=method, path=path, status_code=str(status)).observe(elapsed)
-        return response
+            method = scope["method"] if scope["method"] in _KNOWN_METHODS else "OTHER"
+            path = _route_label(scope)
+            if not _series_budget.admit((method, path, str(status))):
+                SERIES_OVERFLOW.inc()
+                path = OVERFLOW_PATH
+            labels = {"method": method, "path": path, "status_code": str(status)}
+            REQUEST_COUNT.labels(**labels).inc()
+            REQUEST_LATENCY.labels(**labels).observe(elapsed)
+            if ttfb is not None:
+                REQUEST_TTFB.labels(**labels).observe(ttfb)
+
+_DB_FILE_PID = re.compile(r"_(\d+)\.db$")
+_CLEANUP_INTERVAL_SECONDS = 30.0
+_last_cleanup = 0.0
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+def cleanup_dead_workers() -> None:
+    # live*-гейджи умерших воркеров удаляем; счётчики/гистограммы остаются (иначе «просядут» суммы)
+    if not MULTIPROC_DIR:
+        return
+    pids = set()
+    for name in os.listdir(MULTIPROC_DIR):
+        m = _DB_FILE_PID.search(name)
+        if m:
+            pids.add(int(m.group(1)))
+    for pid in pids:
+        if pid != os.getpid() and not _pid_alive(pid):
+            multiprocess.mark_process_dead(pid, MULTIPROC_DIR)
+
+def mark_current_process_dead() -> None:
+    if MULTIPROC_DIR:
+        multiprocess.mark_process_dead(os.getpid(), MULTIPROC_DIR)
+
+def _collect() -> bytes:
+    global _last_cleanup
+    if not MULTIPROC_DIR:
+        return generate_latest(REGISTRY)
+    now = time.monotonic()
+    if now - _last_cleanup >= _CLEANUP_INTERVAL_SECONDS:
+        _last_cleanup = now
+        cleanup_dead_workers()
+    # на каждый скрейп — свежий реестр, собирающий значения из файлов всех воркеров
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry, path=MULTIPROC_DIR)
+    return generate_latest(registry)
 
 async def metrics_endpoint(_: Request) -> Response:
-    data = generate_latest(REGISTRY)
+    data = _collect()
     return Response(content=data, media_type=CONTENT_TYPE_LATEST)
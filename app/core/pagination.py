@@ -0,0 +1,23 @@
+# app/core/pagination.py
+from __future__ import annotations
+import base64
+import json
+from typing import Any
+
+# Непрозрачные курсоры для keyset-пагинации: base64url(JSON) с ключом последней строки страницы.
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+def encode_cursor(data: dict[str, Any]) -> str:
+    raw = json.dumps(data, separators=(",", ":"), default=str).encode()
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+def decode_cursor(cursor: str) -> dict[str, Any]:
+    """Бросает ValueError на мусорном курсоре."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        data = json.loads(raw)
+    except Exception as e:
+        raise ValueError("invalid cursor") from e
+    if not isinstance(data, dict):
+        raise ValueError("invalid cursor")
+    return data
@@ -1,10 +1,104 @@
 from __future__ import annotations
+import asyncio
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+
 from passlib.context import CryptContext
+from prometheus_client import Counter, Gauge
+
+from app.core.observability import REGISTRY
+from app.core.settings import settings
 
-_pwd_ctx = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# min_rounds = max_rounds = default: хэши с любой другой стоимостью считаются устаревшими и перехэшируются
+# при логине — и после повышения BCRYPT_ROUNDS, и после его снижения (иначе логин остаётся дорогим)
+_pwd_ctx = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__default_rounds=settings.BCRYPT_ROUNDS,
+    bcrypt__min_rounds=settings.BCRYPT_ROUNDS,
+    bcrypt__max_rounds=settings.BCRYPT_ROUNDS,
+)
 
 def hash_password(password: str) -> str:
     return _pwd_ctx.hash(password)
 
 def verify_password(password: str, password_hash: str) -> bool:
     return _pwd_ctx.verify(password, password_hash)
+
+def verify_and_update(password: str, password_hash: str) -> tuple[bool, str | None]:
+    return _pwd_ctx.verify_and_update(password, password_hash)
+
+# ---- async-обёртки: bcrypt считается в ограниченном пуле ----
+class PasswordHasherBusy(Exception):
+    """Пул хэширования переполнен — запрос отклоняем сразу (503), а не копим очередь."""
+
+HASH_POOL_INFLIGHT = Gauge(
+    "password_hash_pool_inflight",
+    "Password hash/verify jobs running or queued",
+    multiprocess_mode="livesum",
+    registry=REGISTRY,
+)
+HASH_POOL_CAPACITY = Gauge(
+    "password_hash_pool_capacity",
+    "Max password hash/verify jobs (workers + queue)",
+    multiprocess_mode="livesum",
+    registry=REGISTRY,
+)
+HASH_POOL_REJECTED = Counter(
+    "password_hash_pool_rejected_total",
+    "Password hash/verify jobs rejected because the pool was saturated",
+    registry=REGISTRY,
+)
+PASSWORD_REHASHED = Counter(
+    "password_rehash_total",
+    "Password hashes upgraded on login",
+    registry=REGISTRY,
+)
+
+_capacity = settings.PASSWORD_HASH_WORKERS + settings.PASSWORD_HASH_QUEUE_SIZE
+_inflight = 0
+_executor: Executor | None = None
+HASH_POOL_CAPACITY.set(_capacity)
+
+def _get_executor() -> Executor:
+    global _executor
+    if _executor is None:
+        if settings.PASSWORD_HASH_EXECUTOR == "process":
+            _executor = ProcessPoolExecutor(max_workers=settings.PASSWORD_HASH_WORKERS)
+        else:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.PASSWORD_HASH_WORKERS, thread_name_prefix="pwd-hash"
+            )
+    return _executor
+
+def shutdown_executor() -> None:
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+async def _run(fn, *args):
+    global _inflight
+    if _inflight >= _capacity:
+        HASH_POOL_REJECTED.inc()
+        raise PasswordHasherBusy()
+    _inflight += 1
+    HASH_POOL_INFLIGHT.set(_inflight)
+    try:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_get_executor(), fn, *args)
+    finally:
+        _inflight -= 1
+        HASH_POOL_INFLIGHT.set(_inflight)
+
+async def hash_password_async(password: str) -> str:
+    return await _run(hash_password, password)
+
+async def verify_password_async(password: str, password_hash: str) -> tuple[bool, str | None]:
+    """
+    Возвращает (ok, new_hash). new_hash не None, если хэш устарел (например, поменяли BCRYPT_ROUNDS)
+    и его нужно сохранить вместо старого.
+    """
+    ok, new_hash = await _run(verify_and_update, password, password_hash)
+    if ok and new_hash:
+        PASSWORD_REHASHED.inc()
+    return ok, new_hash
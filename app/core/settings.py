@@ -18,6 +18,12 @@ class Settings(BaseSettings):
     DATABASE_PASSWORD: str = "mentor"
     DATABASE_NAME: str = "mentalmentor"
     DATABASE_URL: Optional[str] = None
+    # реплики для чтения (get_read_session); пусто — всё читается с primary
+    DATABASE_REPLICA_URLS: List[str] = []
+    READ_YOUR_WRITES_SECONDS: float = 5.0  # после своего commit пользователь читает с primary
+    REPLICA_MAX_LAG_SECONDS: float = 2.0
+    REPLICA_LAG_CHECK_INTERVAL_SECONDS: float = 1.0
+    REPLICA_LAG_CHECK_TIMEOUT_SECONDS: float = 0.5
 
     REDIS_HOST: str = "localhost"
     REDIS_PORT: int = 6379
@@ -28,9 +34,13 @@ class Settings(BaseSettings):
     JWT_ALG: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 15
     REFRESH_TOKEN_EXPIRE_DAYS: int = 30
+    JWT_BACKEND: str = "jose"  # jose | pyjwt (pyjwt заметно быстрее на decode)
+    JWT_CACHE_MAXSIZE: int = 50_000  # 0 — выключить кэш проверенных access-токенов
 
     CORS_ORIGINS: List[str] = []
     OTEL_EXPORTER_OTLP_ENDPOINT: Optional[AnyUrl] = None
+    METRICS_MAX_SERIES: int = 1000  # бюджет уникальных (method, path, status) в http-метриках
+    PROMETHEUS_MULTIPROC_DIR: Optional[str] = None  # задать при запуске с несколькими воркерами; чистится в app/scripts/serve.py
 
     model_config = SettingsConfigDict(env_file=".env", case_sensitive=False)
 
@@ -40,6 +50,59 @@ class Settings(BaseSettings):
     S3_ACCESS_KEY: str = "minioadmin"
     S3_SECRET_KEY: str = "minioadmin"
     S3_PUBLIC_ENDPOINT: str | None = None
+    S3_MAX_POOL_CONNECTIONS: int = 50
+    S3_CONNECT_TIMEOUT_SECONDS: float = 2.0
+    S3_READ_TIMEOUT_SECONDS: float = 10.0
+    S3_HEAD_TIMEOUT_SECONDS: float = 3.0
+    S3_MULTIPART_PART_SIZE: int = 8 * 1024 * 1024  # >= 5 МБ (минимум S3 для всех частей, кроме последней)
+    COURSE_UPLOAD_MAX_BYTES: int = 1024 * 1024 * 1024  # POST /courses/create_with_file
+
+    # фоновые задачи (Celery); брокер по умолчанию — тот же Redis
+    CELERY_BROKER_URL: Optional[str] = None
+    INGEST_RANGE_CHUNK_BYTES: int = 1024 * 1024  # размер ranged GET при чтении PDF из S3
+    INGEST_RANGE_CACHE_CHUNKS: int = 32  # сколько чанков держим в памяти воркера
+    INGEST_THUMBNAIL_WIDTH: int = 320
+    INGEST_LOCK_SECONDS: int = 900
+
+    # /health/ready: проверки параллельно, результат кэшируется и обновляется в фоне
+    HEALTH_CHECK_TIMEOUT_SECONDS: float = 2.0
+    HEALTH_CACHE_SECONDS: float = 5.0
+
+    # write-behind для PATCH /courses/{id}/progress: страницы копятся в Redis, в БД — пачками
+    PROGRESS_WRITE_BEHIND: bool = False
+    PROGRESS_FLUSH_INTERVAL_SECONDS: float = 5.0
+    PROGRESS_FLUSH_BATCH: int = 500
+    PROGRESS_BUFFER_TTL_SECONDS: int = 7 * 24 * 3600
+
+    # дельта-синхронизация GET /api/v1/sync
+    SYNC_TOMBSTONE_RETENTION_DAYS: int = 90  # watermark старше — клиенту нужна полная пересинхронизация
+
+    # кэш presigned-ссылок на скачивание курса
+    DOWNLOAD_URL_EXPIRES_SECONDS: int = 900
+    DOWNLOAD_URL_SAFETY_MARGIN_SECONDS: int = 120  # не отдаём ссылку, которой жить меньше этого
+    DOWNLOAD_URL_CACHE_MAXSIZE: int = 5_000
+
+    # срезы PDF reading-шагов (GET /course_steps/steps/{id}/pdf)
+    PDF_SLICE_WAIT_SECONDS: float = 10.0  # дольше нарезка идёт в фоне, клиенту — 202 и Retry-After
+    PDF_SLICE_RETRY_AFTER_SECONDS: int = 3
+    PDF_SLICE_SOURCE_TTL_SECONDS: int = 60  # сколько верим ETag исходника без HEAD
+
+    # кэш каталога шагов курса (готовый JSON): версия -> Redis -> in-process
+    STEP_CACHE_VERSION_TTL_SECONDS: float = 2.0  # как долго процесс верит своей копии версии
+    STEP_CACHE_LOCAL_TTL_SECONDS: float = 300.0
+    STEP_CACHE_LOCAL_MAXSIZE: int = 1_000
+    STEP_CACHE_REDIS_TTL_SECONDS: int = 86_400
+
+    # кэш текущего пользователя (get_current_user): in-process LRU -> Redis -> Postgres
+    USER_CACHE_LOCAL_TTL_SECONDS: float = 5.0
+    USER_CACHE_LOCAL_MAXSIZE: int = 10_000
+    USER_CACHE_REDIS_TTL_SECONDS: int = 60
+
+    # bcrypt: стоимость и пул, в котором считаются хэши (чтобы не блокировать event loop)
+    BCRYPT_ROUNDS: int = 12
+    PASSWORD_HASH_EXECUTOR: str = "thread"  # thread | process
+    PASSWORD_HASH_WORKERS: int = 4
+    PASSWORD_HASH_QUEUE_SIZE: int = 64  # сверх workers; при переполнении — 503
 
     @property
     def db_url(self) -> str:
@@ -53,7 +116,11 @@ class Settings(BaseSettings):
             return self.REDIS_URL
         return f"redis://{self.REDIS_HOST}:{self.REDIS_PORT}/{self.REDIS_DB}"
 
-    @field_validator('CORS_ORIGINS', mode='before')
+    @property
+    def celery_broker(self) -> str:
+        return self.CELERY_BROKER_URL or self.redis_dsn
+
+    @field_validator('CORS_ORIGINS', 'DATABASE_REPLICA_URLS', mode='before')
     @classmethod
     def split_cors(cls, v):
         if isinstance(v, str):
@@ -0,0 +1,154 @@
+# app/db/routing.py
+from __future__ import annotations
+import asyncio
+import itertools
+import time
+from typing import Optional
+
+from loguru import logger
+from prometheus_client import Counter, Gauge
+from redis.asyncio import Redis
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
+
+from app.core.cache import TTLCache
+from app.core.observability import REGISTRY
+from app.core.settings import settings
+from app.db.session import engine, register_after_commit
+
+# Маршрутизация чтений на реплики. Сессия из get_read_session идёт на реплику, если:
+#   - пользователь не коммитил сам в последние READ_YOUR_WRITES_SECONDS (иначе — primary,
+#     чтобы он увидел свою запись);
+#   - отставание реплики не больше REPLICA_MAX_LAG_SECONDS. Его раз в REPLICA_LAG_CHECK_INTERVAL_SECONDS
+#     меряет фоновая задача run_lag_probe (запускается в lifespan); запрос читает только закэшированное
+#     значение и сам к реплике за лагом не ходит.
+# Иначе — primary. Все read-сессии открывают транзакцию READ ONLY.
+
+DB_READ_ROUTE = Counter(
+    "db_read_route_total",
+    "Read-only sessions by routing decision",
+    ["target"],  # replica | primary_ryw | primary_lag | primary
+    registry=REGISTRY,
+)
+DB_REPLICA_LAG = Gauge(
+    "db_replica_lag_seconds",
+    "Last measured replica replay lag (-1 if the check failed)",
+    ["replica"],
+    multiprocess_mode="max",
+    registry=REGISTRY,
+)
+
+# на «тихом» primary pg_last_xact_replay_timestamp() стареет — если всё полученное уже применено, лаг 0.
+# На не-реплике функции возвращают NULL, получаем 0.
+_LAG_SQL = text("""
+SELECT CASE
+    WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+    ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+END
+""")
+
+class _Replica:
+    def __init__(self, idx: int, url: str):
+        self.name = str(idx)
+        self.engine: AsyncEngine = create_async_engine(url, pool_pre_ping=True)
+        self.readonly = self.engine.execution_options(postgresql_readonly=True)
+        self.lag: Optional[float] = None  # None — неизвестно / недоступна
+        self.checked_at = 0.0
+
+    async def refresh_lag(self) -> None:
+        try:
+            # таймаут покрывает и установку соединения: зависший TCP-connect к реплике
+            # не должен задерживать следующий круг проверок дольше REPLICA_LAG_CHECK_TIMEOUT_SECONDS
+            async with asyncio.timeout(settings.REPLICA_LAG_CHECK_TIMEOUT_SECONDS):
+                async with self.engine.connect() as conn:
+                    lag = await conn.scalar(_LAG_SQL)
+            self.lag = float(lag or 0)
+        except TimeoutError:
+            logger.warning("replica {} lag check timed out", self.name)
+            self.lag = None
+        except Exception as e:
+            logger.warning("replica {} lag check failed: {}", self.name, e)
+            self.lag = None
+        self.checked_at = time.monotonic()
+        DB_REPLICA_LAG.labels(replica=self.name).set(-1 if self.lag is None else self.lag)
+
+    def usable(self) -> bool:
+        # замер старше двух интервалов (проба встала или ещё не запускалась) — лаг неизвестен
+        if time.monotonic() - self.checked_at > 2 * settings.REPLICA_LAG_CHECK_INTERVAL_SECONDS:
+            return False
+        return self.lag is not None and self.lag <= settings.REPLICA_MAX_LAG_SECONDS
+
+_replicas = [_Replica(i, url) for i, url in enumerate(settings.DATABASE_REPLICA_URLS)]
+_rr = itertools.count()
+_primary_readonly = engine.execution_options(postgresql_readonly=True)
+
+# ---- read-your-writes: «пользователь недавно коммитил» ----
+_recent_writes: TTLCache[bool] = TTLCache(maxsize=100_000, ttl=settings.READ_YOUR_WRITES_SECONDS)
+_redis: Redis | None = None
+
+def bind_redis(redis: Redis | None) -> None:
+    # метка в Redis видна всем воркерам; без Redis — только локальная
+    global _redis
+    _redis = redis
+
+def _ryw_key(user_id: int) -> str:
+    return f"db:ryw:{user_id}"
+
+async def mark_write(user_id: int) -> None:
+    _recent_writes.set(user_id, True)
+    if _redis is not None:
+        try:
+            await _redis.set(_ryw_key(user_id), 1, px=int(settings.READ_YOUR_WRITES_SECONDS * 1000))
+        except Exception:
+            pass
+
+async def recently_wrote(user_id: int) -> bool:
+    if _recent_writes.get(user_id):
+        return True
+    if _redis is not None:
+        try:
+            return bool(await _redis.exists(_ryw_key(user_id)))
+        except Exception:
+            return True  # не знаем — безопаснее читать с primary
+    return False
+
+async def _after_commit(session: AsyncSession) -> None:
+    request = session.info.get("request")
+    user = getattr(request.state, "user", None) if request is not None else None
+    if user is not None:
+        await mark_write(user.id)
+
+if _replicas:
+    register_after_commit(_after_commit)
+
+async def pick_read_engine(user_id: Optional[int]) -> AsyncEngine:
+    if not _replicas:
+        return _primary_readonly
+    if user_id is not None and await recently_wrote(user_id):
+        DB_READ_ROUTE.labels(target="primary_ryw").inc()
+        return _primary_readonly
+    start = next(_rr)
+    for i in range(len(_replicas)):
+        replica = _replicas[(start + i) % len(_replicas)]
+        if replica.usable():
+            DB_READ_ROUTE.labels(target="replica").inc()
+            return replica.readonly
+    DB_READ_ROUTE.labels(target="primary_lag").inc()
+    return _primary_readonly
+
+async def run_lag_probe() -> None:
+    # фоновая задача lifespan: реплики проверяются параллельно, каждая — не дольше таймаута
+    if not _replicas:
+        return
+    while True:
+        try:
+            await asyncio.gather(*(replica.refresh_lag() for replica in _replicas))
+        except Exception:
+            logger.exception("replica lag probe failed")
+        await asyncio.sleep(settings.REPLICA_LAG_CHECK_INTERVAL_SECONDS)
+
+ReadSessionLocal = async_sessionmaker(expire_on_commit=False, autoflush=False, class_=AsyncSession)
+
+async def dispose() -> None:
+    for replica in _replicas:
+        await replica.engine.dispose()
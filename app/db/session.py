@@ -1,9 +1,30 @@
+from typing import Awaitable, Callable, ClassVar
+
+from fastapi import Request
 from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
 from app.core.settings import settings
 
+AfterCommitHook = Callable[[AsyncSession], Awaitable[None]]
+
+class TrackedSession(AsyncSession):
+    """AsyncSession с хуками после commit (например, окно read-your-writes в app/db/routing.py)."""
+    # общий для всех сессий реестр; пополняется только через register_after_commit
+    after_commit_hooks: ClassVar[list[AfterCommitHook]] = []
+
+    async def commit(self) -> None:
+        await super().commit()
+        for hook in self.after_commit_hooks:
+            await hook(self)
+
+def register_after_commit(hook: AfterCommitHook) -> None:
+    """Регистрирует хук, вызываемый после каждого успешного commit; повторная регистрация игнорируется."""
+    if hook not in TrackedSession.after_commit_hooks:
+        TrackedSession.after_commit_hooks.append(hook)
+
 engine: AsyncEngine = create_async_engine(settings.db_url, pool_pre_ping=True)
-AsyncSessionLocal = async_sessionmaker(bind=engine, expire_on_commit=False, autoflush=False, class_=AsyncSession)
+AsyncSessionLocal = async_sessionmaker(bind=engine, expire_on_commit=False, autoflush=False, class_=TrackedSession)
 
-async def get_session() -> AsyncSession:
+async def get_session(request: Request) -> AsyncSession:
     async with AsyncSessionLocal() as session:
+        session.info["request"] = request
         yield session
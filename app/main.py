@@ -1,19 +1,50 @@
 # app/main.py
-from contextlib import asynccontextmanager
-from fastapi import FastAPI
+import asyncio
+from contextlib import asynccontextmanager, suppress
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
 from redis.asyncio import Redis
 from starlette.middleware.cors import CORSMiddleware
 
 from app.core.settings import settings
-from app.api.v1 import health, user, auth, notebook, courses, course_steps
-from app.core.observability import PrometheusMiddleware, CorrelationIdMiddleware, metrics_endpoint
+from app.api.v1 import health, user, auth, notebook, courses, course_steps, sync
+from app.core.observability import PrometheusMiddleware, CorrelationIdMiddleware, metrics_endpoint, ROUTE_RESOLVER, mark_current_process_dead
+from app.core.security import PasswordHasherBusy, shutdown_executor
+from app.db import routing
+from app.services import user_cache, progress_buffer, download_cache
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     app.state.redis = Redis.from_url(settings.redis_dsn, encoding="utf-8", decode_responses=True)
+    user_cache.bind_redis(app.state.redis)
+    routing.bind_redis(app.state.redis)
+    download_cache.bind_redis(app.state.redis)
+    lag_probe = asyncio.create_task(routing.run_lag_probe())
+    user_invalidations = asyncio.create_task(user_cache.run_invalidation_listener(app.state.redis))
+    flusher = None
+    if settings.PROGRESS_WRITE_BEHIND:
+        flusher = asyncio.create_task(progress_buffer.run_flusher(app.state.redis))
     yield
+    if flusher is not None:
+        flusher.cancel()
+        with suppress(asyncio.CancelledError):
+            await flusher
+    for task in (lag_probe, user_invalidations):
+        task.cancel()
+        with suppress(asyncio.CancelledError):
+            await task
+    user_cache.bind_redis(None)
+    routing.bind_redis(None)
+    download_cache.bind_redis(None)
+    await routing.dispose()
+    shutdown_executor()
+    mark_current_process_dead()
     await app.state.redis.close()
 
+async def _hasher_busy_handler(request: Request, exc: PasswordHasherBusy) -> JSONResponse:
+    # пул bcrypt переполнен — быстро отказываем, клиент повторит позже
+    return JSONResponse(status_code=503, content={"detail": "Service busy, retry later"}, headers={"Retry-After": "1"})
+
 def create_app() -> FastAPI:
     app = FastAPI(
         title=settings.APP_NAME,
@@ -22,6 +53,8 @@ def create_app() -> FastAPI:
         lifespan=lifespan,
     )
 
+    app.add_exception_handler(PasswordHasherBusy, _hasher_busy_handler)
+
     # middlewares: сначала correlation-id, затем метрики
     app.add_middleware(CorrelationIdMiddleware)
     app.add_middleware(PrometheusMiddleware)
@@ -31,7 +64,7 @@ def create_app() -> FastAPI:
         allow_credentials=False,
         allow_methods=["GET", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"],
         allow_headers=["*"],
-        expose_headers=["Content-Disposition"],
+        expose_headers=["Content-Disposition", "X-Next-Cursor"],
         max_age=600,
     )
     # routes
@@ -42,8 +75,11 @@ def create_app() -> FastAPI:
     app.include_router(notebook.router, prefix="/api/v1/notebook", tags=["notebook"])
     app.include_router(courses.router, prefix="/api/v1/courses", tags=["courses"])
     app.include_router(course_steps.router, prefix="/api/v1/course_steps", tags=["courses"])
+    app.include_router(sync.router, prefix="/api/v1/sync", tags=["sync"])
     # /metrics без аутентификации — так принято для Prometheus; если нужно — вынесем за ingress
     app.add_api_route("/metrics", metrics_endpoint, methods=["GET"], include_in_schema=False)
+    # таблица шаблонов маршрутов для меток метрик — после регистрации всех роутов
+    ROUTE_RESOLVER.build(app.routes)
 
     return app
 
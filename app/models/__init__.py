@@ -5,4 +5,6 @@ from app.models.notebook_entry import NotebookEntry
 from app.models.course_step import CourseStep, StepType
 from app.models.course_step_progress import CourseStepProgress, StepStatus
 from app.models.course_progress import CourseProgress
-__all__ = ["User", "Courses", "Enrollment", "NotebookEntry", "CourseStep", "CourseStepProgress", "StepType", "StepStatus", "CourseProgress"]
+from app.models.sync_tombstone import SyncTombstone
+from app.models.course_page import CoursePage
+__all__ = ["User", "Courses", "Enrollment", "NotebookEntry", "CourseStep", "CourseStepProgress", "StepType", "StepStatus", "CourseProgress", "SyncTombstone", "CoursePage"]
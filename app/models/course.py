@@ -1,5 +1,5 @@
 from __future__ import annotations
-from sqlalchemy import String, Text, Boolean, Integer
+from sqlalchemy import String, Text, Boolean, Integer, Index
 from sqlalchemy.orm import Mapped, mapped_column
 from app.models.base import Base
 from app.models.mixins import TimestampMixin
@@ -7,6 +7,10 @@ from sqlalchemy.orm import relationship
 
 class Courses(TimestampMixin, Base):
     __tablename__ = "courses"
+    __table_args__ = (
+        # keyset-пагинация list_public: WHERE is_public ORDER BY id DESC
+        Index("ix_courses_public_id", "is_public", "id"),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
     slug: Mapped[str] = mapped_column(String(128), unique=True, index=True, nullable=False)
@@ -16,6 +20,11 @@ class Courses(TimestampMixin, Base):
     # PDF-хранение
     storage_key: Mapped[str] = mapped_column(String(512), unique=True, nullable=False)  # e.g. "courses/intro_v1.pdf"
     pdf_pages: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    content_sha256: Mapped[str | None] = mapped_column(String(64), nullable=True)  # hex, считается при загрузке
+    # ETag объекта, по которому уже построены course_pages (повторный ingestion того же файла — no-op)
+    pdf_ingested_etag: Mapped[str | None] = mapped_column(String(128), nullable=True)
+    # число шагов курса — поддерживается при create_step, знаменатель для progress_percent
+    steps_count: Mapped[int] = mapped_column(Integer, default=0, server_default="0", nullable=False)
 
     # версии/видимость
     version: Mapped[int] = mapped_column(Integer, default=1, nullable=False)
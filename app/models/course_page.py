@@ -0,0 +1,16 @@
+from __future__ import annotations
+from sqlalchemy import ForeignKey, Integer, String, Text, UniqueConstraint
+from sqlalchemy.orm import Mapped, mapped_column
+from app.models.base import Base
+from app.models.mixins import TimestampMixin
+
+class CoursePage(TimestampMixin, Base):
+    # производные PDF курса (заполняет воркер app/tasks/pdf_ingest.py)
+    __tablename__ = "course_pages"
+    __table_args__ = (UniqueConstraint("course_id", "page_no", name="uq_course_page"),)
+
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
+    course_id: Mapped[int] = mapped_column(ForeignKey("courses.id", ondelete="CASCADE"), nullable=False)
+    page_no: Mapped[int] = mapped_column(Integer, nullable=False)  # с 1
+    text: Mapped[str] = mapped_column(Text, nullable=False, default="")
+    thumbnail_key: Mapped[str | None] = mapped_column(String(512), nullable=True)
@@ -1,13 +1,16 @@
 from __future__ import annotations
 from datetime import datetime
-from sqlalchemy import ForeignKey, SmallInteger, UniqueConstraint, Integer
+from sqlalchemy import BigInteger, ForeignKey, SmallInteger, UniqueConstraint, Integer, Index
 from sqlalchemy.orm import Mapped, mapped_column
 from app.models.base import Base
-from app.models.mixins import TimestampMixin
+from app.models.mixins import SyncXidMixin, TimestampMixin
 
-class CourseProgress(TimestampMixin, Base):
+class CourseProgress(TimestampMixin, SyncXidMixin, Base):
     __tablename__ = "course_progress"
-    __table_args__ = (UniqueConstraint("user_id", "course_id", name="uq_progress_user_course"),)
+    __table_args__ = (
+        UniqueConstraint("user_id", "course_id", name="uq_progress_user_course"),
+        Index("ix_course_progress_user_sync", "user_id", "sync_xid"),  # дельта-синхронизация
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
     user_id: Mapped[int] = mapped_column(ForeignKey("users.id", ondelete="CASCADE"), index=True, nullable=False)
@@ -16,6 +19,10 @@ class CourseProgress(TimestampMixin, Base):
     status: Mapped[int] = mapped_column(SmallInteger, default=0, nullable=False)  # 0=in_progress, 1=paused, 2=completed
     progress_percent: Mapped[int] = mapped_column(SmallInteger, default=0, nullable=False)  # 0..100
     current_page: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    completed_steps: Mapped[int] = mapped_column(Integer, default=0, server_default="0", nullable=False)  # инкрементально при завершении шагов
     started_at: Mapped[datetime | None] = mapped_column(nullable=True)
     completed_at: Mapped[datetime | None] = mapped_column(nullable=True)
     course_version: Mapped[int] = mapped_column(Integer, default=1, nullable=False)  # на момент старта
+    # номер последней применённой записи прогресса (общий счётчик в Redis, см. services/progress_buffer):
+    # запись с меньшим номером — устаревшая и строку не перетирает
+    progress_seq: Mapped[int] = mapped_column(BigInteger, default=0, server_default="0", nullable=False)
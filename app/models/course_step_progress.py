@@ -1,17 +1,18 @@
 # app/models/course_step_progress.py
 from __future__ import annotations
 import enum
-from sqlalchemy import ForeignKey, Enum, Integer, JSON, DateTime, UniqueConstraint
+from sqlalchemy import ForeignKey, Enum, Integer, JSON, DateTime, UniqueConstraint, Index, func
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from datetime import datetime
 from app.models.base import Base
+from app.models.mixins import SyncXidMixin
 
 class StepStatus(str, enum.Enum):
     not_started = "not_started"
     in_progress = "in_progress"
     completed   = "completed"
 
-class CourseStepProgress(Base):
+class CourseStepProgress(SyncXidMixin, Base):
     __tablename__ = "course_step_progress"
 
     id: Mapped[int] = mapped_column(primary_key=True)
@@ -21,6 +22,10 @@ class CourseStepProgress(Base):
     status: Mapped[StepStatus] = mapped_column(Enum(StepStatus, name="course_step_status"), default=StepStatus.not_started)
     started_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True))
     completed_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True))
+    # апсерты ON CONFLICT проставляют его явно (onupdate там не срабатывает)
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False
+    )
 
     # метрики выполнения (зависят от типа шага): фактическое время, ответы, счёт, заметки, и т.п.
     metrics: Mapped[dict] = mapped_column(JSON, default=dict)
@@ -28,4 +33,5 @@ class CourseStepProgress(Base):
     step = relationship("CourseStep")
     __table_args__ = (
         UniqueConstraint("user_id", "step_id", name="uq_user_step"),
+        Index("ix_course_step_progress_user_sync", "user_id", "sync_xid"),  # дельта-синхронизация
     )
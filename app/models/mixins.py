@@ -1,6 +1,6 @@
 from __future__ import annotations
 from datetime import datetime
-from sqlalchemy import DateTime, func
+from sqlalchemy import BigInteger, DateTime, Text, cast, func, text
 from sqlalchemy.orm import Mapped, mapped_column
 
 class TimestampMixin:
@@ -10,3 +10,17 @@ class TimestampMixin:
     updated_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False
     )
+
+# id транзакции (xid8 как bigint), последней записавшей строку, — водяной знак дельта-синхронизации.
+# В отличие от now() он сравним со снимком: строку, которую снимок не видит, писала транзакция
+# с xid >= pg_snapshot_xmin(снимка), сколько бы она ни шла до commit.
+CURRENT_XID_SQL = "pg_current_xact_id()::text::bigint"
+
+def current_xid():
+    return cast(cast(func.pg_current_xact_id(), Text), BigInteger)
+
+class SyncXidMixin:
+    # апсерты ON CONFLICT и сырой SQL проставляют его явно (onupdate там не срабатывает)
+    sync_xid: Mapped[int] = mapped_column(
+        BigInteger, server_default=text(CURRENT_XID_SQL), onupdate=current_xid(), nullable=False
+    )
@@ -1,20 +1,27 @@
 from __future__ import annotations
 from datetime import date
 import enum
-from sqlalchemy import String, Text, Enum as SAEnum, UniqueConstraint, ForeignKey, Date
+from sqlalchemy import String, Text, Enum as SAEnum, UniqueConstraint, ForeignKey, Date, Index, Computed
+from sqlalchemy.dialects.postgresql import TSVECTOR
 from sqlalchemy.orm import Mapped, mapped_column
 from app.models.base import Base
-from app.models.mixins import TimestampMixin
+from app.models.mixins import SyncXidMixin, TimestampMixin
+
+# конфигурация полнотекстового поиска: должна совпадать в сгенерированной колонке и в запросах
+SEARCH_CONFIG = "russian"
 
 class MoodEnum(str, enum.Enum):
     good = "good"
     ok   = "ok"
     bad  = "bad"
 
-class NotebookEntry(TimestampMixin, Base):
+class NotebookEntry(TimestampMixin, SyncXidMixin, Base):
     __tablename__ = "notebook_entries"
     __table_args__ = (
         UniqueConstraint("user_id", "entry_date", name="uq_notebook_user_date"),
+        Index("ix_notebook_entries_user_sync", "user_id", "sync_xid"),  # дельта-синхронизация
+        # поиск в рамках пользователя: GIN по (user_id, search_vector), нужен btree_gin
+        Index("ix_notebook_entries_user_search", "user_id", "search_vector", postgresql_using="gin"),
     )
 
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
@@ -25,3 +32,14 @@ class NotebookEntry(TimestampMixin, Base):
 
     title: Mapped[str | None] = mapped_column(String(200), nullable=True)
     content: Mapped[str | None] = mapped_column(Text, nullable=True)
+
+    # title весит больше content; колонку считает Postgres, в обычные SELECT не попадает (deferred)
+    search_vector: Mapped[str | None] = mapped_column(
+        TSVECTOR,
+        Computed(
+            f"setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(title, '')), 'A') || "
+            f"setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(content, '')), 'B')",
+            persisted=True,
+        ),
+        deferred=True,
+    )
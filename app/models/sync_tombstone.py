@@ -0,0 +1,19 @@
+from __future__ import annotations
+from datetime import datetime
+from sqlalchemy import BigInteger, DateTime, ForeignKey, Index, Integer, String, func
+from sqlalchemy.orm import Mapped, mapped_column
+from app.models.base import Base
+from app.models.mixins import SyncXidMixin
+
+class SyncTombstone(SyncXidMixin, Base):
+    # «надгробия» удалённых строк для дельта-синхронизации (GET /api/v1/sync)
+    __tablename__ = "sync_tombstones"
+    __table_args__ = (
+        Index("ix_sync_tombstones_user_sync", "user_id", "sync_xid"),
+    )
+
+    id: Mapped[int] = mapped_column(BigInteger, primary_key=True, autoincrement=True)
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    entity: Mapped[str] = mapped_column(String(32), nullable=False)  # "notebook"
+    entity_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    deleted_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now(), nullable=False)
@@ -0,0 +1,30 @@
+from __future__ import annotations
+from typing import Sequence
+from sqlalchemy import select, delete, func
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models.course_page import CoursePage
+
+# 4 параметра на страницу, у asyncpg предел — 32767 параметров на запрос: вставляем пачками
+_PAGES_PER_INSERT = 1000
+
+async def list_for_course(db: AsyncSession, course_id: int) -> Sequence[CoursePage]:
+    res = await db.execute(select(CoursePage).where(CoursePage.course_id == course_id).order_by(CoursePage.page_no))
+    return res.scalars().all()
+
+async def replace_pages(db: AsyncSession, course_id: int, rows: list[tuple[int, str, str | None]]) -> None:
+    """
+    rows: (page_no, text, thumbnail_key). Апсерт по (course_id, page_no) + удаление страниц сверх len(rows)
+    (файл заменили более коротким) — повторный прогон даёт тот же результат.
+    """
+    for i in range(0, len(rows), _PAGES_PER_INSERT):
+        stmt = insert(CoursePage).values([
+            dict(course_id=course_id, page_no=no, text=text, thumbnail_key=thumb)
+            for no, text, thumb in rows[i:i + _PAGES_PER_INSERT]
+        ])
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[CoursePage.course_id, CoursePage.page_no],
+            set_={"text": stmt.excluded.text, "thumbnail_key": stmt.excluded.thumbnail_key, "updated_at": func.now()},
+        )
+        await db.execute(stmt)
+    await db.execute(delete(CoursePage).where(CoursePage.course_id == course_id, CoursePage.page_no > len(rows)))
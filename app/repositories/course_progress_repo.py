@@ -1,9 +1,12 @@
 from __future__ import annotations
 from datetime import datetime
 from typing import Optional, Sequence
-from sqlalchemy import select, and_
+from typing import Iterable
+from sqlalchemy import select, and_, case, func, update, values, column, Integer, BigInteger, SmallInteger
+from sqlalchemy import bindparam, text
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.models.course_progress import CourseProgress
+from app.models.mixins import CURRENT_XID_SQL, current_xid
 
 async def get(db: AsyncSession, user_id: int, course_id: int) -> Optional[CourseProgress]:
     res = await db.execute(select(CourseProgress).where(and_(
@@ -15,17 +18,159 @@ async def create(db: AsyncSession, user_id: int, course_id: int, course_version:
     db.add(obj); await db.flush()
     return obj
 
-async def update_progress(db: AsyncSession, obj: CourseProgress, *, progress_percent: int, current_page: int, status: int | None):
-    obj.progress_percent = progress_percent
+# progress_percent, «завершён» (status=2) и completed_at выводятся только из completed_steps
+# (add_completed_steps / recompute_for_course). Клиент двигает страницу и ставит/снимает паузу (0/1).
+async def update_progress(db: AsyncSession, obj: CourseProgress, *, current_page: int, status: int | None):
     obj.current_page = current_page
-    if status is not None:
+    if status is not None and obj.status != 2:
         obj.status = status
-    if progress_percent >= 100 and obj.completed_at is None:
-        obj.completed_at = datetime.utcnow()
-        obj.status = 2
     await db.flush()
     return obj
 
 async def list_for_user(db: AsyncSession, user_id: int):
     res = await db.execute(select(CourseProgress).where(CourseProgress.user_id == user_id))
     return res.scalars().all()
+
+async def bulk_update_progress(db: AsyncSession, rows: list[tuple[int, int, int, int, int]]) -> None:
+    """
+    rows: (user_id, course_id, current_page, status, seq).
+    Один UPDATE ... FROM (VALUES ...) на всю пачку. Порядок записей — по seq (монотонный счётчик,
+    а не часы): строку, в которую уже применена запись с номером не меньше, не перетираем.
+    updated_at и sync_xid проставляются явно, как в остальных апсертах (на sync_xid держатся водяные знаки /sync).
+    Завершённый курс (status=2) паузой не перетираем; progress_percent здесь не пишется вовсе.
+    """
+    if not rows:
+        return
+    v = values(
+        column("user_id", BigInteger),
+        column("course_id", Integer),
+        column("current_page", Integer),
+        column("status", SmallInteger),
+        column("seq", BigInteger),
+        name="v",
+    ).data(rows)
+    await db.execute(
+        update(CourseProgress)
+        .where(
+            CourseProgress.user_id == v.c.user_id,
+            CourseProgress.course_id == v.c.course_id,
+            CourseProgress.progress_seq < v.c.seq,
+        )
+        .values(
+            current_page=v.c.current_page,
+            status=case((CourseProgress.status == 2, CourseProgress.status), else_=v.c.status),
+            progress_seq=v.c.seq,
+            updated_at=func.now(),
+            sync_xid=current_xid(),
+        )
+        .execution_options(synchronize_session=False)
+    )
+
+# Инкремент счётчиков по курсам впервые завершённых шагов. Всё — одним INSERT ... ON CONFLICT;
+# total берём из courses.steps_count (поддерживается при create_step).
+_ADD_COMPLETED_STEPS = text("""
+INSERT INTO course_progress (user_id, course_id, course_version, started_at, current_page,
+                             completed_steps, progress_percent, status, completed_at)
+SELECT :user_id, c.id, c.version, now(), 0, count(*),
+       COALESCE(LEAST(100, count(*) * 100 / NULLIF(c.steps_count, 0)), 0),
+       CASE WHEN count(*) >= c.steps_count THEN 2 ELSE 0 END,
+       CASE WHEN count(*) >= c.steps_count THEN now() END
+FROM course_steps s
+JOIN courses c ON c.id = s.course_id
+WHERE s.id IN :step_ids
+GROUP BY c.id, c.version, c.steps_count
+ON CONFLICT (user_id, course_id) DO UPDATE SET
+    completed_steps = course_progress.completed_steps + excluded.completed_steps,
+    progress_percent = COALESCE(LEAST(100,
+        (course_progress.completed_steps + excluded.completed_steps) * 100
+        / NULLIF((SELECT steps_count FROM courses WHERE id = excluded.course_id), 0)), 0),
+    status = CASE
+        WHEN course_progress.completed_steps + excluded.completed_steps
+             >= (SELECT steps_count FROM courses WHERE id = excluded.course_id) THEN 2
+        ELSE course_progress.status END,
+    completed_at = CASE
+        WHEN course_progress.completed_at IS NULL
+             AND course_progress.completed_steps + excluded.completed_steps
+                 >= (SELECT steps_count FROM courses WHERE id = excluded.course_id) THEN now()
+        ELSE course_progress.completed_at END,
+    updated_at = now(),
+    sync_xid = """ + CURRENT_XID_SQL + """
+""").bindparams(bindparam("step_ids", expanding=True))
+
+async def add_completed_steps(db: AsyncSession, user_id: int, step_ids: Iterable[int]) -> None:
+    """
+    Инкрементально учитывает впервые завершённые шаги в course_progress (в той же транзакции):
+    completed_steps += n по каждому курсу, progress_percent/completed_at/status выводятся из счётчика.
+    Если курс ещё не «стартован», строка прогресса создаётся.
+    """
+    step_ids = list(step_ids)
+    if not step_ids:
+        return
+    await db.execute(_ADD_COMPLETED_STEPS, {"user_id": user_id, "step_ids": step_ids})
+
+# Полный пересчёт счётчиков по существующим данным (одноразово после миграции / при расхождениях)
+_BACKFILL_STEPS_COUNT = text("""
+UPDATE courses c
+SET steps_count = COALESCE(s.n, 0)
+FROM courses c2
+LEFT JOIN (SELECT course_id, count(*) AS n FROM course_steps GROUP BY course_id) s ON s.course_id = c2.id
+WHERE c.id = c2.id AND c.steps_count IS DISTINCT FROM COALESCE(s.n, 0)
+""")
+
+# completed_steps по фактическим завершениям: у кого их нет — 0 (в том числе у строк, где раньше был
+# процент «по страницам»); строки прогресса для завершений без старта курса создаются
+_BACKFILL_COMPLETED_STEPS = text("""
+INSERT INTO course_progress (user_id, course_id, course_version, started_at, current_page,
+                             completed_steps, progress_percent, status)
+SELECT p.user_id, c.id, c.version, min(p.started_at), 0, count(*), 0, 0
+FROM course_step_progress p
+JOIN course_steps s ON s.id = p.step_id
+JOIN courses c ON c.id = s.course_id
+WHERE p.status = 'completed'
+GROUP BY p.user_id, c.id, c.version
+ON CONFLICT (user_id, course_id) DO UPDATE SET completed_steps = excluded.completed_steps
+""")
+
+_BACKFILL_ZERO_COMPLETED = text("""
+UPDATE course_progress cp
+SET completed_steps = 0
+WHERE cp.completed_steps <> 0
+  AND NOT EXISTS (
+      SELECT 1 FROM course_step_progress p
+      JOIN course_steps s ON s.id = p.step_id
+      WHERE p.user_id = cp.user_id AND s.course_id = cp.course_id AND p.status = 'completed')
+""")
+
+# progress_percent/status/completed_at из completed_steps и steps_count — для одного курса (после
+# изменения числа шагов) или для всех (:course_id IS NULL). Пауза (status=1) у незавершённых сохраняется.
+# Трогаем только строки, где что-то меняется, чтобы не сдвигать sync_xid (водяные знаки /sync).
+_RECOMPUTE_PROGRESS = text("""
+UPDATE course_progress cp
+SET progress_percent = d.percent,
+    status = CASE WHEN d.done THEN 2 WHEN cp.status = 2 THEN 0 ELSE cp.status END,
+    completed_at = CASE WHEN d.done THEN COALESCE(cp.completed_at, now()) END,
+    updated_at = now(),
+    sync_xid = """ + CURRENT_XID_SQL + """
+FROM (
+    SELECT cp2.id,
+           COALESCE(LEAST(100, cp2.completed_steps * 100 / NULLIF(c.steps_count, 0)), 0) AS percent,
+           c.steps_count > 0 AND cp2.completed_steps >= c.steps_count AS done
+    FROM course_progress cp2
+    JOIN courses c ON c.id = cp2.course_id
+    WHERE CAST(:course_id AS integer) IS NULL OR cp2.course_id = CAST(:course_id AS integer)
+) d
+WHERE cp.id = d.id
+  AND (cp.progress_percent IS DISTINCT FROM d.percent
+       OR (cp.status = 2) IS DISTINCT FROM d.done
+       OR (cp.completed_at IS NULL) = d.done)
+""")
+
+async def recompute_for_course(db: AsyncSession, course_id: int) -> None:
+    """Пересчитать прогресс всех пользователей курса — вызывать в транзакции, изменившей steps_count."""
+    await db.execute(_RECOMPUTE_PROGRESS, {"course_id": course_id})
+
+async def backfill_step_counters(db: AsyncSession) -> None:
+    await db.execute(_BACKFILL_STEPS_COUNT)
+    await db.execute(_BACKFILL_COMPLETED_STEPS)
+    await db.execute(_BACKFILL_ZERO_COMPLETED)
+    await db.execute(_RECOMPUTE_PROGRESS, {"course_id": None})
@@ -1,8 +1,11 @@
 from __future__ import annotations
 from typing import Optional, Sequence
-from sqlalchemy import select
+from sqlalchemy import select, and_, exists, true, update
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.models.course import Courses
+from app.models.course_progress import CourseProgress
+from app.models.course_step import CourseStep
+from app.models.course_step_progress import CourseStepProgress, StepStatus
 
 async def create(db: AsyncSession, **data) -> Courses:
     obj = Courses(**data)
@@ -16,10 +19,62 @@ async def get(db: AsyncSession, course_id: int) -> Courses | None:
 async def get_by_id(db: AsyncSession, course_id: int) -> Optional[Courses]:
     return await db.get(Courses, course_id)
 
+async def get_version(db: AsyncSession, course_id: int) -> Optional[int]:
+    res = await db.execute(select(Courses.version).where(Courses.id == course_id))
+    return res.scalar_one_or_none()
+
 async def get_by_slug(db: AsyncSession, slug: str) -> Optional[Courses]:
     res = await db.execute(select(Courses).where(Courses.slug == slug))
     return res.scalar_one_or_none()
 
-async def list_public(db: AsyncSession, limit: int = 50, offset: int = 0) -> Sequence[Courses]:
-    res = await db.execute(select(Courses).where(Courses.is_public == True).order_by(Courses.id.desc()).limit(limit).offset(offset))
+async def list_public(db: AsyncSession, limit: int = 50, offset: int = 0, *, before_id: Optional[int] = None) -> Sequence[Courses]:
+    # before_id — keyset-режим (id последнего курса предыдущей страницы), offset тогда не нужен
+    stmt = select(Courses).where(Courses.is_public == True)
+    if before_id is not None:
+        stmt = stmt.where(Courses.id < before_id)
+    else:
+        stmt = stmt.offset(offset)
+    res = await db.execute(stmt.order_by(Courses.id.desc()).limit(limit))
+    return res.scalars().all()
+
+async def mark_ingested(db: AsyncSession, course_id: int, *, storage_key: str, etag: str, pdf_pages: int) -> bool:
+    # только если за время обработки курс не перепривязали к другому файлу
+    res = await db.execute(
+        update(Courses)
+        .where(Courses.id == course_id, Courses.storage_key == storage_key)
+        .values(pdf_pages=pdf_pages, pdf_ingested_etag=etag)
+    )
+    return res.rowcount > 0
+
+async def list_not_ingested_ids(db: AsyncSession) -> Sequence[int]:
+    res = await db.execute(select(Courses.id).where(Courses.pdf_ingested_etag.is_(None)).order_by(Courses.id))
     return res.scalars().all()
+
+async def dashboard(db: AsyncSession, user_id: int, limit: int = 50, *, before_id: Optional[int] = None):
+    """
+    Главный экран одним запросом: публичные курсы + прогресс пользователя (LEFT JOIN)
+    + первый по order_index незавершённый шаг (LEFT JOIN LATERAL ... LIMIT 1).
+    Строки: (Courses, CourseProgress | None, next_step_id, next_step_title, next_step_type, next_step_order).
+    """
+    done = exists().where(
+        CourseStepProgress.step_id == CourseStep.id,
+        CourseStepProgress.user_id == user_id,
+        CourseStepProgress.status == StepStatus.completed,
+    )
+    next_step = (
+        select(CourseStep.id, CourseStep.title, CourseStep.type, CourseStep.order_index)
+        .where(CourseStep.course_id == Courses.id, ~done)
+        .order_by(CourseStep.order_index)
+        .limit(1)
+        .lateral("next_step")
+    )
+    stmt = (
+        select(Courses, CourseProgress, next_step.c.id, next_step.c.title, next_step.c.type, next_step.c.order_index)
+        .outerjoin(CourseProgress, and_(CourseProgress.course_id == Courses.id, CourseProgress.user_id == user_id))
+        .outerjoin(next_step, true())
+        .where(Courses.is_public.is_(True))
+    )
+    if before_id is not None:
+        stmt = stmt.where(Courses.id < before_id)
+    res = await db.execute(stmt.order_by(Courses.id.desc()).limit(limit))
+    return res.all()
@@ -1,8 +1,11 @@
 # app/repositories/course_step_progress_repo.py
-from sqlalchemy import select
+from sqlalchemy import select, case, exists, func, literal, or_, union_all, update
+from sqlalchemy.orm import aliased
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import datetime, timezone
 from app.models.course_step_progress import CourseStepProgress, StepStatus
+from app.models.mixins import current_xid
 
 async def get(db: AsyncSession, user_id: int, step_id: int) -> CourseStepProgress | None:
     q = select(CourseStepProgress).where(
@@ -12,31 +15,107 @@ async def get(db: AsyncSession, user_id: int, step_id: int) -> CourseStepProgres
     res = await db.execute(q)
     return res.scalar_one_or_none()
 
+# Оба апсерта — один INSERT ... ON CONFLICT (user_id, step_id) DO UPDATE ... RETURNING:
+# один round trip и никаких гонок в uq_user_step при «двойном тапе».
 async def upsert_start(db: AsyncSession, user_id: int, step_id: int) -> CourseStepProgress:
-    row = await get(db, user_id, step_id)
     now = datetime.now(timezone.utc)
-    if not row:
-        row = CourseStepProgress(user_id=user_id, step_id=step_id, status=StepStatus.in_progress, started_at=now, metrics={})
-        db.add(row)
-    else:
-        if row.status == StepStatus.not_started:
-            row.status = StepStatus.in_progress
-            row.started_at = now
-    await db.flush()
-    return row
+    stmt = insert(CourseStepProgress).values(
+        user_id=user_id, step_id=step_id, status=StepStatus.in_progress, started_at=now, metrics={},
+    )
+    # not_started -> in_progress; completed/in_progress не трогаем; started_at — исходный, если был
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[CourseStepProgress.user_id, CourseStepProgress.step_id],
+        set_={
+            "status": case(
+                (CourseStepProgress.status == StepStatus.not_started, stmt.excluded.status),
+                else_=CourseStepProgress.status,
+            ),
+            "started_at": func.coalesce(CourseStepProgress.started_at, stmt.excluded.started_at),
+            "updated_at": func.now(),
+            "sync_xid": current_xid(),
+        },
+    ).returning(CourseStepProgress)
+    res = await db.execute(stmt, execution_options={"populate_existing": True})
+    return res.scalar_one()
+
+def _completion_upsert(user_id: int, items: list[tuple[int, datetime, dict]], where):
+    rows = [
+        dict(user_id=user_id, step_id=step_id, status=StepStatus.completed,
+             started_at=completed_at, completed_at=completed_at, metrics=metrics)
+        for step_id, completed_at, metrics in items
+    ]
+    # одна строка — обычный VALUES (с RETURNING сущности), несколько — multi-values INSERT
+    stmt = insert(CourseStepProgress).values(rows[0] if len(rows) == 1 else rows)
+    return stmt.on_conflict_do_update(
+        index_elements=[CourseStepProgress.user_id, CourseStepProgress.step_id],
+        set_={
+            "status": stmt.excluded.status,
+            "started_at": func.coalesce(CourseStepProgress.started_at, stmt.excluded.started_at),
+            "completed_at": stmt.excluded.completed_at,
+            "metrics": stmt.excluded.metrics,
+            "updated_at": func.now(),
+            "sync_xid": current_xid(),
+        },
+        where=where(stmt),
+    )
+
+# «Первое» завершение шага отличаем от повторного прямо в апсерте: DO UPDATE ... WHERE status <> completed
+# держит блокировку строки, так что при гонке шаг засчитается в счётчики курса ровно один раз.
+def _not_completed(stmt):
+    return CourseStepProgress.status != StepStatus.completed
 
-async def complete(db: AsyncSession, user_id: int, step_id: int, metrics: dict) -> CourseStepProgress:
-    row = await get(db, user_id, step_id)
+def _not_older(stmt):
+    return or_(
+        CourseStepProgress.completed_at.is_(None),
+        stmt.excluded.completed_at >= CourseStepProgress.completed_at,
+    )
+
+async def complete(db: AsyncSession, user_id: int, step_id: int, metrics: dict) -> tuple[CourseStepProgress, bool]:
+    """Возвращает (строка, newly_completed)."""
     now = datetime.now(timezone.utc)
-    if not row:
-        row = CourseStepProgress(user_id=user_id, step_id=step_id, status=StepStatus.completed, started_at=now, completed_at=now, metrics=metrics)
-        db.add(row)
-    else:
-        row.status = StepStatus.completed
-        if not row.started_at:
-            row.started_at = now
-        row.completed_at = now
-        row.metrics = metrics
-    await db.flush()
-    return row
-    
\ No newline at end of file
+    items = [(step_id, now, metrics)]
+    columns = CourseStepProgress.__table__.c
+    # Один запрос: апсерт с WHERE status <> completed делает переход (или вставку) и держит блокировку строки;
+    # если он ничего не вернул, шаг уже был завершён — тот же запрос обновляет время и метрики
+    first = _completion_upsert(user_id, items, _not_completed).returning(*columns).cte("first")
+    again = (
+        update(CourseStepProgress)
+        .where(
+            CourseStepProgress.user_id == user_id,
+            CourseStepProgress.step_id == step_id,
+            ~exists(select(first.c.id)),
+        )
+        .values(completed_at=now, metrics=metrics, updated_at=func.now(), sync_xid=current_xid())
+        .returning(*columns)
+        .cte("again")
+    )
+    both = union_all(
+        select(first, literal(True).label("newly")),
+        select(again, literal(False).label("newly")),
+    ).subquery()
+    stmt = select(aliased(CourseStepProgress, both), both.c.newly)
+    found = (await db.execute(stmt, execution_options={"populate_existing": True})).one_or_none()
+    if found is not None:
+        return found[0], found[1]
+    # гонка первых вставок: чужая строка закоммичена после нашего снимка, UPDATE её не видит —
+    # дописываем безусловным апсертом; переход уже засчитан другим запросом
+    stmt = _completion_upsert(user_id, items, lambda _: None).returning(CourseStepProgress)
+    row = (await db.execute(stmt, execution_options={"populate_existing": True})).scalar_one()
+    return row, False
+
+async def complete_many(db: AsyncSession, user_id: int, items: list[tuple[int, datetime, dict]]) -> tuple[set[int], set[int]]:
+    """
+    Многострочный апсерт завершений (step_id, completed_at, metrics). step_id в items должны быть уникальны.
+    Запись с completed_at старше уже сохранённого не перетирает его.
+    Возвращает (записанные step_id, впервые завершённые step_id).
+    """
+    if not items:
+        return set(), set()
+    res = await db.execute(_completion_upsert(user_id, items, _not_completed).returning(CourseStepProgress.step_id))
+    newly = set(res.scalars())
+    rest = [i for i in items if i[0] not in newly]
+    written = set(newly)
+    if rest:
+        res = await db.execute(_completion_upsert(user_id, rest, _not_older).returning(CourseStepProgress.step_id))
+        written |= set(res.scalars())
+    return written, newly
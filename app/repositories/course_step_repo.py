@@ -1,14 +1,29 @@
 # app/repositories/course_step_repo.py
-from sqlalchemy import select
+from sqlalchemy import select, update
 from sqlalchemy.ext.asyncio import AsyncSession
-from app.models.course_step import CourseStep
+from app.models.course_step import CourseStep, StepType
+from app.models.course import Courses
+from app.repositories import course_progress_repo
 
 async def list_by_course(db: AsyncSession, course_id: int) -> list[CourseStep]:
     res = await db.execute(select(CourseStep).where(CourseStep.course_id == course_id).order_by(CourseStep.order_index))
     return list(res.scalars())
 
+async def get_with_course(db: AsyncSession, step_id: int) -> tuple[CourseStep, Courses] | None:
+    res = await db.execute(select(CourseStep, Courses).join(Courses, Courses.id == CourseStep.course_id).where(CourseStep.id == step_id))
+    row = res.first()
+    return (row[0], row[1]) if row else None
+
+async def types_by_id(db: AsyncSession, step_ids: list[int]) -> dict[int, StepType]:
+    # существующие шаги и их тип (для валидации метрик) — одним запросом
+    res = await db.execute(select(CourseStep.id, CourseStep.type).where(CourseStep.id.in_(step_ids)))
+    return dict(res.all())
+
 async def create(db: AsyncSession, *, course_id: int, title: str, order_index: int, type: str, config: dict) -> CourseStep:
     obj = CourseStep(course_id=course_id, title=title, order_index=order_index, type=type, config=config)
     db.add(obj)
     await db.flush()
+    await db.execute(update(Courses).where(Courses.id == course_id).values(steps_count=Courses.steps_count + 1))
+    # новый шаг меняет знаменатель: у завершивших курс снова не 100%
+    await course_progress_repo.recompute_for_course(db, course_id)
     return obj
@@ -1,9 +1,10 @@
 from __future__ import annotations
 from datetime import date
 from typing import Optional, Sequence
-from sqlalchemy import select, and_, desc
+from sqlalchemy import REAL, select, and_, desc, func, tuple_, literal, literal_column
 from sqlalchemy.ext.asyncio import AsyncSession
-from app.models.notebook_entry import NotebookEntry, MoodEnum
+from app.models.notebook_entry import NotebookEntry, MoodEnum, SEARCH_CONFIG
+from app.repositories import sync_repo
 
 async def get(db: AsyncSession, entry_id: int) -> Optional[NotebookEntry]:
     return await db.get(NotebookEntry, entry_id)
@@ -17,16 +18,45 @@ async def get_by_date(db: AsyncSession, user_id: int, day: date) -> Optional[Not
 async def list_for_user(
     db: AsyncSession, user_id: int, *, limit: int = 50, offset: int = 0,
     date_from: Optional[date] = None, date_to: Optional[date] = None,
+    before_date: Optional[date] = None,
 ) -> Sequence[NotebookEntry]:
     stmt = select(NotebookEntry).where(NotebookEntry.user_id == user_id)
     if date_from:
         stmt = stmt.where(NotebookEntry.entry_date >= date_from)
     if date_to:
         stmt = stmt.where(NotebookEntry.entry_date <= date_to)
-    stmt = stmt.order_by(desc(NotebookEntry.entry_date)).limit(limit).offset(offset)
+    # keyset: (user_id, entry_date) уникален, так что одной даты достаточно
+    if before_date is not None:
+        stmt = stmt.where(NotebookEntry.entry_date < before_date)
+    else:
+        stmt = stmt.offset(offset)
+    stmt = stmt.order_by(desc(NotebookEntry.entry_date)).limit(limit)
     res = await db.execute(stmt)
     return res.scalars().all()
 
+async def search(
+    db: AsyncSession, user_id: int, q: str, *, limit: int = 20,
+    after: Optional[tuple[float, int]] = None,
+) -> list[tuple[NotebookEntry, float]]:
+    """
+    Полнотекстовый поиск по title/content (websearch-синтаксис: слова, "фразы", -минус, or).
+    Сортировка по релевантности, затем id; after=(rank, id) последней строки — keyset-курсор.
+    """
+    # конфигурация — константа в SQL (как в выражении колонки), а не параметр
+    query = func.websearch_to_tsquery(literal_column(f"'{SEARCH_CONFIG}'::regconfig"), q)
+    rank = func.ts_rank_cd(NotebookEntry.search_vector, query).label("rank")
+    stmt = (
+        select(NotebookEntry, rank)
+        .where(NotebookEntry.user_id == user_id, NotebookEntry.search_vector.op("@@")(query))
+    )
+    if after is not None:
+        # ts_rank_cd возвращает real (float4). В курсор он уходит как Python float (float8) и обратно
+        # без потерь, но сравнивать надо тоже в real: иначе rank приведётся к float8, и курсор, чьё число
+        # чуть разошлось с float4 (клиент округлил, другой сериализатор), пропустит или повторит строки
+        stmt = stmt.where(tuple_(rank, NotebookEntry.id) < tuple_(literal(after[0], REAL), literal(after[1])))
+    res = await db.execute(stmt.order_by(rank.desc(), NotebookEntry.id.desc()).limit(limit))
+    return [(entry, r) for entry, r in res.all()]
+
 async def create(
     db: AsyncSession, *, user_id: int, entry_date: date, mood: MoodEnum,
     title: Optional[str], content: Optional[str],
@@ -49,5 +79,7 @@ async def update(
     return entry
 
 async def delete(db: AsyncSession, entry: NotebookEntry) -> None:
+    # tombstone в той же транзакции — другие устройства узнают об удалении через /sync
+    sync_repo.add_tombstone(db, entry.user_id, sync_repo.ENTITY_NOTEBOOK, entry.id)
     await db.delete(entry)
     await db.flush()
@@ -0,0 +1,53 @@
+from __future__ import annotations
+from datetime import datetime
+from typing import Optional, Sequence
+from sqlalchemy import BigInteger, Text, cast, delete, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models.course_progress import CourseProgress
+from app.models.course_step_progress import CourseStepProgress
+from app.models.notebook_entry import NotebookEntry
+from app.models.sync_tombstone import SyncTombstone
+
+ENTITY_NOTEBOOK = "notebook"
+
+def add_tombstone(db: AsyncSession, user_id: int, entity: str, entity_id: int) -> None:
+    # без flush: уйдёт вместе с удалением в той же транзакции
+    db.add(SyncTombstone(user_id=user_id, entity=entity, entity_id=entity_id))
+
+async def watermark(db: AsyncSession) -> tuple[int, datetime]:
+    """
+    (xmin текущего снимка, now()). Брать до выборок изменений: всё, что они не увидят, пишут
+    транзакции с xid >= xmin, и следующий запрос с этим водяным знаком их подберёт.
+    """
+    res = await db.execute(select(
+        cast(cast(func.pg_snapshot_xmin(func.pg_current_snapshot()), Text), BigInteger), func.now(),
+    ))
+    xmin, now = res.one()
+    return xmin, now
+
+async def _changed(db: AsyncSession, model, user_id: int, since: Optional[int]) -> Sequence:
+    # все выборки — по индексам (user_id, sync_xid). since включительно: транзакции с xid = since
+    # в снимке водяного знака ещё шли; строки, которые клиент уже видел, придут повторно — это безопасно
+    stmt = select(model).where(model.user_id == user_id)
+    if since is not None:
+        stmt = stmt.where(model.sync_xid >= since)
+    res = await db.execute(stmt.order_by(model.sync_xid, model.id))
+    return res.scalars().all()
+
+async def notebook_changes(db: AsyncSession, user_id: int, since: Optional[int]) -> Sequence[NotebookEntry]:
+    return await _changed(db, NotebookEntry, user_id, since)
+
+async def course_progress_changes(db: AsyncSession, user_id: int, since: Optional[int]) -> Sequence[CourseProgress]:
+    return await _changed(db, CourseProgress, user_id, since)
+
+async def step_progress_changes(db: AsyncSession, user_id: int, since: Optional[int]) -> Sequence[CourseStepProgress]:
+    return await _changed(db, CourseStepProgress, user_id, since)
+
+async def tombstones(db: AsyncSession, user_id: int, since: Optional[int]) -> Sequence[SyncTombstone]:
+    if since is None:
+        return []  # полная выгрузка — удалённого у клиента и так нет
+    return await _changed(db, SyncTombstone, user_id, since)
+
+async def purge_tombstones(db: AsyncSession, older_than: datetime) -> int:
+    res = await db.execute(delete(SyncTombstone).where(SyncTombstone.deleted_at < older_than))
+    return res.rowcount or 0
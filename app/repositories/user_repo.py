@@ -41,6 +41,7 @@ async def update_partial(
     country: Optional[str],
     phone: Optional[str],
     gender: Optional[str],
+    role: Optional[str] = None,
 ) -> User:
     if city is not None:
         user.city = city
@@ -50,5 +51,12 @@ async def update_partial(
         user.phone = phone
     if gender is not None:
         user.gender = gender
+    if role is not None:
+        user.role = role
+    await db.flush()
+    return user
+
+async def set_password_hash(db: AsyncSession, user: User, password_hash: str) -> User:
+    user.password_hash = password_hash
     await db.flush()
     return user
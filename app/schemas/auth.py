@@ -1,6 +1,11 @@
+from datetime import datetime
 from pydantic import BaseModel
 
 class TokenPair(BaseModel):
     access_token: str
     refresh_token: str
     token_type: str = "bearer"
+
+class SessionRead(BaseModel):
+    jti: str
+    expires_at: datetime
@@ -1,6 +1,6 @@
 from __future__ import annotations
 from pydantic import BaseModel, Field
-from typing import Optional
+from typing import Literal, Optional
 
 class CourseCreate(BaseModel):
     slug: str
@@ -18,6 +18,7 @@ class CourseRead(BaseModel):
     summary: str
     storage_key: str
     pdf_pages: Optional[int] = None
+    content_sha256: Optional[str] = None
     version: int
     is_public: bool
 
@@ -31,6 +32,19 @@ class CourseProgressRead(BaseModel):
     current_page: int
 
 class CourseProgressUpdate(BaseModel):
-    progress_percent: int = Field(ge=0, le=100)
+    # progress_percent и «завершён» считаются сервером по завершённым шагам — от клиента не принимаются
     current_page: int = Field(ge=0)
-    status: Optional[int] = None  # 0/1/2
+    status: Optional[Literal[0, 1]] = None  # 0 — в процессе, 1 — пауза
+
+class DashboardNextStep(BaseModel):
+    id: int
+    title: str
+    order_index: int
+    type: str
+
+class CourseDashboardItem(BaseModel):
+    course: CourseRead
+    progress: Optional[CourseProgressRead] = None  # None — курс ещё не начат
+    steps_count: int
+    completed_steps: int
+    next_step: Optional[DashboardNextStep] = None  # None — все шаги пройдены (или их нет)
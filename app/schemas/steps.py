@@ -1,73 +1,112 @@
 # app/schemas/steps.py
 from __future__ import annotations
-from pydantic import BaseModel, Field, conint, constr
-from typing import Literal, Union, Optional
+from pydantic import BaseModel, Discriminator, Field, Tag, ValidationInfo, conint, constr, model_validator
+from datetime import datetime
+from typing import Annotated, Any, Literal, Union, Optional
 
 # ---- CONFIGS ----
 class StepConfigBase(BaseModel):
     pass
 
 class MeditationConfig(StepConfigBase):
-    _type: Literal["meditation"] = "meditation"
+    type: Literal["meditation"] = "meditation"
     duration_min: conint(ge=1, le=180) = 10  # минуты
 
 class ReadingConfig(StepConfigBase):
-    _type: Literal["reading"] = "reading"
+    type: Literal["reading"] = "reading"
     start_page: conint(ge=1)
     end_page: conint(ge=1)
     # опционально — ключ PDF, если не общий для курса
     storage_key: Optional[str] = None
 
 class QuizConfig(StepConfigBase):
-    _type: Literal["quiz"] = "quiz"
+    type: Literal["quiz"] = "quiz"
     questions_key: constr(min_length=1)  # ключ к вопросам (отдельная таблица/хранилище)
 
 class ReflectionConfig(StepConfigBase):
-    _type: Literal["reflection"] = "reflection"
+    type: Literal["reflection"] = "reflection"
     prompt: constr(min_length=1)
 
 class VideoConfig(StepConfigBase):
-    _type: Literal["video"] = "video"
+    type: Literal["video"] = "video"
     url: constr(min_length=1)
     duration_sec: conint(ge=1)
 
 class ExerciseConfig(StepConfigBase):
-    _type: Literal["exercise"] = "exercise"
+    type: Literal["exercise"] = "exercise"
     reps: conint(ge=1) | None = None
     duration_sec: conint(ge=1) | None = None
 
-StepConfig = Union[MeditationConfig, ReadingConfig, QuizConfig, ReflectionConfig, VideoConfig, ExerciseConfig]
+# Tagged union: валидация сразу идёт в одну модель по тегу (O(1)), а не перебором всех вариантов.
+# Тег — поле type; в старых конфигах его нет, его подставляет родитель (CourseStepCreate/Read) из type шага.
+def _tag(v: Any) -> str | None:
+    if isinstance(v, dict):
+        return v.get("type")
+    return getattr(v, "type", None)
+
+StepConfig = Annotated[
+    Union[
+        Annotated[MeditationConfig, Tag("meditation")],
+        Annotated[ReadingConfig, Tag("reading")],
+        Annotated[QuizConfig, Tag("quiz")],
+        Annotated[ReflectionConfig, Tag("reflection")],
+        Annotated[VideoConfig, Tag("video")],
+        Annotated[ExerciseConfig, Tag("exercise")],
+    ],
+    Discriminator(_tag),
+]
 
 # ---- METRICS (на комплишн) ----
 class MetricsBase(BaseModel): pass
 
 class MeditationMetrics(MetricsBase):
-    _type: Literal["meditation"] = "meditation"
+    type: Literal["meditation"] = "meditation"
     actual_duration_sec: conint(ge=0)
 
 class ReadingMetrics(MetricsBase):
-    _type: Literal["reading"] = "reading"
+    type: Literal["reading"] = "reading"
     pages_read: conint(ge=0)
 
 class QuizMetrics(MetricsBase):
-    _type: Literal["quiz"] = "quiz"
+    type: Literal["quiz"] = "quiz"
     correct: conint(ge=0)
     total: conint(ge=0)
 
 class ReflectionMetrics(MetricsBase):
-    _type: Literal["reflection"] = "reflection"
+    type: Literal["reflection"] = "reflection"
     notebook_entry_id: int
 
 class VideoMetrics(MetricsBase):
-    _type: Literal["video"] = "video"
+    type: Literal["video"] = "video"
     watched_sec: conint(ge=0)
 
 class ExerciseMetrics(MetricsBase):
-    _type: Literal["exercise"] = "exercise"
+    type: Literal["exercise"] = "exercise"
     done_reps: conint(ge=0) | None = None
     done_duration_sec: conint(ge=0) | None = None
 
-StepMetrics = Union[MeditationMetrics, ReadingMetrics, QuizMetrics, ReflectionMetrics, VideoMetrics, ExerciseMetrics]
+# Тег — поле type; клиенты его обычно не шлют, его подставляет StepCompletePayload из type шага.
+StepMetrics = Annotated[
+    Union[
+        Annotated[MeditationMetrics, Tag("meditation")],
+        Annotated[ReadingMetrics, Tag("reading")],
+        Annotated[QuizMetrics, Tag("quiz")],
+        Annotated[ReflectionMetrics, Tag("reflection")],
+        Annotated[VideoMetrics, Tag("video")],
+        Annotated[ExerciseMetrics, Tag("exercise")],
+    ],
+    Discriminator(_tag),
+]
+
+def _with_config_tag(data: Any, fields) -> Any:
+    # подставляем type шага в config (ORM-объект превращаем в dict только с нужными полями)
+    if not isinstance(data, dict):
+        data = {f: getattr(data, f) for f in fields if hasattr(data, f)}
+    cfg, step_type = data.get("config"), data.get("type")
+    step_type = getattr(step_type, "value", step_type)
+    if isinstance(cfg, dict) and "type" not in cfg and step_type:
+        data = {**data, "config": {**cfg, "type": step_type}}
+    return data
 
 # ---- API DTO ----
 class CourseStepCreate(BaseModel):
@@ -76,6 +115,17 @@ class CourseStepCreate(BaseModel):
     type: Literal["meditation","reading","quiz","reflection","video","exercise"]
     config: StepConfig
 
+    @model_validator(mode="before")
+    @classmethod
+    def _tag_config(cls, data: Any) -> Any:
+        return _with_config_tag(data, cls.model_fields)
+
+    @model_validator(mode="after")
+    def _check_config_type(self) -> "CourseStepCreate":
+        if self.config.type != self.type:
+            raise ValueError(f"config type '{self.config.type}' does not match step type '{self.type}'")
+        return self
+
 class CourseStepRead(BaseModel):
     id: int
     title: str
@@ -84,5 +134,46 @@ class CourseStepRead(BaseModel):
     config: StepConfig
     class Config: from_attributes = True
 
+    @model_validator(mode="before")
+    @classmethod
+    def _tag_config(cls, data: Any) -> Any:
+        return _with_config_tag(data, cls.model_fields)
+
+# Клиенты шлют метрики без type, поэтому по телу запроса их не типизировать: тег — type шага из БД.
+# Endpoint принимает сырые метрики (StepCompleteRequest) и валидирует их через parse_metrics.
+class StepCompleteRequest(BaseModel):
+    metrics: dict[str, Any]
+
 class StepCompletePayload(BaseModel):
+    """Типизированные метрики; валидировать с context={"step_type": ...}."""
     metrics: StepMetrics
+
+    @model_validator(mode="before")
+    @classmethod
+    def _tag_metrics(cls, data: Any, info: ValidationInfo) -> Any:
+        step_type = (info.context or {}).get("step_type")
+        step_type = getattr(step_type, "value", step_type)
+        metrics = data.get("metrics") if isinstance(data, dict) else None
+        if step_type and isinstance(metrics, dict):
+            if metrics.get("type") is None:
+                data = {**data, "metrics": {**metrics, "type": step_type}}
+            elif metrics["type"] != step_type:
+                raise ValueError(f"metrics type '{metrics['type']}' does not match step type '{step_type}'")
+        return data
+
+def parse_metrics(metrics: dict[str, Any], step_type: str) -> MetricsBase:
+    return StepCompletePayload.model_validate({"metrics": metrics}, context={"step_type": step_type}).metrics
+
+# ---- batch complete (офлайн-буфер мобильного клиента) ----
+MAX_BATCH_COMPLETE = 100
+
+class StepCompleteBatchItem(StepCompleteRequest):
+    step_id: int
+    completed_at: Optional[datetime] = None  # клиентское время; нет — берём серверное
+
+class StepCompleteBatch(BaseModel):
+    items: list[StepCompleteBatchItem] = Field(min_length=1, max_length=MAX_BATCH_COMPLETE)
+
+class StepCompleteBatchResult(BaseModel):
+    step_id: int
+    status: Literal["applied", "stale", "duplicate", "not_found"]
@@ -0,0 +1,24 @@
+from __future__ import annotations
+from datetime import datetime
+from typing import List, Optional
+from pydantic import BaseModel
+from app.schemas.course import CourseProgressRead
+from app.schemas.notebook import NotebookRead
+
+class StepProgressSync(BaseModel):
+    step_id: int
+    status: str
+    started_at: Optional[datetime] = None
+    completed_at: Optional[datetime] = None
+
+class SyncDeleted(BaseModel):
+    entity: str  # "notebook"
+    id: int
+    deleted_at: datetime
+
+class SyncResponse(BaseModel):
+    watermark: str  # передать как ?since= в следующем запросе
+    notebook: List[NotebookRead]
+    course_progress: List[CourseProgressRead]
+    step_progress: List[StepProgressSync]
+    deleted: List[SyncDeleted]
@@ -0,0 +1,16 @@
+# app/scripts/backfill_step_counters.py
+# Пересчёт courses.steps_count и course_progress.completed_steps/progress_percent по существующим данным.
+# Запуск: python -m app.scripts.backfill_step_counters
+import asyncio
+
+from app.db.session import AsyncSessionLocal, engine
+from app.repositories import course_progress_repo
+
+async def main() -> None:
+    async with AsyncSessionLocal() as db:
+        await course_progress_repo.backfill_step_counters(db)
+        await db.commit()
+    await engine.dispose()
+
+if __name__ == "__main__":
+    asyncio.run(main())
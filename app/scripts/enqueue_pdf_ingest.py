@@ -0,0 +1,21 @@
+# app/scripts/enqueue_pdf_ingest.py
+# Поставить в очередь ingestion для курсов, PDF которых ещё не обработан.
+# Запуск: python -m app.scripts.enqueue_pdf_ingest
+import asyncio
+
+from loguru import logger
+
+from app.db.session import AsyncSessionLocal, engine
+from app.repositories import course_repo
+from app.tasks.pdf_ingest import ingest_course_pdf
+
+async def main() -> None:
+    async with AsyncSessionLocal() as db:
+        ids = await course_repo.list_not_ingested_ids(db)
+    await engine.dispose()
+    for course_id in ids:
+        ingest_course_pdf.delay(course_id)
+    logger.info("enqueued {} courses", len(ids))
+
+if __name__ == "__main__":
+    asyncio.run(main())
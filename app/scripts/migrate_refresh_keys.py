@@ -0,0 +1,43 @@
+# app/scripts/migrate_refresh_keys.py
+# Перенос refresh-сессий из ключей старого формата (refresh:jti, sessions:uid) в формат с hash tag
+# (refresh:{uid}:jti, sessions:{uid}) — один раз после выкатки, иначе старые refresh-токены не пройдут /refresh.
+# Запуск: python -m app.scripts.migrate_refresh_keys  (повторный запуск безопасен)
+import asyncio
+import re
+import time
+
+from loguru import logger
+from redis.asyncio import Redis
+
+from app.core.settings import settings
+from app.services import refresh_sessions
+
+_LEGACY_REFRESH = re.compile(r"^refresh:([^{}:]+)$")
+_LEGACY_SESSIONS = re.compile(r"^sessions:(\d+)$")
+
+async def main() -> None:
+    redis = Redis.from_url(settings.redis_dsn, encoding="utf-8", decode_responses=True)
+    moved = 0
+    try:
+        async for key in redis.scan_iter(match="refresh:*", count=1000):
+            m = _LEGACY_REFRESH.match(key)
+            if not m:
+                continue
+            uid, ttl = await redis.get(key), await redis.ttl(key)
+            if uid is not None and ttl > 0:
+                jti, now = m.group(1), int(time.time())
+                sessions = refresh_sessions._sessions_key(int(uid))
+                await redis.set(refresh_sessions._refresh_key(int(uid), jti), uid, ex=ttl, nx=True)
+                await redis.zadd(sessions, {jti: now + ttl})
+                await redis.expire(sessions, refresh_sessions._ttl())
+                moved += 1
+            await redis.delete(key)
+        async for key in redis.scan_iter(match="sessions:*", count=1000):
+            if _LEGACY_SESSIONS.match(key):
+                await redis.delete(key)
+    finally:
+        await redis.close()
+    logger.info("moved {} refresh sessions to hash-tagged keys", moved)
+
+if __name__ == "__main__":
+    asyncio.run(main())
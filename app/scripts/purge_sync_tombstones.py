@@ -0,0 +1,22 @@
+# app/scripts/purge_sync_tombstones.py
+# Удаление tombstones старше SYNC_TOMBSTONE_RETENTION_DAYS (клиенты с более старым watermark получают 410).
+# Запуск: python -m app.scripts.purge_sync_tombstones  (например, из cron раз в сутки)
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+from loguru import logger
+
+from app.core.settings import settings
+from app.db.session import AsyncSessionLocal, engine
+from app.repositories import sync_repo
+
+async def main() -> None:
+    older_than = datetime.now(timezone.utc) - timedelta(days=settings.SYNC_TOMBSTONE_RETENTION_DAYS)
+    async with AsyncSessionLocal() as db:
+        n = await sync_repo.purge_tombstones(db, older_than)
+        await db.commit()
+    await engine.dispose()
+    logger.info("purged {} sync tombstones", n)
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,30 @@
+# app/scripts/serve.py
+# Точка входа API: готовит каталог метрик Prometheus и заменяет процесс на uvicorn (exec, тот же PID).
+# Запуск: python -m app.scripts.serve --host 0.0.0.0 --port 8000 [--workers N] [любые флаги uvicorn]
+#
+# Каталог PROMETHEUS_MULTIPROC_DIR чистится здесь, в мастере, до появления воркеров: файлы прошлого
+# запуска (счётчики умерших процессов с теми же PID) иначе подмешались бы в /metrics. Воркеры каталог
+# не трогают — один из них мог бы стереть файлы уже работающих соседей.
+# app.core.observability здесь не импортируем: он создаёт метрики, а с ними — файлы в каталоге.
+import os
+import shutil
+import sys
+
+from app.core.settings import settings
+
+def reset_multiproc_dir(path: str) -> None:
+    os.makedirs(path, exist_ok=True)
+    for name in os.listdir(path):
+        entry = os.path.join(path, name)
+        if os.path.isdir(entry) and not os.path.islink(entry):
+            shutil.rmtree(entry)
+        else:
+            os.remove(entry)
+
+def main(argv: list[str]) -> None:
+    if settings.PROMETHEUS_MULTIPROC_DIR:
+        reset_multiproc_dir(settings.PROMETHEUS_MULTIPROC_DIR)
+    os.execvp(sys.executable, [sys.executable, "-m", "uvicorn", "app.main:app", *argv])
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
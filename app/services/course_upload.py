@@ -0,0 +1,248 @@
+# app/services/course_upload.py
+from __future__ import annotations
+import asyncio
+import hashlib
+import re
+from dataclasses import dataclass
+from typing import AsyncIterator, Awaitable, Callable, Optional
+
+from loguru import logger
+
+from app.core.settings import settings
+from app.services import storage
+
+try:
+    import python_multipart as multipart
+    from python_multipart.multipart import parse_options_header
+except ImportError:  # старое имя пакета
+    import multipart  # type: ignore[no-redef]
+    from multipart.multipart import parse_options_header  # type: ignore[no-redef]
+
+# Потоковая загрузка PDF курса: multipart/form-data разбирается по мере чтения тела запроса,
+# байты файла сразу уходят частями в S3 multipart upload. В памяти — не больше одной части
+# (S3_MULTIPART_PART_SIZE) плюс текущий чанк; на диск ничего не пишется.
+# Попутно считаются sha256 и число страниц.
+
+_MAX_FIELD_BYTES = 64 * 1024
+
+class UploadError(Exception):
+    def __init__(self, status_code: int, detail: str):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+
+# ---- подсчёт страниц PDF на лету ----
+_PAGE_RE = re.compile(rb"/Type\s*/Page(?![A-Za-z])")
+
+class PdfPageCounter:
+    """
+    Считает словари /Type /Page в потоке байтов. Приблизительно: страницы внутри сжатых
+    object streams (PDF 1.5+) не видны — тогда count() вернёт None, и pdf_pages заполнит ingestion.
+    """
+    _TAIL = 64
+
+    def __init__(self) -> None:
+        self._tail = b""
+        self._count = 0
+        self.head = b""
+
+    def feed(self, data: bytes) -> None:
+        if len(self.head) < 1024:
+            self.head += data[: 1024 - len(self.head)]
+        buf = self._tail + data
+        t = len(self._tail)
+        # совпадение засчитываем, когда после него уже есть байт (lookahead) и оно не было учтено раньше
+        for m in _PAGE_RE.finditer(buf):
+            if t <= m.end() < len(buf):
+                self._count += 1
+        self._tail = buf[-self._TAIL:]
+
+    def count(self) -> Optional[int]:
+        # совпадение в самом конце потока (без байта после него)
+        if any(m.end() == len(self._tail) for m in _PAGE_RE.finditer(self._tail)):
+            self._count += 1
+            self._tail = b""
+        return self._count or None
+
+    def looks_like_pdf(self) -> bool:
+        return b"%PDF-" in self.head
+
+# ---- разбор multipart/form-data ----
+class _FormStream:
+    """Обёртка над python-multipart: текстовые поля копит, байты файла отдаёт через take_file()."""
+
+    def __init__(self, content_type: str, file_field: str):
+        _, params = parse_options_header(content_type)
+        boundary = params.get(b"boundary")
+        if not boundary:
+            raise UploadError(400, "Missing multipart boundary")
+        self.file_field = file_field
+        self.fields: dict[str, str] = {}
+        self.file_started = False
+        self.file_finished = False
+        self._file_buf = bytearray()
+        self._headers: dict[bytes, bytes] = {}
+        self._hname = b""
+        self._hvalue = b""
+        self._name: Optional[str] = None
+        self._is_file = False
+        self._value = bytearray()
+        self._parser = multipart.MultipartParser(boundary, {
+            "on_part_begin": self._on_part_begin,
+            "on_header_field": self._on_header_field,
+            "on_header_value": self._on_header_value,
+            "on_header_end": self._on_header_end,
+            "on_headers_finished": self._on_headers_finished,
+            "on_part_data": self._on_part_data,
+            "on_part_end": self._on_part_end,
+        })
+
+    def _on_part_begin(self) -> None:
+        self._headers = {}
+        self._value = bytearray()
+
+    def _on_header_field(self, data: bytes, start: int, end: int) -> None:
+        self._hname += data[start:end]
+
+    def _on_header_value(self, data: bytes, start: int, end: int) -> None:
+        self._hvalue += data[start:end]
+
+    def _on_header_end(self) -> None:
+        self._headers[self._hname.lower()] = self._hvalue
+        self._hname, self._hvalue = b"", b""
+
+    def _on_headers_finished(self) -> None:
+        _, options = parse_options_header(self._headers.get(b"content-disposition", b""))
+        self._name = options.get(b"name", b"").decode("latin-1")
+        self._is_file = b"filename" in options
+        if self.file_started and not self._is_file:
+            # метаданные уже проверены и пошли в ключ объекта — поздние поля ничего не должны менять
+            raise UploadError(400, f"Form field {self._name!r} must come before the file")
+        if self._is_file:
+            if self._name != self.file_field or self.file_started:
+                raise UploadError(400, f"Unexpected file field {self._name!r}")
+            self.file_started = True
+
+    def _on_part_data(self, data: bytes, start: int, end: int) -> None:
+        if self._is_file:
+            self._file_buf += data[start:end]
+            return
+        self._value += data[start:end]
+        if len(self._value) > _MAX_FIELD_BYTES:
+            raise UploadError(413, f"Form field {self._name!r} is too large")
+
+    def _on_part_end(self) -> None:
+        if self._is_file:
+            self.file_finished = True
+        elif self._name:
+            self.fields[self._name] = self._value.decode("utf-8")
+
+    def feed(self, chunk: bytes) -> None:
+        self._parser.write(chunk)
+
+    def finalize(self) -> None:
+        self._parser.finalize()
+
+    def take_file(self) -> bytes:
+        data = bytes(self._file_buf)
+        self._file_buf.clear()
+        return data
+
+# ---- S3 multipart ----
+class _MultipartWriter:
+    def __init__(self, key: str):
+        self.key = key
+        self.upload_id: Optional[str] = None
+        self._buf = bytearray()
+        self._etags: list[str] = []
+
+    async def _flush_part(self, body: bytes) -> None:
+        etag = await asyncio.to_thread(storage.upload_part, self.key, self.upload_id, len(self._etags) + 1, body)
+        self._etags.append(etag)
+
+    async def write(self, data: bytes) -> None:
+        if self.upload_id is None:
+            self.upload_id = await asyncio.to_thread(storage.create_multipart, self.key)
+        self._buf += data
+        part_size = settings.S3_MULTIPART_PART_SIZE
+        while len(self._buf) >= part_size:
+            with memoryview(self._buf) as view:
+                body = bytes(view[:part_size])  # без промежуточного bytearray-среза: одна копия части, не две
+            del self._buf[:part_size]
+            await self._flush_part(body)  # пока часть уходит, тело запроса не читаем — естественный backpressure
+
+    async def complete(self) -> None:
+        if self._buf or not self._etags:
+            await self._flush_part(bytes(self._buf))  # последняя часть может быть меньше 5 МБ
+            self._buf.clear()
+        await asyncio.to_thread(storage.complete_multipart, self.key, self.upload_id, self._etags)
+
+    async def abort(self) -> None:
+        if self.upload_id is None:
+            return
+        try:
+            await asyncio.to_thread(storage.abort_multipart, self.key, self.upload_id)
+        except Exception:
+            logger.exception("failed to abort multipart upload {}", self.key)
+
+@dataclass
+class UploadResult:
+    fields: dict[str, str]
+    key: str
+    size: int
+    sha256: str
+    pages: Optional[int]
+
+async def stream_upload(
+    chunks: AsyncIterator[bytes],
+    content_type: str,
+    *,
+    on_fields: Callable[[dict[str, str]], Awaitable[str]],
+    file_field: str = "file",
+) -> UploadResult:
+    """
+    Текстовые поля формы должны идти до файла: on_fields(fields) вызывается, когда начинается файл,
+    проверяет их и возвращает ключ объекта в S3; поле после файла — 400. Любая ошибка прерывает
+    multipart upload.
+    """
+    form = _FormStream(content_type, file_field)
+    hasher = hashlib.sha256()
+    pages = PdfPageCounter()
+    writer: Optional[_MultipartWriter] = None
+    size = 0
+
+    async def consume(data: bytes) -> None:
+        nonlocal size
+        size += len(data)
+        if size > settings.COURSE_UPLOAD_MAX_BYTES:
+            raise UploadError(413, "File is too large")
+        hasher.update(data)
+        pages.feed(data)
+        if len(pages.head) >= 1024 and not pages.looks_like_pdf():
+            raise UploadError(415, "File is not a PDF")
+        await writer.write(data)
+
+    try:
+        async for chunk in chunks:
+            form.feed(chunk)
+            if not form.file_started:
+                continue
+            if writer is None:
+                writer = _MultipartWriter(await on_fields(dict(form.fields)))
+            data = form.take_file()
+            if data:
+                await consume(data)
+        form.finalize()
+        if writer is None or not form.file_finished:
+            raise UploadError(400, f"Missing file field {file_field!r}")
+        tail = form.take_file()
+        if tail:
+            await consume(tail)
+        if not pages.looks_like_pdf():
+            raise UploadError(415, "File is not a PDF")
+        await writer.complete()
+    except BaseException:
+        if writer is not None:
+            await writer.abort()
+        raise
+    return UploadResult(form.fields, writer.key, size, hasher.hexdigest(), pages.count())
@@ -0,0 +1,134 @@
+# app/services/download_cache.py
+from __future__ import annotations
+import secrets
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+from loguru import logger
+from prometheus_client import Counter
+from redis.asyncio import Redis
+from sqlalchemy import event, inspect
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import object_session
+
+from app.core.cache import TTLCache
+from app.core.observability import REGISTRY
+from app.core.settings import settings
+from app.db.session import register_after_commit
+from app.models.course import Courses
+from app.repositories import course_repo
+from app.services import storage
+
+# Кэш presigned GET на PDF курса: (course_id, поколение) -> url. Живёт до (expiry - safety margin).
+# Поколение кэша курса общее для всех воркеров — случайный токен в Redis (course:dl:gen:{id}) с тем же
+# TTL, что у ссылок, поэтому горячее скачивание стоит один GET в Redis: без запроса в БД и без HMAC-подписи.
+# Изменение курса через ORM после commit записывает новый токен (SET без NX): записи по старому больше
+# не находятся ни в одном воркере. Правки мимо ORM видны не позже, чем истечёт токен.
+
+DOWNLOAD_URL_CACHE = Counter(
+    "download_url_cache_total",
+    "Presigned course download URL cache lookups",
+    ["result"],  # hit | miss
+    registry=REGISTRY,
+)
+
+@dataclass(frozen=True)
+class DownloadLink:
+    course_id: int
+    version: int
+    url: str
+    expires_at: float  # time.time()
+
+    @property
+    def expires_in(self) -> int:
+        return max(0, int(self.expires_at - time.time()))
+
+_TTL = settings.DOWNLOAD_URL_EXPIRES_SECONDS - settings.DOWNLOAD_URL_SAFETY_MARGIN_SECONDS
+_cache: TTLCache[DownloadLink] = TTLCache(maxsize=settings.DOWNLOAD_URL_CACHE_MAXSIZE, ttl=_TTL)
+_redis: Redis | None = None
+
+_PENDING = "download_cache_invalidate"  # ключ в session.info: {course_id, ...} до commit
+
+def bind_redis(redis: Redis | None) -> None:
+    # вызывается из lifespan; без Redis поколение — версия курса, её берём лёгким запросом в БД
+    global _redis
+    _redis = redis
+
+def _generation_key(course_id: int) -> str:
+    return f"course:dl:gen:{course_id}"
+
+async def _generation(db: AsyncSession, course_id: int) -> Optional[str]:
+    if _redis is not None:
+        key = _generation_key(course_id)
+        try:
+            token = await _redis.get(key)
+            if token is None:
+                # заводим поколение до чтения курса из БД: commit, который случится после нашего чтения,
+                # заменит токен, и ссылку по старым данным никто не найдёт. NX — не перетираем чужой
+                fresh = secrets.token_hex(8)
+                if await _redis.set(key, fresh, nx=True, ex=_TTL):
+                    return fresh
+                token = await _redis.get(key)
+            return token
+        except Exception:
+            pass  # Redis недоступен — поколение по версии из БД
+    version = await course_repo.get_version(db, course_id)
+    return None if version is None else f"v{version}"
+
+async def get_link(db: AsyncSession, course_id: int) -> Optional[DownloadLink]:
+    generation = await _generation(db, course_id)
+    if generation is not None:
+        link = _cache.get((course_id, generation))
+        if link is not None:
+            DOWNLOAD_URL_CACHE.labels(result="hit").inc()
+            return link
+
+    DOWNLOAD_URL_CACHE.labels(result="miss").inc()
+    course = await course_repo.get(db, course_id)
+    if not course:
+        return None
+    expires = settings.DOWNLOAD_URL_EXPIRES_SECONDS
+    url = storage.presign_get(
+        key=course.storage_key,
+        filename=f"{course.slug}_v{course.version}.pdf",
+        expires=expires,
+    )
+    link = DownloadLink(course_id=course.id, version=course.version, url=url, expires_at=time.time() + expires)
+    if generation is not None:
+        _cache.set((course.id, generation), link)
+    return link
+
+async def invalidate(course_id: int) -> None:
+    # новое поколение для всех воркеров сразу: SET без NX перетирает и токен, который успел завести
+    # читатель, видевший курс до commit. Локальные записи по старому поколению доживают до TTL
+    if _redis is None:
+        return
+    try:
+        await _redis.set(_generation_key(course_id), secrets.token_hex(8), ex=_TTL)
+    except Exception:
+        # не смогли — ключ истечёт сам не позже чем через _TTL
+        logger.warning("download cache: failed to bump generation of course {}", course_id)
+
+def _defer(target: Courses) -> None:
+    # mapper-события идут внутри flush: сбрасываем только после commit, иначе параллельный
+    # запрос успеет закэшировать ещё не закоммиченную (или откатанную) версию
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault(_PENDING, set()).add(target.id)
+
+@event.listens_for(Courses, "after_update")
+def _on_course_update(mapper, connection, target: Courses) -> None:
+    state = inspect(target)
+    if any(state.attrs[a].history.has_changes() for a in ("version", "storage_key", "slug")):
+        _defer(target)
+
+@event.listens_for(Courses, "after_delete")
+def _on_course_delete(mapper, connection, target: Courses) -> None:
+    _defer(target)
+
+async def _after_commit(session: AsyncSession) -> None:
+    for course_id in session.info.pop(_PENDING, None) or ():
+        await invalidate(course_id)
+
+register_after_commit(_after_commit)
@@ -0,0 +1,133 @@
+# app/services/export.py
+from __future__ import annotations
+import csv
+import io
+import json
+import zlib
+from datetime import date, datetime
+from enum import Enum
+from typing import Any, AsyncIterator
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.routing import ReadSessionLocal, pick_read_engine
+from app.models.course_progress import CourseProgress
+from app.models.course_step_progress import CourseStepProgress
+from app.models.notebook_entry import NotebookEntry
+
+# Выгрузка данных пользователя (data portability): записи дневника, прогресс курсов и шагов.
+# Строки читаются серверным курсором (stream_scalars + yield_per) и сразу уходят клиенту пачками
+# по ~_FLUSH_BYTES — память не зависит от объёма истории. Всё в одной REPEATABLE READ транзакции,
+# чтобы три выборки были согласованы между собой.
+
+FORMATS = {"ndjson": "application/x-ndjson", "csv": "text/csv; charset=utf-8"}
+
+_YIELD_PER = 500
+_FLUSH_BYTES = 64 * 1024
+
+_SECTIONS: list[tuple[str, Any, tuple[str, ...]]] = [
+    ("notebook", NotebookEntry,
+     ("id", "entry_date", "mood", "title", "content", "created_at", "updated_at")),
+    ("course_progress", CourseProgress,
+     ("course_id", "status", "progress_percent", "current_page", "completed_steps",
+      "started_at", "completed_at", "course_version", "updated_at")),
+    ("step_progress", CourseStepProgress,
+     ("step_id", "status", "started_at", "completed_at", "metrics", "updated_at")),
+]
+_ORDER = {"notebook": NotebookEntry.entry_date, "course_progress": CourseProgress.course_id,
+          "step_progress": CourseStepProgress.step_id}
+
+# CSV — одна таблица: type + объединение колонок всех секций
+CSV_COLUMNS: list[str] = ["type"] + list(dict.fromkeys(c for _, _, cols in _SECTIONS for c in cols))
+
+def accepts_gzip(accept_encoding: str) -> bool:
+    """
+    Разрешает ли Accept-Encoding gzip (RFC 9110, 12.5.3): q=0 — явный отказ,
+    запись gzip/x-gzip важнее «*», кодировки без q имеют вес 1.
+    """
+    weights: dict[str, float] = {}
+    for item in accept_encoding.lower().split(","):
+        coding, *params = (part.strip() for part in item.split(";"))
+        if not coding:
+            continue
+        q = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        weights[coding] = q
+    return weights.get("gzip", weights.get("x-gzip", weights.get("*", 0.0))) > 0
+
+def _plain(value: Any) -> Any:
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+async def iter_rows(db: AsyncSession, user_id: int) -> AsyncIterator[dict[str, Any]]:
+    # только чтение: выгрузка не должна ничего писать, даже если сессия пришла с primary
+    await db.connection(execution_options={"isolation_level": "REPEATABLE READ", "postgresql_readonly": True})
+    for kind, model, cols in _SECTIONS:
+        stmt = (select(model).where(model.user_id == user_id).order_by(_ORDER[kind])
+                .execution_options(yield_per=_YIELD_PER))
+        result = await db.stream_scalars(stmt)
+        async for obj in result:
+            row = {"type": kind}
+            row.update((c, _plain(getattr(obj, c))) for c in cols)
+            yield row
+        db.expunge_all()  # identity map не растёт от секции к секции
+
+class _Encoder:
+    def __init__(self, fmt: str, use_gzip: bool):
+        self.fmt = fmt
+        self._buf = io.StringIO()
+        self._csv = csv.DictWriter(self._buf, fieldnames=CSV_COLUMNS, extrasaction="ignore") if fmt == "csv" else None
+        # wbits=31 — gzip-контейнер; Z_SYNC_FLUSH на каждой пачке, чтобы клиент получал байты сразу
+        self._zlib = zlib.compressobj(6, zlib.DEFLATED, 31) if use_gzip else None
+
+    def header(self) -> None:
+        if self._csv is not None:
+            self._csv.writeheader()
+
+    def add(self, row: dict[str, Any]) -> None:
+        if self._csv is not None:
+            if isinstance(row.get("metrics"), (dict, list)):
+                row["metrics"] = json.dumps(row["metrics"], ensure_ascii=False)
+            self._csv.writerow(row)
+        else:
+            self._buf.write(json.dumps(row, ensure_ascii=False, default=str))
+            self._buf.write("\n")
+
+    def pending(self) -> int:
+        return self._buf.tell()
+
+    def take(self, final: bool = False) -> bytes:
+        data = self._buf.getvalue().encode("utf-8")
+        self._buf.seek(0)
+        self._buf.truncate()
+        if self._zlib is None:
+            return data
+        return self._zlib.compress(data) + self._zlib.flush(zlib.Z_FINISH if final else zlib.Z_SYNC_FLUSH)
+
+async def stream_export(user_id: int, fmt: str, *, use_gzip: bool = False) -> AsyncIterator[bytes]:
+    """
+    Сессию открываем здесь, а не через Depends: StreamingResponse дочитывает генератор
+    уже после выхода из обработчика. Чтение — с реплики (если есть), не грузим primary.
+    """
+    enc = _Encoder(fmt, use_gzip)
+    enc.header()
+    bind = await pick_read_engine(user_id)
+    async with ReadSessionLocal(bind=bind) as db:
+        first = True
+        async for row in iter_rows(db, user_id):
+            enc.add(row)
+            # первую строку отдаём сразу — клиент видит начало ответа до конца выборки
+            if first or enc.pending() >= _FLUSH_BYTES:
+                first = False
+                yield enc.take()
+    yield enc.take(final=True)
@@ -0,0 +1,132 @@
+# app/services/pdf_slices.py
+from __future__ import annotations
+import asyncio
+import hashlib
+import io
+import threading
+import time
+from dataclasses import dataclass
+
+from botocore.exceptions import ClientError
+from loguru import logger
+from prometheus_client import Counter
+
+from app.core.cache import TTLCache
+from app.core.observability import REGISTRY
+from app.core.settings import settings
+from app.services import storage
+
+# Срезы PDF по диапазону страниц для reading-шагов. Срез — производный объект в S3 под ключом,
+# вычисленным из (storage_key, ETag исходника, start, end): режется один раз (ranged-чтение исходника
+# через PDFium), дальше отдаётся presigned-ссылкой. Presigned-ссылки кэшируются как в download_cache.
+# Нарезку ждём не дольше PDF_SLICE_WAIT_SECONDS: дальше она идёт в фоне, а клиент получает 202.
+
+PDF_SLICE = Counter(
+    "pdf_slice_total",
+    "Page-range PDF slice lookups",
+    ["result"],  # url_cached | object_cached | cut | pending
+    registry=REGISTRY,
+)
+
+class SliceOutOfRange(Exception):
+    """Начальная страница за пределами документа."""
+
+class SlicePending(Exception):
+    """Нарезка не уложилась в PDF_SLICE_WAIT_SECONDS и продолжается в фоне."""
+
+@dataclass(frozen=True)
+class SliceLink:
+    url: str
+    expires_at: float  # time.time()
+
+    @property
+    def expires_in(self) -> int:
+        return max(0, int(self.expires_at - time.time()))
+
+_links: TTLCache[SliceLink] = TTLCache(
+    maxsize=settings.DOWNLOAD_URL_CACHE_MAXSIZE,
+    ttl=settings.DOWNLOAD_URL_EXPIRES_SECONDS - settings.DOWNLOAD_URL_SAFETY_MARGIN_SECONDS,
+)
+# (размер, ETag) исходника по (storage_key, version), чтобы не делать HEAD на каждый запрос.
+# Новая версия курса перечитывает сразу; файл шага, заменённый под тем же ключом (версия курса при этом
+# не меняется), подхватывается не позже чем через PDF_SLICE_SOURCE_TTL_SECONDS.
+_sources: TTLCache[tuple[int, str]] = TTLCache(
+    maxsize=settings.DOWNLOAD_URL_CACHE_MAXSIZE,
+    ttl=settings.PDF_SLICE_SOURCE_TTL_SECONDS,
+)
+_inflight: dict[str, asyncio.Task] = {}
+# PDFium не потокобезопасен, а нарезки разных срезов идут в общем пуле потоков — пускаем в него
+# по одной на процесс (воркер ingestion — prefork, там процессы и так однопоточные)
+_PDFIUM_LOCK = threading.Lock()
+
+def slice_key(storage_key: str, etag: str, start: int, end: int) -> str:
+    digest = hashlib.sha256(f"{storage_key}\0{etag}\0{start}\0{end}".encode()).hexdigest()
+    return f"derived/slices/{digest[:2]}/{digest}.pdf"
+
+def _cut(source_key: str, size: int, etag: str, dest_key: str, start: int, end: int) -> None:
+    import pypdfium2 as pdfium
+
+    reader = storage.RangedObjectReader(source_key, size, etag,
+                                        settings.INGEST_RANGE_CHUNK_BYTES, settings.INGEST_RANGE_CACHE_CHUNKS)
+    with _PDFIUM_LOCK:
+        src = pdfium.PdfDocument(reader)
+        dst = pdfium.PdfDocument.new()
+        try:
+            total = len(src)
+            if start > total:
+                raise SliceOutOfRange(f"start_page {start} > {total} pages")
+            dst.import_pages(src, list(range(start - 1, min(end, total))))
+            buf = io.BytesIO()
+            dst.save(buf)
+        finally:
+            dst.close()
+            src.close()
+    storage.put_object(dest_key, buf.getvalue(), "application/pdf")
+
+def _ensure(source_key: str, size: int, etag: str, dest_key: str, start: int, end: int) -> None:
+    if storage.object_exists(dest_key):
+        PDF_SLICE.labels(result="object_cached").inc()
+        return
+    _cut(source_key, size, etag, dest_key, start, end)
+    PDF_SLICE.labels(result="cut").inc()
+
+def _finished(key: str, task: asyncio.Task) -> None:
+    _inflight.pop(key, None)
+    # после 202 результат нарезки никто не ждёт — ошибку хотя бы видно в логах
+    if not task.cancelled() and (exc := task.exception()) is not None and not isinstance(exc, SliceOutOfRange):
+        logger.opt(exception=exc).warning("pdf slice {} failed", key)
+
+async def get_link(storage_key: str, version: int, start: int, end: int, *, filename: str) -> SliceLink:
+    source = _sources.get((storage_key, version))
+    if source is None:
+        source = await asyncio.to_thread(storage.head_object, storage_key)
+        _sources.set((storage_key, version), source)
+    size, etag = source
+    key = slice_key(storage_key, etag, start, end)
+    link = _links.get(key)
+    if link is not None:
+        PDF_SLICE.labels(result="url_cached").inc()
+        return link
+
+    # single-flight в процессе: одновременные запросы одного среза ждут одну нарезку.
+    # Между процессами гонка безвредна — результат детерминирован и ключ тот же.
+    task = _inflight.get(key)
+    if task is None:
+        task = asyncio.ensure_future(asyncio.to_thread(_ensure, storage_key, size, etag, key, start, end))
+        _inflight[key] = task
+        task.add_done_callback(lambda t: _finished(key, t))
+    try:
+        await asyncio.wait_for(asyncio.shield(task), settings.PDF_SLICE_WAIT_SECONDS)
+    except TimeoutError:
+        PDF_SLICE.labels(result="pending").inc()
+        raise SlicePending(f"slice {start}-{end} of {storage_key} is being prepared") from None
+    except ClientError as e:
+        if e.response.get("Error", {}).get("Code") == "PreconditionFailed":
+            # исходник заменили после HEAD — следующий запрос возьмёт новый ETag
+            _sources.pop((storage_key, version))
+        raise
+
+    expires = settings.DOWNLOAD_URL_EXPIRES_SECONDS
+    link = SliceLink(url=storage.presign_get(key, filename=filename, expires=expires), expires_at=time.time() + expires)
+    _links.set(key, link)
+    return link
@@ -0,0 +1,120 @@
+# app/services/progress_buffer.py
+from __future__ import annotations
+import asyncio
+from typing import Optional
+
+from loguru import logger
+from redis.asyncio import Redis
+from redis.commands.core import AsyncScript
+
+from app.core.settings import settings
+from app.db.session import AsyncSessionLocal
+from app.repositories import course_progress_repo
+
+# Write-behind для прогресса чтения PDF: PATCH на каждую страницу пишет только в Redis-хэш
+# progress:{user_id}:{course_id} и помечает его в множестве progress:dirty. Фоновый флашер
+# забирает пачку (SPOP — каждый ключ достаётся одному воркеру) и пишет её одним bulk UPDATE.
+# Хэш удаляется только если с момента чтения в него не писали (seq не изменился).
+#
+# Порядок записей задаёт seq — номер из общего счётчика progress:seq (INCR атомарен и монотонен,
+# в отличие от часов хостов). Он же хранится в course_progress.progress_seq: запоздавший сброс
+# (медленный флашер, повтор после ошибки) строку, уже получившую запись с большим номером, не трогает.
+# Буфер держит только страницу и паузу: progress_percent/«завершён» пишет add_completed_steps.
+
+_DIRTY_KEY = "progress:dirty"
+_SEQ_KEY = "progress:seq"
+_FIELDS = ("current_page", "status")  # progress_percent выводится из шагов и сюда не попадает
+
+# скрипты не привязаны к клиенту (текст — bytes, кодировщик клиента не нужен): sha считается один раз,
+# клиент передаётся при вызове
+_WRITE = AsyncScript(None, b"""
+local seq = redis.call('INCR', KEYS[2])
+redis.call('HSET', KEYS[1], 'current_page', ARGV[1], 'status', ARGV[2], 'seq', seq)
+redis.call('EXPIRE', KEYS[1], ARGV[3])
+redis.call('SADD', KEYS[3], ARGV[4])
+return seq
+""")
+
+_DELETE_IF_SEQ = AsyncScript(None, b"""
+if redis.call('HGET', KEYS[1], 'seq') == ARGV[1] then
+  return redis.call('DEL', KEYS[1])
+end
+return 0
+""")
+
+def _key(user_id: int, course_id: int) -> str:
+    return f"progress:{user_id}:{course_id}"
+
+def _member(user_id: int, course_id: int) -> str:
+    return f"{user_id}:{course_id}"
+
+def _parse(raw: dict) -> Optional[dict[str, int]]:
+    if not raw or not all(f in raw for f in _FIELDS):
+        return None
+    return {f: int(raw[f]) for f in _FIELDS}
+
+async def read(redis: Redis, user_id: int, course_id: int) -> Optional[dict[str, int]]:
+    return _parse(await redis.hgetall(_key(user_id, course_id)))
+
+async def read_many(redis: Redis, user_id: int, course_ids: list[int]) -> dict[int, dict[str, int]]:
+    if not course_ids:
+        return {}
+    pipe = redis.pipeline(transaction=False)
+    for cid in course_ids:
+        pipe.hgetall(_key(user_id, cid))
+    raws = await pipe.execute()
+    return {cid: p for cid, raw in zip(course_ids, raws) if (p := _parse(raw)) is not None}
+
+async def write(redis: Redis, user_id: int, course_id: int, *, current_page: int, status: int) -> None:
+    await _WRITE(
+        keys=[_key(user_id, course_id), _SEQ_KEY, _DIRTY_KEY],
+        args=[current_page, status, settings.PROGRESS_BUFFER_TTL_SECONDS, _member(user_id, course_id)],
+        client=redis,
+    )
+
+async def flush_once(redis: Redis) -> int:
+    members = await redis.spop(_DIRTY_KEY, settings.PROGRESS_FLUSH_BATCH)
+    if not members:
+        return 0
+    pairs = [tuple(int(x) for x in m.split(":")) for m in members]
+    pipe = redis.pipeline(transaction=False)
+    for user_id, course_id in pairs:
+        pipe.hgetall(_key(user_id, course_id))
+    raws = await pipe.execute()
+
+    rows, seqs = [], []
+    for (user_id, course_id), raw in zip(pairs, raws):
+        p = _parse(raw)
+        if p is None or not raw.get("seq"):
+            continue
+        rows.append((user_id, course_id, p["current_page"], p["status"], int(raw["seq"])))
+        seqs.append((user_id, course_id, raw["seq"]))
+
+    try:
+        async with AsyncSessionLocal() as db:
+            await course_progress_repo.bulk_update_progress(db, rows)
+            await db.commit()
+    except Exception:
+        # вернём ключи в очередь — попробуем на следующем тике
+        await redis.sadd(_DIRTY_KEY, *members)
+        raise
+
+    for user_id, course_id, seq in seqs:
+        await _DELETE_IF_SEQ(keys=[_key(user_id, course_id)], args=[seq], client=redis)
+    return len(rows)
+
+async def run_flusher(redis: Redis) -> None:
+    while True:
+        try:
+            await asyncio.sleep(settings.PROGRESS_FLUSH_INTERVAL_SECONDS)
+            # выгребаем всё накопившееся, пачками
+            while await flush_once(redis) >= settings.PROGRESS_FLUSH_BATCH:
+                pass
+        except asyncio.CancelledError:
+            try:
+                await flush_once(redis)  # финальный сброс при остановке
+            except Exception:
+                logger.exception("progress write-behind final flush failed")
+            raise
+        except Exception:
+            logger.exception("progress write-behind flush failed")
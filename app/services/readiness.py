@@ -0,0 +1,99 @@
+# app/services/readiness.py
+from __future__ import annotations
+import asyncio
+import time
+from time import perf_counter
+from typing import Any, Awaitable, Callable
+
+from prometheus_client import Gauge
+from redis.asyncio import Redis
+from sqlalchemy import text
+
+from app.core.observability import REGISTRY
+from app.core.settings import settings
+from app.db.session import engine
+from app.services import storage
+
+# Readiness: Postgres, Redis и S3 проверяются параллельно, каждый со своим таймаутом.
+# Результат кэшируется на HEALTH_CACHE_SECONDS: шторм проб от kubelet стоит одну проверку
+# за интервал, а устаревший результат отдаём сразу и обновляем в фоне.
+
+HEALTH_LATENCY = Gauge(
+    "health_component_latency_seconds",
+    "Latency of the last readiness check per component",
+    ["component"],
+    multiprocess_mode="livemostrecent",
+    registry=REGISTRY,
+)
+HEALTH_UP = Gauge(
+    "health_component_up",
+    "1 if the last readiness check of the component succeeded",
+    ["component"],
+    multiprocess_mode="livemostrecent",
+    registry=REGISTRY,
+)
+
+_cached: dict[str, Any] | None = None
+_cached_at = 0.0
+_refresh_task: asyncio.Task | None = None
+
+async def _timed(name: str, check: Callable[[], Awaitable[dict]], defaults: dict) -> dict:
+    timeout = settings.HEALTH_CHECK_TIMEOUT_SECONDS
+    t0 = perf_counter()
+    try:
+        extra = await asyncio.wait_for(check(), timeout=timeout)
+        ok, err = True, None
+    except asyncio.TimeoutError:
+        extra, ok, err = {}, False, f"timeout after {timeout}s"
+    except Exception as e:
+        extra, ok, err = {}, False, str(e)
+    elapsed = perf_counter() - t0
+    HEALTH_LATENCY.labels(component=name).set(elapsed)
+    HEALTH_UP.labels(component=name).set(1 if ok else 0)
+    return {"ok": ok, "latency_ms": round(elapsed * 1000, 2), **defaults, **extra, "error": err}
+
+async def _check_postgres() -> dict:
+    async with engine.connect() as conn:
+        ver = await conn.execute(text("select version()"))
+        return {"version": ver.scalar_one()}
+
+def _check_redis(redis: Redis) -> Callable[[], Awaitable[dict]]:
+    async def check() -> dict:
+        if not await redis.ping():
+            raise RuntimeError("no PONG")
+        return {}
+    return check
+
+async def _check_s3() -> dict:
+    # head_bucket синхронный — head_bucket_async гоняет его в потоке, не блокируя loop
+    if not await storage.head_bucket_async():
+        raise RuntimeError("head_bucket failed")
+    return {}
+
+async def run_checks(redis: Redis) -> dict:
+    pg, rd, s3 = await asyncio.gather(
+        _timed("postgres", _check_postgres, {"version": None}),
+        _timed("redis", _check_redis(redis), {}),
+        _timed("s3", _check_s3, {"bucket": settings.S3_BUCKET}),
+    )
+    status = "ok"
+    if not (rd["ok"] and s3["ok"]):
+        status = "degraded"
+    if not pg["ok"]:
+        status = "critical"
+    return {"status": status, "components": {"postgres": pg, "redis": rd, "s3": s3}}
+
+async def _refresh(redis: Redis) -> None:
+    global _cached, _cached_at
+    _cached = await run_checks(redis)
+    _cached_at = time.monotonic()
+
+async def get_readiness(redis: Redis) -> dict:
+    global _refresh_task
+    stale = _cached is None or time.monotonic() - _cached_at >= settings.HEALTH_CACHE_SECONDS
+    if stale and (_refresh_task is None or _refresh_task.done()):
+        # single-flight: одна проверка на интервал, сколько бы проб ни пришло
+        _refresh_task = asyncio.create_task(_refresh(redis))
+    if _cached is None:
+        await asyncio.shield(_refresh_task)
+    return {**_cached, "age_seconds": round(time.monotonic() - _cached_at, 2)}
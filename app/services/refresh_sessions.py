@@ -0,0 +1,111 @@
+# app/services/refresh_sessions.py
+from __future__ import annotations
+import time
+from datetime import timedelta
+
+from redis.asyncio import Redis
+from redis.commands.core import AsyncScript
+
+from app.core.settings import settings
+
+# Refresh-токены: refresh:{user_id}:jti -> user_id (источник истины) + индекс живых сессий пользователя
+# sessions:{user_id} — ZSET jti со score = время истечения. Все изменения — одним Lua-скриптом,
+# т.е. атомарно и за один round trip; «выйти везде» и список сессий — O(сессий), без SCAN.
+# Скрипты трогают только ключи из KEYS, а hash tag {user_id} кладёт все ключи пользователя в один слот
+# Redis Cluster. Ключи старого формата (refresh:jti, sessions:uid) переносит app.scripts.migrate_refresh_keys.
+
+_STORE = """
+redis.call('SET', KEYS[1], ARGV[1], 'EX', ARGV[3])
+redis.call('ZREMRANGEBYSCORE', KEYS[2], '-inf', ARGV[4])
+redis.call('ZADD', KEYS[2], ARGV[5], ARGV[2])
+redis.call('EXPIRE', KEYS[2], ARGV[3])
+return 1
+"""
+
+# KEYS: refresh:old, refresh:new, sessions:uid; ARGV: uid, old_jti, new_jti, ttl, now, new_exp
+_ROTATE = """
+local uid = redis.call('GET', KEYS[1])
+if not uid then return 0 end
+redis.call('DEL', KEYS[1])
+redis.call('ZREM', KEYS[3], ARGV[2])
+if uid ~= ARGV[1] then return 0 end
+redis.call('SET', KEYS[2], ARGV[1], 'EX', ARGV[4])
+redis.call('ZREMRANGEBYSCORE', KEYS[3], '-inf', ARGV[5])
+redis.call('ZADD', KEYS[3], ARGV[6], ARGV[3])
+redis.call('EXPIRE', KEYS[3], ARGV[4])
+return 1
+"""
+
+_REVOKE = """
+redis.call('DEL', KEYS[1])
+redis.call('ZREM', KEYS[2], ARGV[1])
+return 1
+"""
+
+# KEYS: sessions:{uid}, refresh:{uid}:jti...; ARGV: те же jti по порядку
+_REVOKE_ALL = """
+for i, jti in ipairs(ARGV) do
+  redis.call('DEL', KEYS[i + 1])
+  redis.call('ZREM', KEYS[1], jti)
+end
+return #ARGV
+"""
+
+_REVOKE_BATCH = 500
+_scripts: dict[str, AsyncScript] = {}
+
+def _refresh_key(user_id: int, jti: str) -> str:
+    return f"refresh:{{{user_id}}}:{jti}"
+
+def _sessions_key(user_id: int) -> str:
+    return f"sessions:{{{user_id}}}"
+
+def _ttl() -> int:
+    return int(timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS).total_seconds())
+
+def _script(redis: Redis, name: str, source: str) -> AsyncScript:
+    # sha считается один раз; EVALSHA с fallback на EVAL делает сам redis-py
+    if name not in _scripts:
+        _scripts[name] = redis.register_script(source)
+    return _scripts[name]
+
+async def store(redis: Redis, jti: str, user_id: int) -> None:
+    now, ttl = int(time.time()), _ttl()
+    await _script(redis, "store", _STORE)(
+        keys=[_refresh_key(user_id, jti), _sessions_key(user_id)],
+        args=[user_id, jti, ttl, now, now + ttl],
+        client=redis,
+    )
+
+async def rotate(redis: Redis, old_jti: str, new_jti: str, user_id: int) -> bool:
+    """Атомарно гасит old_jti и заводит new_jti. False — токен уже использован/истёк/чужой."""
+    now, ttl = int(time.time()), _ttl()
+    ok = await _script(redis, "rotate", _ROTATE)(
+        keys=[_refresh_key(user_id, old_jti), _refresh_key(user_id, new_jti), _sessions_key(user_id)],
+        args=[user_id, old_jti, new_jti, ttl, now, now + ttl],
+        client=redis,
+    )
+    return bool(int(ok))
+
+async def revoke(redis: Redis, jti: str, user_id: int) -> None:
+    await _script(redis, "revoke", _REVOKE)(
+        keys=[_refresh_key(user_id, jti), _sessions_key(user_id)], args=[jti], client=redis,
+    )
+
+async def revoke_all(redis: Redis, user_id: int) -> int:
+    # имена ключей скрипт должен получить в KEYS, поэтому jti читаем заранее, пачками. Сессия, заведённая
+    # между ZRANGE и скриптом, останется в индексе — цикл идёт, пока индекс не опустеет
+    key, revoked = _sessions_key(user_id), 0
+    while True:
+        jtis = await redis.zrange(key, 0, _REVOKE_BATCH - 1)
+        if not jtis:
+            return revoked
+        await _script(redis, "revoke_all", _REVOKE_ALL)(
+            keys=[key, *(_refresh_key(user_id, jti) for jti in jtis)], args=jtis, client=redis,
+        )
+        revoked += len(jtis)
+
+async def list_sessions(redis: Redis, user_id: int) -> list[tuple[str, int]]:
+    # (jti, expires_at) живых сессий; протухшие отфильтровываем по score
+    rows = await redis.zrangebyscore(_sessions_key(user_id), int(time.time()), "+inf", withscores=True)
+    return [(jti, int(score)) for jti, score in rows]
@@ -0,0 +1,99 @@
+# app/services/step_cache.py
+from __future__ import annotations
+
+from loguru import logger
+from prometheus_client import Counter
+from pydantic import TypeAdapter
+from redis.asyncio import Redis
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.cache import TTLCache
+from app.core.observability import REGISTRY
+from app.core.settings import settings
+from app.repositories import course_step_repo
+from app.schemas.steps import CourseStepRead
+
+# Каталог шагов меняется только при create_step, а читается на каждом открытии курса.
+# Храним уже сериализованный JSON ответа; ключ содержит версию контента курса,
+# которую create_step инкрементит — старые записи просто перестают читаться и истекают по TTL.
+# Ключ версии обязан пережить все тела: если он истечёт раньше, версия «сбросится» к 0 и снова
+# найдётся давно устаревшее тело v0. Поэтому каждая запись тела и каждый bump продлевают ключ версии
+# до (TTL тела + запас).
+
+STEP_CACHE = Counter(
+    "step_catalogue_cache_total",
+    "Course step catalogue cache lookups",
+    ["result"],  # local | redis | miss
+    registry=REGISTRY,
+)
+
+_steps_adapter = TypeAdapter(list[CourseStepRead])
+_versions: TTLCache[int] = TTLCache(
+    maxsize=settings.STEP_CACHE_LOCAL_MAXSIZE, ttl=settings.STEP_CACHE_VERSION_TTL_SECONDS,
+)
+_bodies: TTLCache[bytes] = TTLCache(
+    maxsize=settings.STEP_CACHE_LOCAL_MAXSIZE, ttl=settings.STEP_CACHE_LOCAL_TTL_SECONDS,
+)
+
+_VERSION_TTL_SECONDS = settings.STEP_CACHE_REDIS_TTL_SECONDS + 3_600
+
+def _version_key(course_id: int) -> str:
+    return f"course:{course_id}:steps_ver"
+
+def _body_key(course_id: int, version: int) -> str:
+    return f"course:{course_id}:steps:v{version}"
+
+async def _get_version(redis: Redis, course_id: int) -> int:
+    ver = _versions.get(course_id)
+    if ver is None:
+        ver = int(await redis.get(_version_key(course_id)) or 0)
+        _versions.set(course_id, ver)
+    return ver
+
+async def get_steps_json(db: AsyncSession, redis: Redis, course_id: int) -> bytes:
+    try:
+        ver = await _get_version(redis, course_id)
+    except Exception:
+        ver = None  # Redis недоступен — работаем без кэша
+
+    if ver is not None:
+        body = _bodies.get((course_id, ver))
+        if body is not None:
+            STEP_CACHE.labels(result="local").inc()
+            return body
+        try:
+            cached = await redis.get(_body_key(course_id, ver))
+        except Exception:
+            cached = None
+        if cached is not None:
+            body = cached.encode() if isinstance(cached, str) else cached
+            _bodies.set((course_id, ver), body)
+            STEP_CACHE.labels(result="redis").inc()
+            return body
+
+    STEP_CACHE.labels(result="miss").inc()
+    steps = await course_step_repo.list_by_course(db, course_id)
+    body = _steps_adapter.dump_json(_steps_adapter.validate_python(steps, from_attributes=True))
+    if ver is not None:
+        _bodies.set((course_id, ver), body)
+        try:
+            async with redis.pipeline(transaction=False) as pipe:
+                pipe.set(_body_key(course_id, ver), body, ex=settings.STEP_CACHE_REDIS_TTL_SECONDS)
+                pipe.expire(_version_key(course_id), _VERSION_TTL_SECONDS)
+                await pipe.execute()
+        except Exception:
+            pass
+    return body
+
+async def bump_version(redis: Redis, course_id: int) -> None:
+    # вызывать после коммита изменения шагов курса. Ошибку Redis не пробрасываем: запись уже
+    # закоммичена, и 500 в ответ на успешное создание шага хуже, чем устаревший каталог
+    # (локально — до STEP_CACHE_LOCAL_TTL_SECONDS, в Redis — до STEP_CACHE_REDIS_TTL_SECONDS)
+    _versions.pop(course_id)
+    try:
+        async with redis.pipeline(transaction=True) as pipe:
+            pipe.incr(_version_key(course_id))
+            pipe.expire(_version_key(course_id), _VERSION_TTL_SECONDS)
+            await pipe.execute()
+    except Exception as e:
+        logger.warning("step cache version bump failed for course {}: {}", course_id, e)
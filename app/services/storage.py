@@ -1,17 +1,39 @@
 from __future__ import annotations
+import asyncio
+import io
+import threading
+from collections import OrderedDict
 import boto3
 from botocore.client import Config
+from botocore.exceptions import ClientError
 from app.core.settings import settings
 from urllib.parse import urlparse, urlunparse
 
+# Один долгоживущий клиент на процесс: создание клиента — миллисекунды CPU и аллокаций,
+# а сам клиент потокобезопасен и держит пул соединений.
+_client = None
+_client_lock = threading.Lock()
+
 def _s3():
-    return boto3.client(
-        "s3",
-        endpoint_url=settings.S3_ENDPOINT,
-        aws_access_key_id=settings.S3_ACCESS_KEY,
-        aws_secret_access_key=settings.S3_SECRET_KEY,
-        region_name=settings.S3_REGION,
-    )
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = boto3.client(
+                    "s3",
+                    endpoint_url=settings.S3_ENDPOINT,
+                    aws_access_key_id=settings.S3_ACCESS_KEY,
+                    aws_secret_access_key=settings.S3_SECRET_KEY,
+                    region_name=settings.S3_REGION,
+                    config=Config(
+                        max_pool_connections=settings.S3_MAX_POOL_CONNECTIONS,
+                        connect_timeout=settings.S3_CONNECT_TIMEOUT_SECONDS,
+                        read_timeout=settings.S3_READ_TIMEOUT_SECONDS,
+                        retries={"max_attempts": 2, "mode": "standard"},
+                        tcp_keepalive=True,
+                    ),
+                )
+    return _client
 
 def _rewrite_public(url: str) -> str:
     pe = settings.S3_PUBLIC_ENDPOINT
@@ -20,6 +42,7 @@ def _rewrite_public(url: str) -> str:
     pub, u = urlparse(pe), urlparse(url)
     return urlunparse(u._replace(scheme=pub.scheme, netloc=pub.netloc))
 
+# presign_* — чистый CPU (подпись HMAC, без сети), их можно звать прямо из async-кода
 def presign_put(key: str, content_type: str = "application/pdf", expires: int = 900) -> str:
     # ВАЖНО: НЕ переписываем на S3_PUBLIC_ENDPOINT!
     url = _s3().generate_presigned_url(
@@ -44,9 +67,114 @@ def presign_get(key: str, *, filename: str | None = None, expires: int = 900) ->
     )
     return _rewrite_public(url)  # <-- переписываем только GET
 
+# сетевые вызовы — синхронные; из async-кода только через *_async (в пуле потоков, с таймаутом)
 def head_bucket() -> bool:
     try:
         _s3().head_bucket(Bucket=settings.S3_BUCKET)
         return True
     except Exception:
         return False
+
+async def head_bucket_async(timeout: float | None = None) -> bool:
+    timeout = settings.S3_HEAD_TIMEOUT_SECONDS if timeout is None else timeout
+    try:
+        return await asyncio.wait_for(asyncio.to_thread(head_bucket), timeout=timeout)
+    except asyncio.TimeoutError:
+        return False
+
+# ---- multipart upload (потоковая загрузка курса без буферизации всего файла) ----
+def create_multipart(key: str, content_type: str = "application/pdf") -> str:
+    res = _s3().create_multipart_upload(Bucket=settings.S3_BUCKET, Key=key, ContentType=content_type)
+    return res["UploadId"]
+
+def upload_part(key: str, upload_id: str, part_number: int, body: bytes) -> str:
+    res = _s3().upload_part(
+        Bucket=settings.S3_BUCKET, Key=key, UploadId=upload_id, PartNumber=part_number, Body=body,
+    )
+    return res["ETag"]
+
+def complete_multipart(key: str, upload_id: str, etags: list[str]) -> None:
+    _s3().complete_multipart_upload(
+        Bucket=settings.S3_BUCKET, Key=key, UploadId=upload_id,
+        MultipartUpload={"Parts": [{"ETag": etag, "PartNumber": i} for i, etag in enumerate(etags, start=1)]},
+    )
+
+def abort_multipart(key: str, upload_id: str) -> None:
+    _s3().abort_multipart_upload(Bucket=settings.S3_BUCKET, Key=key, UploadId=upload_id)
+
+def delete_object(key: str) -> None:
+    _s3().delete_object(Bucket=settings.S3_BUCKET, Key=key)
+
+# ---- ranged-чтение и запись производных (PDF ingestion, срезы страниц) ----
+def head_object(key: str) -> tuple[int, str]:
+    """(размер, ETag) объекта."""
+    res = _s3().head_object(Bucket=settings.S3_BUCKET, Key=key)
+    return res["ContentLength"], res["ETag"].strip('"')
+
+def get_range(key: str, start: int, end: int, etag: str | None = None) -> bytes:
+    """Байты [start, end] включительно. С etag — 412, если объект успели подменить."""
+    params = {"Bucket": settings.S3_BUCKET, "Key": key, "Range": f"bytes={start}-{end}"}
+    if etag:
+        params["IfMatch"] = etag
+    return _s3().get_object(**params)["Body"].read()
+
+def put_object(key: str, body: bytes, content_type: str) -> None:
+    _s3().put_object(Bucket=settings.S3_BUCKET, Key=key, Body=body, ContentType=content_type)
+
+def object_exists(key: str) -> bool:
+    try:
+        _s3().head_object(Bucket=settings.S3_BUCKET, Key=key)
+        return True
+    except ClientError as e:
+        if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+            return False
+        raise
+
+class RangedObjectReader(io.RawIOBase):
+    """Seekable read-only файл поверх объекта S3: читает выровненными чанками, держит LRU чанков."""
+
+    def __init__(self, key: str, size: int, etag: str, chunk_size: int, max_chunks: int):
+        self.key, self.size, self.etag = key, size, etag
+        self.chunk_size, self.max_chunks = chunk_size, max_chunks
+        self._pos = 0
+        self._chunks: OrderedDict[int, bytes] = OrderedDict()
+        self.fetched = 0  # для логов: сколько ranged GET сделали
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self._pos
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        base = {io.SEEK_SET: 0, io.SEEK_CUR: self._pos, io.SEEK_END: self.size}[whence]
+        self._pos = max(0, base + offset)
+        return self._pos
+
+    def _chunk(self, idx: int) -> bytes:
+        data = self._chunks.get(idx)
+        if data is not None:
+            self._chunks.move_to_end(idx)
+            return data
+        start = idx * self.chunk_size
+        end = min(self.size, start + self.chunk_size) - 1
+        data = get_range(self.key, start, end, etag=self.etag)
+        self.fetched += 1
+        self._chunks[idx] = data
+        while len(self._chunks) > self.max_chunks:
+            self._chunks.popitem(last=False)
+        return data
+
+    def readinto(self, b) -> int:
+        view = memoryview(b).cast("B")
+        n = 0
+        while n < len(view) and self._pos < self.size:
+            idx, off = divmod(self._pos, self.chunk_size)
+            piece = self._chunk(idx)[off: off + len(view) - n]
+            view[n: n + len(piece)] = piece
+            n += len(piece)
+            self._pos += len(piece)
+        return n
@@ -0,0 +1,121 @@
+# app/services/user_cache.py
+from __future__ import annotations
+import asyncio
+import json
+from typing import Any, Optional
+
+from loguru import logger
+from prometheus_client import Counter
+from redis.asyncio import Redis
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.cache import TTLCache
+from app.core.observability import REGISTRY
+from app.core.settings import settings
+from app.models.user import User, GenderEnum, RoleEnum
+
+# Кэш «принципала» для get_current_user: L1 — LRU в процессе (короткий TTL), L2 — Redis, дальше Postgres.
+# password_hash в кэш не кладём — для авторизации он не нужен.
+# L1 у каждого воркера свой: invalidate публикует id в канал Redis, и run_invalidation_listener
+# (фоновая задача lifespan) сбрасывает запись во всех процессах. Если сообщение потерялось
+# (переподключение), устаревшая запись живёт не дольше USER_CACHE_LOCAL_TTL_SECONDS.
+_FIELDS = ("id", "email", "locale", "is_active", "city", "country", "phone", "gender", "role")
+
+USER_CACHE_HITS = Counter(
+    "user_cache_hits_total",
+    "Authenticated user cache hits",
+    ["tier"],
+    registry=REGISTRY,
+)
+
+USER_CACHE_MISSES = Counter(
+    "user_cache_misses_total",
+    "Authenticated user cache misses (loaded from Postgres)",
+    registry=REGISTRY,
+)
+
+_local: TTLCache[dict[str, Any]] = TTLCache(
+    maxsize=settings.USER_CACHE_LOCAL_MAXSIZE,
+    ttl=settings.USER_CACHE_LOCAL_TTL_SECONDS,
+)
+_redis: Redis | None = None
+
+def bind_redis(redis: Redis | None) -> None:
+    # вызывается из lifespan; без Redis работаем только с локальным уровнем
+    global _redis
+    _redis = redis
+
+def _key(user_id: int) -> str:
+    return f"user:principal:{user_id}"
+
+_INVALIDATE_CHANNEL = "user:principal:invalidate"
+_RESUBSCRIBE_DELAY_SECONDS = 1.0
+
+def _dump(user: User) -> dict[str, Any]:
+    data = {f: getattr(user, f) for f in _FIELDS}
+    data["gender"] = getattr(user.gender, "value", user.gender)
+    data["role"] = getattr(user.role, "value", user.role)
+    return data
+
+def _load(data: dict[str, Any]) -> User:
+    # transient-объект, к сессии не привязан — только для чтения в обработчиках.
+    # enum'ы восстанавливаем явно: обработчики смотрят на .role.value
+    data = dict(data)
+    data["gender"] = GenderEnum(data["gender"]) if data["gender"] else None
+    data["role"] = RoleEnum(data["role"])
+    return User(**data)
+
+async def get_user(db: AsyncSession, user_id: int) -> Optional[User]:
+    data = _local.get(user_id)
+    if data is not None:
+        USER_CACHE_HITS.labels(tier="local").inc()
+        return _load(data)
+
+    if _redis is not None:
+        try:
+            raw = await _redis.get(_key(user_id))
+        except Exception:
+            raw = None  # Redis недоступен — идём в БД
+        if raw:
+            data = json.loads(raw)
+            _local.set(user_id, data)
+            USER_CACHE_HITS.labels(tier="redis").inc()
+            return _load(data)
+
+    USER_CACHE_MISSES.inc()
+    user = await db.get(User, user_id)
+    if user is None:
+        return None
+    data = _dump(user)
+    _local.set(user_id, data)
+    if _redis is not None:
+        try:
+            await _redis.set(_key(user_id), json.dumps(data), ex=settings.USER_CACHE_REDIS_TTL_SECONDS)
+        except Exception:
+            pass
+    return user
+
+async def invalidate(user_id: int) -> None:
+    _local.pop(user_id)
+    if _redis is not None:
+        try:
+            await _redis.delete(_key(user_id))
+            await _redis.publish(_INVALIDATE_CHANNEL, str(user_id))
+        except Exception:
+            pass
+
+async def run_invalidation_listener(redis: Redis) -> None:
+    while True:
+        try:
+            async with redis.pubsub() as pubsub:
+                await pubsub.subscribe(_INVALIDATE_CHANNEL)
+                # пока подписки не было, сообщения могли пройти мимо — L1 целиком не доверяем
+                _local.clear()
+                async for message in pubsub.listen():
+                    if message["type"] == "message":
+                        _local.pop(int(message["data"]))
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning("user cache invalidation listener failed: {}", e)
+            await asyncio.sleep(_RESUBSCRIBE_DELAY_SECONDS)
@@ -0,0 +1,17 @@
+# app/tasks/celery_app.py
+# Запуск воркера: celery -A app.tasks.celery_app worker -Q ingest --concurrency 2
+from celery import Celery
+
+from app.core.settings import settings
+
+celery_app = Celery("mentalmentor", broker=settings.celery_broker, include=["app.tasks.pdf_ingest"])
+celery_app.conf.update(
+    task_default_queue="default",
+    task_routes={"app.tasks.pdf_ingest.*": {"queue": "ingest"}},
+    # задача подтверждается после выполнения: упавший воркер -> задачу заберёт другой (задачи идемпотентны)
+    task_acks_late=True,
+    task_reject_on_worker_lost=True,
+    worker_prefetch_multiplier=1,
+    task_ignore_result=True,
+    broker_connection_retry_on_startup=True,
+)
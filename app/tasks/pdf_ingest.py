@@ -0,0 +1,165 @@
+# app/tasks/pdf_ingest.py
+from __future__ import annotations
+import asyncio
+import io
+import threading
+import uuid
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+from botocore.exceptions import BotoCoreError, ClientError
+from loguru import logger
+from redis import Redis, RedisError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import NullPool
+
+from app.core.settings import settings
+from app.repositories import course_repo, course_page_repo
+from app.services import storage
+from app.services.storage import RangedObjectReader
+from app.tasks.celery_app import celery_app
+
+# Ingestion PDF курса: число страниц, текст каждой страницы и миниатюры.
+# PDF читается из S3 ranged GET'ами по мере надобности (PDFium ходит по xref, а не по всему файлу),
+# миниатюры пишутся по детерминированным ключам, строки — апсертом; готовность фиксируется ETag'ом
+# объекта в courses.pdf_ingested_etag. Поэтому задачу можно безопасно повторять и запускать на многих воркерах.
+
+def thumbnail_key(course_id: int, etag: str, page_no: int) -> str:
+    return f"thumbnails/courses/{course_id}/{etag}/{page_no}.jpg"
+
+def extract_pages(course_id: int, reader: RangedObjectReader) -> list[tuple[int, str, Optional[str]]]:
+    """Текст и миниатюра каждой страницы; миниатюры сразу уходят в S3. Возвращает строки для course_pages."""
+    import pypdfium2 as pdfium  # только в воркере
+
+    rows: list[tuple[int, str, Optional[str]]] = []
+    pdf = pdfium.PdfDocument(reader)
+    try:
+        for i in range(len(pdf)):
+            page = pdf[i]
+            try:
+                textpage = page.get_textpage()
+                text = textpage.get_text_range()
+                textpage.close()
+                width = page.get_width() or 1
+                image = page.render(scale=settings.INGEST_THUMBNAIL_WIDTH / width).to_pil()
+                buf = io.BytesIO()
+                image.convert("RGB").save(buf, format="JPEG", quality=80)
+            finally:
+                page.close()
+            key = thumbnail_key(course_id, reader.etag, i + 1)
+            storage.put_object(key, buf.getvalue(), "image/jpeg")
+            rows.append((i + 1, text.replace("\x00", ""), key))
+    finally:
+        pdf.close()
+    return rows
+
+# ---- БД: воркер — отдельный процесс без event loop, поэтому короткие asyncio.run и NullPool ----
+_engine = None
+
+def _sessionmaker() -> async_sessionmaker[AsyncSession]:
+    global _engine
+    if _engine is None:
+        _engine = create_async_engine(settings.db_url, poolclass=NullPool)
+    return async_sessionmaker(bind=_engine, expire_on_commit=False, autoflush=False)
+
+async def _load(course_id: int) -> Optional[tuple[str, Optional[str]]]:
+    async with _sessionmaker()() as db:
+        course = await course_repo.get_by_id(db, course_id)
+        return (course.storage_key, course.pdf_ingested_etag) if course else None
+
+async def _save(course_id: int, storage_key: str, etag: str, rows: list[tuple[int, str, Optional[str]]]) -> bool:
+    async with _sessionmaker()() as db:
+        if not await course_repo.mark_ingested(db, course_id, storage_key=storage_key, etag=etag, pdf_pages=len(rows)):
+            await db.rollback()
+            return False
+        await course_page_repo.replace_pages(db, course_id, rows)
+        await db.commit()
+        return True
+
+# ---- блокировка: один курс обрабатывает один воркер ----
+_RELEASE = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then return redis.call('DEL', KEYS[1]) end
+return 0
+"""
+_EXTEND = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then return redis.call('EXPIRE', KEYS[1], ARGV[2]) end
+return 0
+"""
+_redis: Redis | None = None
+
+def _lock_client() -> Redis:
+    global _redis
+    if _redis is None:
+        _redis = Redis.from_url(settings.redis_dsn, decode_responses=True)
+    return _redis
+
+@contextmanager
+def _course_lock(course_id: int) -> Iterator[bool]:
+    """
+    Блокировка курса на INGEST_LOCK_SECONDS; пока воркер работает, фоновый поток продлевает её
+    каждые INGEST_LOCK_SECONDS / 3 — большой PDF не теряет блокировку посреди обработки.
+    Отдаёт False, если курс уже держит другой воркер.
+    """
+    redis, ttl = _lock_client(), settings.INGEST_LOCK_SECONDS
+    key, token = f"ingest:lock:{course_id}", uuid.uuid4().hex
+    if not redis.set(key, token, nx=True, ex=ttl):
+        yield False
+        return
+
+    stop = threading.Event()
+    extend = redis.register_script(_EXTEND)
+
+    def keep_alive() -> None:
+        while not stop.wait(ttl / 3):
+            try:
+                if not extend(keys=[key], args=[token, ttl]):
+                    logger.warning("ingest lock for course {} was lost", course_id)
+                    return
+            except RedisError:
+                # до истечения TTL есть ещё две попытки
+                logger.warning("failed to extend ingest lock for course {}", course_id)
+
+    keeper = threading.Thread(target=keep_alive, name=f"ingest-lock-{course_id}", daemon=True)
+    keeper.start()
+    try:
+        yield True
+    finally:
+        stop.set()
+        keeper.join()
+        redis.register_script(_RELEASE)(keys=[key], args=[token])
+
+@celery_app.task(
+    bind=True,
+    name="app.tasks.pdf_ingest.ingest_course_pdf",
+    autoretry_for=(BotoCoreError, ClientError, OSError),
+    retry_backoff=True,
+    max_retries=5,
+)
+def ingest_course_pdf(self, course_id: int, force: bool = False) -> None:
+    with _course_lock(course_id) as acquired:
+        if not acquired:
+            # курс уже обрабатывается — проверим позже (вдруг там был старый файл). Это не сбой:
+            # ставим задачу заново с тем же счётчиком попыток, а не через self.retry, который тратит max_retries
+            self.apply_async((course_id,), {"force": force}, countdown=30, retries=self.request.retries)
+            return
+        loaded = asyncio.run(_load(course_id))
+        if loaded is None:
+            return
+        storage_key, ingested_etag = loaded
+        size, etag = storage.head_object(storage_key)
+        if etag == ingested_etag and not force:
+            logger.info("course {} already ingested (etag {})", course_id, etag)
+            return
+        reader = RangedObjectReader(storage_key, size, etag,
+                                    settings.INGEST_RANGE_CHUNK_BYTES, settings.INGEST_RANGE_CACHE_CHUNKS)
+        rows = extract_pages(course_id, reader)
+        saved = asyncio.run(_save(course_id, storage_key, etag, rows))
+        logger.info("course {} ingested: {} pages, {} ranged reads of {} bytes, saved={}",
+                    course_id, len(rows), reader.fetched, size, saved)
+
+async def enqueue(course_id: int) -> None:
+    # вызывается из API после commit; недоступный брокер не должен ломать создание курса
+    try:
+        await asyncio.to_thread(ingest_course_pdf.delay, course_id)
+    except Exception:
+        logger.exception("failed to enqueue pdf ingestion for course {}", course_id)
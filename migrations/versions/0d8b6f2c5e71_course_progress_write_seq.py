@@ -0,0 +1,26 @@
+"""course progress write sequence
+
+Revision ID: 0d8b6f2c5e71
+Revises: c9d4a1e7f3b2
+Create Date: 2026-10-18 15:02:44.310872
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0d8b6f2c5e71'
+down_revision: Union[str, None] = 'c9d4a1e7f3b2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('course_progress', sa.Column('progress_seq', sa.BigInteger(), server_default='0', nullable=False))
+
+
+def downgrade() -> None:
+    op.drop_column('course_progress', 'progress_seq')
@@ -0,0 +1,26 @@
+"""course content sha256
+
+Revision ID: 5f0b8d3e6a19
+Revises: e41a9c07d2b6
+Create Date: 2026-10-18 14:02:51.337610
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5f0b8d3e6a19'
+down_revision: Union[str, None] = 'e41a9c07d2b6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('courses', sa.Column('content_sha256', sa.String(length=64), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('courses', 'content_sha256')
@@ -0,0 +1,27 @@
+"""keyset pagination indexes
+
+Revision ID: 7c1e2f9a4b30
+Revises: 003586e204cb
+Create Date: 2026-10-18 10:12:04.118203
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7c1e2f9a4b30'
+down_revision: Union[str, None] = '003586e204cb'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # courses: WHERE is_public ORDER BY id DESC -> index range scan вместо OFFSET
+    op.create_index('ix_courses_public_id', 'courses', ['is_public', 'id'], unique=False)
+    # notebook_entries: (user_id, entry_date) уже покрыт уникальным uq_notebook_user_date
+
+
+def downgrade() -> None:
+    op.drop_index('ix_courses_public_id', table_name='courses')
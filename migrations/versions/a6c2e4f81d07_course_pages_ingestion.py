@@ -0,0 +1,39 @@
+"""course pages ingestion
+
+Revision ID: a6c2e4f81d07
+Revises: 5f0b8d3e6a19
+Create Date: 2026-10-18 14:48:12.604418
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a6c2e4f81d07'
+down_revision: Union[str, None] = '5f0b8d3e6a19'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('courses', sa.Column('pdf_ingested_etag', sa.String(length=128), nullable=True))
+    op.create_table('course_pages',
+        sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('course_id', sa.Integer(), nullable=False),
+        sa.Column('page_no', sa.Integer(), nullable=False),
+        sa.Column('text', sa.Text(), nullable=False),
+        sa.Column('thumbnail_key', sa.String(length=512), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.ForeignKeyConstraint(['course_id'], ['courses.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('course_id', 'page_no', name='uq_course_page')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('course_pages')
+    op.drop_column('courses', 'pdf_ingested_etag')
@@ -0,0 +1,29 @@
+"""course step counters
+
+Revision ID: b83d5e17c2a4
+Revises: 7c1e2f9a4b30
+Create Date: 2026-10-18 12:41:27.550913
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b83d5e17c2a4'
+down_revision: Union[str, None] = '7c1e2f9a4b30'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('courses', sa.Column('steps_count', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('course_progress', sa.Column('completed_steps', sa.Integer(), server_default='0', nullable=False))
+    # значения для существующих данных: python -m app.scripts.backfill_step_counters
+
+
+def downgrade() -> None:
+    op.drop_column('course_progress', 'completed_steps')
+    op.drop_column('courses', 'steps_count')
@@ -0,0 +1,40 @@
+"""notebook full text search
+
+Revision ID: c9d4a1e7f3b2
+Revises: a6c2e4f81d07
+Create Date: 2026-10-18 15:31:08.271954
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c9d4a1e7f3b2'
+down_revision: Union[str, None] = 'a6c2e4f81d07'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # btree_gin — чтобы user_id жил в том же GIN-индексе, что и tsvector (trusted extension с PG 13)
+    op.execute('CREATE EXTENSION IF NOT EXISTS btree_gin')
+    op.add_column('notebook_entries', sa.Column(
+        'search_vector', postgresql.TSVECTOR(),
+        sa.Computed(
+            "setweight(to_tsvector('russian', coalesce(title, '')), 'A') || "
+            "setweight(to_tsvector('russian', coalesce(content, '')), 'B')",
+            persisted=True,
+        ),
+        nullable=True,
+    ))
+    op.create_index('ix_notebook_entries_user_search', 'notebook_entries', ['user_id', 'search_vector'],
+                    unique=False, postgresql_using='gin')
+
+
+def downgrade() -> None:
+    op.drop_index('ix_notebook_entries_user_search', table_name='notebook_entries', postgresql_using='gin')
+    op.drop_column('notebook_entries', 'search_vector')
@@ -0,0 +1,44 @@
+"""delta sync: updated_at indexes and tombstones
+
+Revision ID: e41a9c07d2b6
+Revises: b83d5e17c2a4
+Create Date: 2026-10-18 13:20:44.903115
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e41a9c07d2b6'
+down_revision: Union[str, None] = 'b83d5e17c2a4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('course_step_progress', sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False))
+    op.create_index('ix_notebook_entries_user_updated', 'notebook_entries', ['user_id', 'updated_at'], unique=False)
+    op.create_index('ix_course_progress_user_updated', 'course_progress', ['user_id', 'updated_at'], unique=False)
+    op.create_index('ix_course_step_progress_user_updated', 'course_step_progress', ['user_id', 'updated_at'], unique=False)
+    op.create_table('sync_tombstones',
+        sa.Column('id', sa.BigInteger(), autoincrement=True, nullable=False),
+        sa.Column('user_id', sa.BigInteger(), nullable=False),
+        sa.Column('entity', sa.String(length=32), nullable=False),
+        sa.Column('entity_id', sa.Integer(), nullable=False),
+        sa.Column('deleted_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_sync_tombstones_user_deleted', 'sync_tombstones', ['user_id', 'deleted_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_sync_tombstones_user_deleted', table_name='sync_tombstones')
+    op.drop_table('sync_tombstones')
+    op.drop_index('ix_course_step_progress_user_updated', table_name='course_step_progress')
+    op.drop_index('ix_course_progress_user_updated', table_name='course_progress')
+    op.drop_index('ix_notebook_entries_user_updated', table_name='notebook_entries')
+    op.drop_column('course_step_progress', 'updated_at')
@@ -0,0 +1,45 @@
+"""delta sync: transaction-id watermarks
+
+Revision ID: f3a7c1d9e824
+Revises: 0d8b6f2c5e71
+Create Date: 2026-10-18 18:41:07.512390
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f3a7c1d9e824'
+down_revision: Union[str, None] = '0d8b6f2c5e71'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+CURRENT_XID = sa.text('pg_current_xact_id()::text::bigint')
+
+# (таблица, старый индекс по времени, колонка старого индекса, новый индекс)
+_TABLES = [
+    ('notebook_entries', 'ix_notebook_entries_user_updated', 'updated_at', 'ix_notebook_entries_user_sync'),
+    ('course_progress', 'ix_course_progress_user_updated', 'updated_at', 'ix_course_progress_user_sync'),
+    ('course_step_progress', 'ix_course_step_progress_user_updated', 'updated_at', 'ix_course_step_progress_user_sync'),
+    ('sync_tombstones', 'ix_sync_tombstones_user_deleted', 'deleted_at', 'ix_sync_tombstones_user_sync'),
+]
+
+
+def upgrade() -> None:
+    # существующим строкам — 0 (константный default не переписывает таблицу): клиенты со старыми
+    # водяными знаками всё равно проходят полную синхронизацию (410), дальше дельты считаются по sync_xid
+    for table, old_index, _, new_index in _TABLES:
+        op.add_column(table, sa.Column('sync_xid', sa.BigInteger(), server_default='0', nullable=False))
+        op.alter_column(table, 'sync_xid', server_default=CURRENT_XID)
+        op.create_index(new_index, table, ['user_id', 'sync_xid'], unique=False)
+        op.drop_index(old_index, table_name=table)
+
+
+def downgrade() -> None:
+    for table, old_index, old_column, new_index in _TABLES:
+        op.create_index(old_index, table, ['user_id', old_column], unique=False)
+        op.drop_index(new_index, table_name=table)
+        op.drop_column(table, 'sync_xid')
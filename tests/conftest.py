@@ -0,0 +1,138 @@
+# tests/conftest.py
+# Unit-тесты и бенчмарки идут без внешних сервисов. DB-тесты (маркер db) — только при заданном
+# TEST_DATABASE_URL (postgresql+asyncpg://...): схема создаётся из моделей, таблицы чистятся после теста.
+import asyncio
+import os
+
+import pytest
+
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL")
+if TEST_DATABASE_URL:
+    # settings читаются при первом импорте app.*, поэтому до него
+    os.environ.setdefault("DATABASE_URL", TEST_DATABASE_URL)
+
+from sqlalchemy import text  # noqa: E402
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine  # noqa: E402
+from sqlalchemy.pool import NullPool  # noqa: E402
+
+import app.models  # noqa: E402,F401 - все модели в metadata
+from app.models.base import Base  # noqa: E402
+
+def pytest_collection_modifyitems(config, items):
+    if TEST_DATABASE_URL:
+        return
+    skip = pytest.mark.skip(reason="TEST_DATABASE_URL is not set")
+    for item in items:
+        if "db" in item.keywords:
+            item.add_marker(skip)
+
+async def _create_schema() -> None:
+    engine = create_async_engine(TEST_DATABASE_URL, poolclass=NullPool)
+    async with engine.begin() as conn:
+        try:
+            async with conn.begin_nested():
+                await conn.execute(text("CREATE EXTENSION IF NOT EXISTS btree_gin"))
+        except Exception:
+            # сборка Postgres без contrib: составной GIN (user_id, tsvector) не создать — обойдёмся без него
+            table = Base.metadata.tables["notebook_entries"]
+            table.indexes = {i for i in table.indexes if i.name != "ix_notebook_entries_user_search"}
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+    await engine.dispose()
+
+@pytest.fixture(scope="session")
+def db_schema():
+    if not TEST_DATABASE_URL:
+        pytest.skip("TEST_DATABASE_URL is not set")
+    asyncio.run(_create_schema())
+
+@pytest.fixture
+async def db_engine(db_schema):
+    # NullPool: у каждого теста свой event loop, соединения между ними не переиспользуем
+    engine = create_async_engine(TEST_DATABASE_URL, poolclass=NullPool)
+    yield engine
+    tables = ", ".join(t.name for t in Base.metadata.sorted_tables)
+    async with engine.begin() as conn:
+        await conn.execute(text(f"TRUNCATE {tables} RESTART IDENTITY CASCADE"))
+    await engine.dispose()
+
+@pytest.fixture
+def session_factory(db_engine):
+    return async_sessionmaker(bind=db_engine, expire_on_commit=False, autoflush=False)
+
+@pytest.fixture
+async def db(session_factory):
+    async with session_factory() as session:
+        yield session
+
+@pytest.fixture
+def seed(session_factory):
+    """Фабрика данных: seed(users=1, steps=3) -> (user_ids, course_id, step_ids), уже закоммичено."""
+    from app.models.course import Courses
+    from app.models.course_step import CourseStep, StepType
+    from app.models.user import User
+
+    counter = 0
+
+    async def _seed(users: int = 1, steps: int = 3) -> tuple[list[int], int, list[int]]:
+        nonlocal counter
+        counter += 1
+        async with session_factory() as db:
+            people = [User(email=f"u{counter}-{i}@test.local", password_hash="-") for i in range(users)]
+            course = Courses(slug=f"course-{counter}", title="Course", summary="-",
+                             storage_key=f"courses/course-{counter}_v1.pdf", steps_count=steps)
+            db.add_all([*people, course])
+            await db.flush()
+            items = [CourseStep(course_id=course.id, order_index=i, title=f"Step {i}", type=StepType.reading,
+                                config={"type": "reading", "start_page": i + 1, "end_page": i + 1})
+                     for i in range(steps)]
+            db.add_all(items)
+            await db.commit()
+            return [u.id for u in people], course.id, [s.id for s in items]
+
+    return _seed
+
+@pytest.fixture
+def s3(monkeypatch):
+    """S3 в памяти (moto) с пустым бакетом из настроек; storage._s3() ходит в него же."""
+    import boto3
+    from moto import mock_aws
+
+    from app.core.settings import settings
+    from app.services import storage
+
+    # moto перехватывает только AWS-адреса — эндпоинт MinIO из настроек убираем
+    monkeypatch.setattr(settings, "S3_ENDPOINT", None)
+    monkeypatch.setattr(storage, "_client", None)
+    with mock_aws():
+        client = boto3.client("s3", region_name=settings.S3_REGION)
+        client.create_bucket(Bucket=settings.S3_BUCKET)
+        yield client
+
+@pytest.fixture
+def api_user():
+    """Текущий пользователь для api: тест выставляет id/role сам."""
+    from types import SimpleNamespace
+
+    return SimpleNamespace(id=None, role="user")
+
+@pytest.fixture
+async def api(session_factory, api_user):
+    """HTTP-клиент к приложению (без lifespan): сессии — из тестовой БД, аутентификация — api_user."""
+    import httpx
+
+    from app.api.deps import get_current_user, get_read_session
+    from app.db.session import get_session
+    from app.main import app
+
+    async def session():
+        async with session_factory() as s:
+            yield s
+
+    app.dependency_overrides[get_session] = session
+    app.dependency_overrides[get_read_session] = session
+    app.dependency_overrides[get_current_user] = lambda: api_user
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        yield client
+    app.dependency_overrides.clear()
@@ -0,0 +1,82 @@
+# user-013: пропускная способность auth-зависимости (get_current_user) с кэшем проверенных токенов и без
+import asyncio
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from app.api.deps import get_current_user
+from app.core import jwt as jwt_mod
+from app.core.jwt import create_token, decode_token
+from app.core.settings import settings
+from app.services import user_cache
+
+USER_ID = 101
+BATCH = 200
+
+@pytest.fixture
+def token(monkeypatch):
+    # принципал — в локальном уровне user_cache, чтобы мерить только проверку токена
+    user_cache._local.set(USER_ID, {
+        "id": USER_ID, "email": "bench@test.local", "locale": "en", "is_active": True,
+        "city": None, "country": None, "phone": None, "gender": None, "role": "user",
+    })
+    jwt_mod._verified.clear()
+    tok, _ = create_token(sub=str(USER_ID), type_="access")
+    yield tok
+    jwt_mod._verified.clear()
+    user_cache._local.pop(USER_ID)
+
+def _run(token: str, *, cached: bool) -> None:
+    async def batch():
+        for _ in range(BATCH):
+            if not cached:
+                jwt_mod._verified.clear()
+            request = SimpleNamespace(state=SimpleNamespace())
+            user = await get_current_user(request, token, db=None)
+            assert user.id == USER_ID
+    asyncio.run(batch())
+
+@pytest.mark.parametrize("backend", ["jose", "pyjwt"])
+def test_bench_auth_uncached(benchmark, monkeypatch, token, backend):
+    monkeypatch.setattr(settings, "JWT_BACKEND", backend)
+    benchmark(_run, token, cached=False)
+
+def test_bench_auth_cached(benchmark, token):
+    benchmark(_run, token, cached=True)
+
+def _best(fn, n=5) -> float:
+    best = float("inf")
+    for _ in range(n):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+def test_cache_hit_is_much_cheaper_than_verification(token):
+    # сама проверка токена, без остальной работы зависимости
+    def uncached():
+        for _ in range(BATCH):
+            jwt_mod._verified.clear()
+            decode_token(token)
+
+    def cached():
+        for _ in range(BATCH):
+            decode_token(token)
+
+    assert _best(cached) * 5 < _best(uncached)
+
+def test_backends_agree(monkeypatch, token):
+    claims = {}
+    for backend in ("jose", "pyjwt"):
+        jwt_mod._verified.clear()
+        monkeypatch.setattr(settings, "JWT_BACKEND", backend)
+        claims[backend] = decode_token(token)
+    assert claims["jose"] == claims["pyjwt"]
+
+def test_refresh_tokens_not_cached(token):
+    refresh, _ = create_token(sub=str(USER_ID), type_="refresh")
+    decode_token(refresh)
+    assert len(jwt_mod._verified) == 0
+    decode_token(token)
+    assert len(jwt_mod._verified) == 1
@@ -0,0 +1,85 @@
+# user-017: progress_percent/status/completed_at — только из completed_steps и courses.steps_count
+from datetime import datetime, timezone
+
+import pytest
+from sqlalchemy import update
+
+from app.models.course_progress import CourseProgress
+from app.repositories import course_progress_repo, course_step_progress_repo, course_step_repo
+from app.schemas.course import CourseProgressUpdate
+
+pytestmark = pytest.mark.db
+
+async def _progress(session_factory, user_id, course_id) -> CourseProgress:
+    async with session_factory() as db:
+        return await course_progress_repo.get(db, user_id, course_id)
+
+async def _complete(session_factory, user_id, step_ids):
+    # как complete_steps_batch: апсерт завершений + счётчики курса в одной транзакции
+    now = datetime.now(timezone.utc)
+    async with session_factory() as db:
+        _, newly = await course_step_progress_repo.complete_many(db, user_id, [(s, now, {}) for s in step_ids])
+        await course_progress_repo.add_completed_steps(db, user_id, newly)
+        await db.commit()
+
+async def test_progress_follows_completed_steps(seed, session_factory):
+    (user_id,), course_id, step_ids = await seed(steps=4)
+    await _complete(session_factory, user_id, step_ids[:1])
+    cp = await _progress(session_factory, user_id, course_id)
+    assert (cp.completed_steps, cp.progress_percent, cp.status) == (1, 25, 0)
+
+    await _complete(session_factory, user_id, step_ids[1:])
+    cp = await _progress(session_factory, user_id, course_id)
+    assert (cp.completed_steps, cp.progress_percent, cp.status) == (4, 100, 2)
+    assert cp.completed_at is not None
+
+async def test_client_cannot_set_percent_or_completion(seed, session_factory):
+    (user_id,), course_id, step_ids = await seed(steps=4)
+    await _complete(session_factory, user_id, step_ids[:1])
+
+    payload = CourseProgressUpdate.model_validate({"current_page": 12, "progress_percent": 100, "status": 1})
+    async with session_factory() as db:
+        cp = await course_progress_repo.get(db, user_id, course_id)
+        await course_progress_repo.update_progress(db, cp, current_page=payload.current_page, status=payload.status)
+        await db.commit()
+
+    cp = await _progress(session_factory, user_id, course_id)
+    assert (cp.current_page, cp.progress_percent, cp.status) == (12, 25, 1)
+    with pytest.raises(ValueError):
+        CourseProgressUpdate.model_validate({"current_page": 1, "status": 2})
+
+async def test_new_step_reopens_completed_course(seed, session_factory):
+    (user_id, other_id), course_id, step_ids = await seed(users=2, steps=2)
+    await _complete(session_factory, user_id, step_ids)
+    await _complete(session_factory, other_id, step_ids[:1])
+
+    async with session_factory() as db:
+        await course_step_repo.create(db, course_id=course_id, title="Extra", order_index=10, type="reading",
+                                      config={"type": "reading", "start_page": 1, "end_page": 1})
+        await db.commit()
+
+    done = await _progress(session_factory, user_id, course_id)
+    assert (done.progress_percent, done.status, done.completed_at) == (66, 0, None)
+    half = await _progress(session_factory, other_id, course_id)
+    assert half.progress_percent == 33
+
+async def test_backfill_resets_users_without_completions(seed, session_factory):
+    (user_id, idle_id), course_id, step_ids = await seed(users=2, steps=2)
+    async with session_factory() as db:
+        await course_progress_repo.create(db, idle_id, course_id, 1)
+        await db.commit()
+    await _complete(session_factory, user_id, step_ids[:1])
+
+    # старые данные: процент «по страницам» и рассинхронизированные счётчики
+    async with session_factory() as db:
+        await db.execute(update(CourseProgress).where(CourseProgress.user_id == idle_id)
+                         .values(progress_percent=80, status=2, completed_steps=3))
+        await db.execute(update(CourseProgress).where(CourseProgress.user_id == user_id)
+                         .values(progress_percent=5, completed_steps=0))
+        await course_progress_repo.backfill_step_counters(db)
+        await db.commit()
+
+    idle = await _progress(session_factory, idle_id, course_id)
+    assert (idle.completed_steps, idle.progress_percent, idle.status, idle.completed_at) == (0, 0, 0, None)
+    active = await _progress(session_factory, user_id, course_id)
+    assert (active.completed_steps, active.progress_percent, active.status) == (1, 50, 0)
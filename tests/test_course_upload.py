@@ -0,0 +1,135 @@
+# user-021: потоковая загрузка PDF курса — поля только до файла, память не растёт с размером файла
+import tracemalloc
+
+import httpx
+import pytest
+
+from app.core.settings import settings
+from app.repositories import course_repo
+from app.services import course_upload
+from app.tasks import pdf_ingest
+
+BOUNDARY = "bench-boundary"
+CONTENT_TYPE = f"multipart/form-data; boundary={BOUNDARY}"
+PDF_HEAD = b"%PDF-1.7\n" + b"0" * 1024
+CHUNK = 64 * 1024
+
+def _field(name: str, value: str) -> bytes:
+    return f'--{BOUNDARY}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode()
+
+def _file_head(name: str = "file") -> bytes:
+    return (f'--{BOUNDARY}\r\nContent-Disposition: form-data; name="{name}"; filename="c.pdf"\r\n'
+            f"Content-Type: application/pdf\r\n\r\n").encode()
+
+_END = f"--{BOUNDARY}--\r\n".encode()
+
+def _body(fields: dict[str, str], pdf: bytes = PDF_HEAD, late: dict[str, str] | None = None) -> bytes:
+    head = b"".join(_field(k, v) for k, v in fields.items())
+    tail = b"".join(_field(k, v) for k, v in (late or {}).items())
+    return head + _file_head() + pdf + b"\r\n" + tail + _END
+
+async def _chunks(body: bytes):
+    for i in range(0, len(body), CHUNK):
+        yield body[i:i + CHUNK]
+
+class FakeMultipart:
+    """Вместо S3: части считаются и выбрасываются."""
+
+    def __init__(self, monkeypatch):
+        self.parts = 0
+        self.aborted: list[str] = []
+        self.completed: list[str] = []
+        monkeypatch.setattr(course_upload.storage, "create_multipart", lambda key: "upload-1")
+        monkeypatch.setattr(course_upload.storage, "upload_part", self._part)
+        monkeypatch.setattr(course_upload.storage, "complete_multipart", lambda key, *_: self.completed.append(key))
+        monkeypatch.setattr(course_upload.storage, "abort_multipart", lambda key, _: self.aborted.append(key))
+
+    def _part(self, key, upload_id, part_number, body) -> str:
+        self.parts += 1
+        return f"etag-{part_number}"
+
+@pytest.fixture
+def fake_s3(monkeypatch):
+    return FakeMultipart(monkeypatch)
+
+async def _on_fields(fields: dict[str, str]) -> str:
+    return "courses/test.pdf"
+
+async def test_field_after_file_is_rejected_and_upload_aborted(fake_s3):
+    # файл длиннее чанка: к моменту позднего поля multipart upload уже начат
+    body = _body({"slug": "a"}, pdf=PDF_HEAD * 100, late={"slug": "other"})
+
+    with pytest.raises(course_upload.UploadError) as e:
+        await course_upload.stream_upload(_chunks(body), CONTENT_TYPE, on_fields=_on_fields)
+    assert e.value.status_code == 400
+    assert fake_s3.aborted == ["courses/test.pdf"]
+    assert fake_s3.completed == []
+
+async def test_memory_stays_flat_for_500mb_upload(fake_s3):
+    size = 500 * 1024 * 1024
+    block = PDF_HEAD + b"x" * (CHUNK - len(PDF_HEAD))
+
+    async def chunks():
+        # тело генерируется на лету, как его отдаёт request.stream()
+        yield _field("slug", "big") + _file_head()
+        yield block
+        filler = b"x" * CHUNK
+        for _ in range(size // CHUNK - 1):
+            yield filler
+        yield b"\r\n" + _END
+
+    tracemalloc.start()
+    try:
+        result = await course_upload.stream_upload(chunks(), CONTENT_TYPE, on_fields=_on_fields)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    assert result.size == size
+    assert fake_s3.parts == -(-size // settings.S3_MULTIPART_PART_SIZE)
+    # буфер одной части S3 плюс её копия на отправку — и не больше, сколько бы ни весил файл
+    assert peak < 3 * settings.S3_MULTIPART_PART_SIZE
+
+@pytest.fixture
+def client(api, api_user, s3, monkeypatch):
+    async def enqueue(_: int) -> None:
+        return None
+    monkeypatch.setattr(pdf_ingest, "enqueue", enqueue)
+    api_user.role = "admin"
+    return api
+
+async def _post(client, body: bytes) -> httpx.Response:
+    return await client.post("/api/v1/courses/create_with_file", content=body, headers={"Content-Type": CONTENT_TYPE})
+
+def _objects(s3) -> list[str]:
+    return [o["Key"] for o in s3.list_objects_v2(Bucket=settings.S3_BUCKET).get("Contents", [])]
+
+FIELDS = {"slug": "upload", "title": "Upload", "summary": "-"}
+
+@pytest.mark.db
+async def test_create_with_file_uses_validated_fields(client, db, s3):
+    resp = await _post(client, _body(FIELDS))
+
+    assert resp.status_code == 201, resp.text
+    course = await course_repo.get_by_slug(db, "upload")
+    assert course.storage_key.startswith("courses/upload_v1-")
+    assert _objects(s3) == [course.storage_key]
+
+@pytest.mark.db
+async def test_late_field_gets_400_and_leaves_nothing(client, db, s3):
+    resp = await _post(client, _body(FIELDS, late={"version": "oops"}))
+
+    assert resp.status_code == 400
+    assert await course_repo.get_by_slug(db, "upload") is None
+    assert _objects(s3) == []
+
+@pytest.mark.db
+async def test_failed_insert_deletes_uploaded_object(client, db, s3, monkeypatch):
+    async def broken(*_, **__):
+        raise RuntimeError("db is down")
+    monkeypatch.setattr(course_repo, "create", broken)
+
+    resp = await _post(client, _body(FIELDS))
+
+    assert resp.status_code == 500
+    assert _objects(s3) == []
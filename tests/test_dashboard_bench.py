@@ -0,0 +1,131 @@
+# user-018: главный экран одним запросом (LEFT JOIN + LATERAL) против прежнего клиентского потока 2N+2
+import asyncio
+import time
+from datetime import datetime, timezone
+
+import pytest
+from sqlalchemy import insert, select, text
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app.models.base import Base
+from app.models.course import Courses
+from app.models.course_progress import CourseProgress
+from app.models.course_step import CourseStep, StepType
+from app.models.course_step_progress import CourseStepProgress, StepStatus
+from app.models.user import User
+from app.repositories import course_progress_repo, course_repo, course_step_repo
+
+pytestmark = pytest.mark.db
+
+USERS = 200
+COURSES = 60       # из них PUBLIC_EVERY-й — скрытый
+PUBLIC_EVERY = 6
+STEPS = 12
+LIMIT = 50
+
+async def _seed(factory) -> int:
+    now = datetime.now(timezone.utc)
+    async with factory() as db:
+        user_ids = list((await db.execute(insert(User).returning(User.id), [
+            {"email": f"dash{i}@test.local", "password_hash": "-"} for i in range(USERS)
+        ])).scalars())
+        course_ids = list((await db.execute(insert(Courses).returning(Courses.id), [
+            {"slug": f"dash-{i}", "title": f"Course {i}", "summary": "-", "storage_key": f"courses/dash-{i}.pdf",
+             "steps_count": STEPS, "is_public": i % PUBLIC_EVERY != 0}
+            for i in range(COURSES)
+        ])).scalars())
+        steps = (await db.execute(insert(CourseStep).returning(CourseStep.id, CourseStep.course_id), [
+            {"course_id": cid, "order_index": j, "title": f"Step {j}", "type": StepType.reading,
+             "config": {"type": "reading", "start_page": j + 1, "end_page": j + 1}}
+            for cid in course_ids for j in range(STEPS)
+        ])).all()
+        by_course: dict[int, list[int]] = {}
+        for step_id, cid in steps:
+            by_course.setdefault(cid, []).append(step_id)
+
+        # у каждого пользователя — часть курсов начата, в каждом завершено несколько первых шагов
+        progress, completions = [], []
+        for u, uid in enumerate(user_ids):
+            for k, cid in enumerate(course_ids):
+                if (u + k) % 3:
+                    continue
+                done = (u + k) % STEPS
+                progress.append({"user_id": uid, "course_id": cid, "completed_steps": done,
+                                 "progress_percent": done * 100 // STEPS, "started_at": now.replace(tzinfo=None)})
+                completions += [{"user_id": uid, "step_id": sid, "status": StepStatus.completed,
+                                 "started_at": now, "completed_at": now, "metrics": {}}
+                                for sid in by_course[cid][:done]]
+        await db.execute(insert(CourseProgress), progress)
+        await db.execute(insert(CourseStepProgress), completions)
+        await db.commit()
+        await db.execute(text("ANALYZE"))
+        return user_ids[0]
+
+async def _old_flow(db, user_id: int):
+    # как раньше собирал экран клиент: курсы, мой прогресс, затем на каждый курс — шаги и их статусы
+    courses = await course_repo.list_public(db, limit=LIMIT)
+    progress = {p.course_id: p for p in await course_progress_repo.list_for_user(db, user_id)}
+    out = []
+    for course in courses:
+        steps = await course_step_repo.list_by_course(db, course.id)
+        res = await db.execute(select(CourseStepProgress.step_id).where(
+            CourseStepProgress.user_id == user_id,
+            CourseStepProgress.step_id.in_([s.id for s in steps]),
+            CourseStepProgress.status == StepStatus.completed,
+        ))
+        done = set(res.scalars())
+        next_step = next((s.id for s in steps if s.id not in done), None)
+        out.append((course.id, progress.get(course.id) is not None, next_step))
+    return out
+
+async def _dashboard(db, user_id: int):
+    rows = await course_repo.dashboard(db, user_id, limit=LIMIT)
+    return [(course.id, cp is not None, step_id) for course, cp, step_id, *_ in rows]
+
+@pytest.fixture(scope="module")
+def env(db_schema):
+    from tests.conftest import TEST_DATABASE_URL
+
+    # свой event loop и пул на весь модуль: бенчмарк синхронный, а соединения живут в одном loop
+    loop = asyncio.new_event_loop()
+    engine = create_async_engine(TEST_DATABASE_URL)
+    factory = async_sessionmaker(bind=engine, expire_on_commit=False, autoflush=False)
+    user_id = loop.run_until_complete(_seed(factory))
+    yield loop, factory, user_id
+
+    async def teardown():
+        tables = ", ".join(t.name for t in Base.metadata.sorted_tables)
+        async with engine.begin() as conn:
+            await conn.execute(text(f"TRUNCATE {tables} RESTART IDENTITY CASCADE"))
+        await engine.dispose()
+    loop.run_until_complete(teardown())
+    loop.close()
+
+def _runner(env, flow):
+    loop, factory, user_id = env
+
+    async def once():
+        async with factory() as db:
+            return await flow(db, user_id)
+    return lambda: loop.run_until_complete(once())
+
+def test_dashboard_matches_old_flow(env):
+    assert _runner(env, _dashboard)() == _runner(env, _old_flow)()
+
+def test_bench_dashboard_old_flow(benchmark, env):
+    benchmark(_runner(env, _old_flow))
+
+def test_bench_dashboard_single_query(benchmark, env):
+    benchmark(_runner(env, _dashboard))
+
+def test_single_query_is_faster(env):
+    def best(fn) -> float:
+        fn()
+        result = float("inf")
+        for _ in range(5):
+            t0 = time.perf_counter()
+            fn()
+            result = min(result, time.perf_counter() - t0)
+        return result
+
+    assert best(_runner(env, _dashboard)) * 3 < best(_runner(env, _old_flow))
@@ -0,0 +1,121 @@
+# tests/test_download_cache.py
+import pytest
+from fakeredis.aioredis import FakeRedis
+from sqlalchemy import update
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app.db.session import TrackedSession
+from app.models.course import Courses
+from app.services import download_cache
+
+pytestmark = pytest.mark.db
+
+@pytest.fixture
+async def redis():
+    r = FakeRedis(decode_responses=True)
+    download_cache.bind_redis(r)
+    download_cache._cache.clear()
+    yield r
+    download_cache.bind_redis(None)
+    download_cache._cache.clear()
+    await r.aclose()
+
+@pytest.fixture
+def tracked(db_engine):
+    return async_sessionmaker(bind=db_engine, expire_on_commit=False, autoflush=False, class_=TrackedSession)
+
+async def _course(tracked) -> int:
+    async with tracked() as db:
+        course = Courses(slug="intro", title="Intro", summary="-", storage_key="courses/intro_v1.pdf")
+        db.add(course)
+        await db.commit()
+        return course.id
+
+def _key(course_id: int) -> str:
+    return download_cache._generation_key(course_id)
+
+async def test_hot_link_served_from_cache(redis, tracked):
+    course_id = await _course(tracked)
+    async with tracked() as db:
+        first = await download_cache.get_link(db, course_id)
+        second = await download_cache.get_link(db, course_id)
+    assert second is first
+    assert await redis.get(_key(course_id)) is not None
+    # поколение живёт столько же, сколько закэшированные ссылки
+    assert download_cache._TTL - 5 < await redis.ttl(_key(course_id)) <= download_cache._TTL
+
+async def test_orm_version_bump_reaches_other_workers(redis, tracked):
+    course_id = await _course(tracked)
+    async with tracked() as db:
+        old = await download_cache.get_link(db, course_id)
+    generation = await redis.get(_key(course_id))
+
+    async with tracked() as db:
+        course = await db.get(Courses, course_id)
+        course.version = 2
+        course.storage_key = "courses/intro_v2.pdf"
+        await db.flush()
+        # до commit ключ не трогаем — иначе параллельный запрос закэширует незакоммиченное
+        assert await redis.get(_key(course_id)) == generation
+        await db.commit()
+    assert await redis.get(_key(course_id)) not in (None, generation)
+
+    # «другой воркер»: его локальная запись по старому поколению осталась, но больше не находится
+    async with tracked() as db:
+        new = await download_cache.get_link(db, course_id)
+    assert (old.version, new.version) == (1, 2)
+    assert "intro_v2.pdf" in new.url
+
+async def test_file_replacement_without_version_bump_reaches_other_workers(redis, tracked):
+    course_id = await _course(tracked)
+    async with tracked() as db:
+        await download_cache.get_link(db, course_id)
+
+    async with tracked() as db:
+        (await db.get(Courses, course_id)).storage_key = "courses/intro_v1_fixed.pdf"
+        await db.commit()
+
+    async with tracked() as db:
+        link = await download_cache.get_link(db, course_id)
+    assert link.version == 1
+    assert "intro_v1_fixed.pdf" in link.url
+
+async def test_reader_that_saw_old_row_does_not_pin_it(redis, tracked, monkeypatch):
+    course_id = await _course(tracked)
+    get = download_cache.course_repo.get
+
+    async def stale_get(db, cid):
+        # читатель уже прочитал v1, и тут коммитится v2 — его ссылка не должна пережить commit
+        course = await get(db, cid)
+        async with tracked() as writer:
+            (await writer.get(Courses, cid)).version = 2
+            await writer.commit()
+        return course
+
+    async with tracked() as db:
+        with monkeypatch.context() as m:
+            m.setattr(download_cache.course_repo, "get", stale_get)
+            assert (await download_cache.get_link(db, course_id)).version == 1
+        assert (await download_cache.get_link(db, course_id)).version == 2
+
+async def test_core_update_visible_after_generation_ttl(redis, tracked):
+    course_id = await _course(tracked)
+    async with tracked() as db:
+        await download_cache.get_link(db, course_id)
+        await db.execute(update(Courses).where(Courses.id == course_id).values(version=3))
+        await db.commit()
+
+        # Core UPDATE не проходит через mapper-события: до истечения поколения отдаётся старая ссылка
+        assert (await download_cache.get_link(db, course_id)).version == 1
+        await redis.delete(_key(course_id))  # TTL истёк
+        assert (await download_cache.get_link(db, course_id)).version == 3
+
+async def test_without_redis_version_comes_from_db(tracked):
+    download_cache._cache.clear()
+    course_id = await _course(tracked)
+    async with tracked() as db:
+        assert (await download_cache.get_link(db, course_id)).version == 1
+        await db.execute(update(Courses).where(Courses.id == course_id).values(version=4))
+        await db.commit()
+        assert (await download_cache.get_link(db, course_id)).version == 4
+    download_cache._cache.clear()
@@ -0,0 +1,55 @@
+# user-025: выгрузка данных пользователя — согласование gzip и read-only транзакция
+import gzip
+import json
+from datetime import date
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+
+from app.models.notebook_entry import MoodEnum, NotebookEntry
+from app.services import export
+
+@pytest.mark.parametrize("header, expected", [
+    ("", False),
+    ("gzip", True),
+    ("gzip, deflate, br", True),
+    ("GZIP", True),
+    ("gzip;q=0", False),
+    ("gzip; q=0.0, deflate", False),
+    ("deflate, gzip;q=0.5", True),
+    ("x-gzip", True),
+    ("*", True),
+    ("*;q=0", False),
+    ("gzip;q=0, *", False),   # явная запись важнее «*»
+    ("br, *;q=0.1", True),
+    ("identity", False),
+    ("gzip;q=abc", False),
+])
+def test_accepts_gzip(header, expected):
+    assert export.accepts_gzip(header) is expected
+
+def test_gzip_stream_decompresses_to_rows():
+    enc = export._Encoder("ndjson", use_gzip=True)
+    rows = [{"type": "notebook", "id": i, "title": f"день {i}"} for i in range(3)]
+    chunks = []
+    for row in rows:
+        enc.add(row)
+        chunks.append(enc.take())
+    chunks.append(enc.take(final=True))
+    lines = gzip.decompress(b"".join(chunks)).decode().splitlines()
+    assert [json.loads(line) for line in lines] == rows
+
+@pytest.mark.db
+async def test_iter_rows_runs_in_read_only_snapshot(db, seed):
+    (user_id,), _, _ = await seed()
+    db.add(NotebookEntry(user_id=user_id, entry_date=date(2026, 1, 1), mood=MoodEnum.ok, title="t", content="c"))
+    await db.commit()
+
+    rows = [row async for row in export.iter_rows(db, user_id)]
+    assert {row["type"] for row in rows} == {"notebook"}
+    assert (await db.scalar(text("SHOW transaction_read_only"))) == "on"
+    assert (await db.scalar(text("SHOW transaction_isolation"))) == "repeatable read"
+    with pytest.raises(DBAPIError):
+        await db.execute(text("DELETE FROM notebook_entries"))
+    await db.rollback()
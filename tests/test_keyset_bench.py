@@ -0,0 +1,121 @@
+# user-008: глубокие страницы на миллионе строк — keyset держит время первой страницы, OFFSET — нет
+import asyncio
+import os
+import time
+from datetime import date, timedelta
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app.models.base import Base
+from app.repositories import course_repo, notebook_repo
+
+pytestmark = pytest.mark.db
+
+ROWS = int(os.getenv("KEYSET_BENCH_ROWS", "1000000"))
+LIMIT = 50
+DEPTH = 0.9  # доля строк перед «глубокой» страницей
+FIRST_DAY = date(1000, 1, 1)
+BUDGET_SECONDS = 0.020
+
+_SEED_COURSES = """
+INSERT INTO courses (slug, title, summary, storage_key, version, is_public, steps_count)
+SELECT 'bench-' || g, 'Course ' || g, '-', 'courses/bench-' || g || '.pdf', 1, g % 10 <> 0, 0
+FROM generate_series(1, :rows) g
+"""
+# у одного пользователя — по записи в день, ROWS дней начиная с FIRST_DAY
+_SEED_NOTEBOOK = """
+INSERT INTO notebook_entries (user_id, entry_date, mood)
+SELECT :user_id, CAST(:first AS date) + g, 'ok' FROM generate_series(0, :rows - 1) g
+"""
+
+async def _seed(engine) -> int:
+    async with engine.begin() as conn:
+        user_id = (await conn.execute(text(
+            "INSERT INTO users (email, password_hash, locale, is_active, role) "
+            "VALUES ('keyset@test.local', '-', 'ru', true, 'user') RETURNING id"
+        ))).scalar_one()
+        await conn.execute(text(_SEED_COURSES), {"rows": ROWS})
+        await conn.execute(text(_SEED_NOTEBOOK), {"user_id": user_id, "rows": ROWS, "first": FIRST_DAY})
+    async with engine.connect() as conn:
+        conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+        await conn.execute(text("VACUUM ANALYZE courses"))
+        await conn.execute(text("VACUUM ANALYZE notebook_entries"))
+    return user_id
+
+@pytest.fixture(scope="module")
+def env(db_schema):
+    from tests.conftest import TEST_DATABASE_URL
+
+    # свой event loop и пул на весь модуль: бенчмарк синхронный, а соединения живут в одном loop
+    loop = asyncio.new_event_loop()
+    engine = create_async_engine(TEST_DATABASE_URL)
+    factory = async_sessionmaker(bind=engine, expire_on_commit=False, autoflush=False)
+    user_id = loop.run_until_complete(_seed(engine))
+    yield loop, factory, user_id
+
+    async def teardown():
+        tables = ", ".join(t.name for t in Base.metadata.sorted_tables)
+        async with engine.begin() as conn:
+            await conn.execute(text(f"TRUNCATE {tables} RESTART IDENTITY CASCADE"))
+        await engine.dispose()
+    loop.run_until_complete(teardown())
+    loop.close()
+
+def _deep_course_id() -> int:
+    # id по убыванию: глубокая страница начинается около id = ROWS * (1 - DEPTH)
+    return int(ROWS * (1 - DEPTH))
+
+def _deep_date() -> date:
+    return FIRST_DAY + timedelta(days=int(ROWS * (1 - DEPTH)))
+
+PAGES = {
+    "courses_first": lambda db, _: course_repo.list_public(db, limit=LIMIT),
+    "courses_keyset_deep": lambda db, _: course_repo.list_public(db, limit=LIMIT, before_id=_deep_course_id()),
+    # публичных курсов — 90%
+    "courses_offset_deep": lambda db, _: course_repo.list_public(db, limit=LIMIT, offset=int(ROWS * DEPTH * 0.9)),
+    "notebook_first": lambda db, uid: notebook_repo.list_for_user(db, uid, limit=LIMIT),
+    "notebook_keyset_deep": lambda db, uid: notebook_repo.list_for_user(db, uid, limit=LIMIT, before_date=_deep_date()),
+    "notebook_offset_deep": lambda db, uid: notebook_repo.list_for_user(db, uid, limit=LIMIT, offset=int(ROWS * DEPTH)),
+}
+
+def _runner(env, kind: str):
+    loop, factory, user_id = env
+
+    async def once():
+        async with factory() as db:
+            return await PAGES[kind](db, user_id)
+    return lambda: loop.run_until_complete(once())
+
+def _best(fn, rounds: int = 5) -> float:
+    fn()  # прогрев: план и соединение
+    best = float("inf")
+    for _ in range(rounds):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+@pytest.mark.parametrize("kind", PAGES)
+def test_bench_page(benchmark, env, kind):
+    page = benchmark(_runner(env, kind))
+    assert len(page) == LIMIT
+
+@pytest.mark.parametrize("listing", ["courses", "notebook"])
+def test_deep_keyset_page_costs_as_much_as_the_first(env, listing):
+    first = _best(_runner(env, f"{listing}_first"))
+    deep = _best(_runner(env, f"{listing}_keyset_deep"))
+    offset = _best(_runner(env, f"{listing}_offset_deep"), rounds=2)
+    print(f"\n{listing} @ {ROWS} rows: first {first * 1000:.2f} ms, keyset deep {deep * 1000:.2f} ms, "
+          f"offset deep {offset * 1000:.2f} ms")
+    assert deep < BUDGET_SECONDS
+    assert deep < 3 * first + 0.001
+    assert offset > 10 * deep  # то, от чего уходили
+
+def test_keyset_deep_page_continues_where_expected(env):
+    courses = _runner(env, "courses_keyset_deep")()
+    assert all(c.is_public and c.id < _deep_course_id() for c in courses)
+    assert [c.id for c in courses] == sorted((c.id for c in courses), reverse=True)
+    entries = _runner(env, "notebook_keyset_deep")()
+    assert entries[0].entry_date == _deep_date() - timedelta(days=1)
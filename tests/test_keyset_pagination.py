@@ -0,0 +1,77 @@
+# user-008: keyset-пагинация курсов и дневника — курсор, последняя страница, равные ключи сортировки
+from datetime import date, timedelta
+
+import pytest
+from sqlalchemy import insert
+from sqlalchemy.exc import IntegrityError
+
+from app.core.pagination import NEXT_CURSOR_HEADER
+from app.models.course import Courses
+from app.models.notebook_entry import MoodEnum, NotebookEntry
+
+pytestmark = pytest.mark.db
+
+async def _walk(api, url: str, limit: int) -> list[list[dict]]:
+    pages, cursor = [], None
+    while True:
+        params = {"limit": limit, **({"cursor": cursor} if cursor else {})}
+        resp = await api.get(url, params=params)
+        assert resp.status_code == 200, resp.text
+        pages.append(resp.json())
+        cursor = resp.headers.get(NEXT_CURSOR_HEADER)
+        if cursor is None:
+            return pages
+        assert len(pages) < 100, "cursor never ends"
+
+async def _courses(db, n: int) -> list[int]:
+    # каждый третий — скрытый: между публичными в индексе (is_public, id) есть дыры
+    ids = (await db.execute(insert(Courses).returning(Courses.id, Courses.is_public), [
+        {"slug": f"k-{i}", "title": f"C{i}", "summary": "-", "storage_key": f"courses/k-{i}.pdf", "is_public": i % 3 != 0}
+        for i in range(n)
+    ])).all()
+    await db.commit()
+    return sorted((cid for cid, public in ids if public), reverse=True)
+
+async def test_course_pages_cover_public_courses_once(api, db):
+    public = await _courses(db, 11)  # 7 публичных
+
+    pages = await _walk(api, "/api/v1/courses", limit=3)
+
+    assert [len(p) for p in pages] == [3, 3, 1]
+    assert [c["id"] for p in pages for c in p] == public
+
+async def test_full_last_page_has_no_cursor(api, db):
+    public = await _courses(db, 9)  # 6 публичных — ровно две страницы
+
+    pages = await _walk(api, "/api/v1/courses", limit=3)
+
+    assert [[c["id"] for c in p] for p in pages] == [public[:3], public[3:]]
+
+async def test_empty_listing_has_no_cursor(api):
+    assert await _walk(api, "/api/v1/courses", limit=3) == [[]]
+
+async def test_invalid_cursor_is_400(api):
+    resp = await api.get("/api/v1/courses", params={"cursor": "not-a-cursor"})
+    assert resp.status_code == 400
+
+async def test_notebook_pages_with_equal_dates_across_users(api, api_user, db, seed):
+    (me, other), _, _ = await seed(users=2)
+    days = [date(2026, 1, 1) + timedelta(days=i) for i in range(5)]
+    # у второго пользователя записи на те же даты: ключ сортировки совпадает, курсор не должен их задеть
+    db.add_all([NotebookEntry(user_id=uid, entry_date=d, mood=MoodEnum.ok) for uid in (me, other) for d in days])
+    await db.commit()
+    api_user.id = me
+
+    pages = await _walk(api, "/api/v1/notebook", limit=2)
+
+    assert [len(p) for p in pages] == [2, 2, 1]
+    entries = [e for p in pages for e in p]
+    assert {e["user_id"] for e in entries} == {me}
+    assert [e["entry_date"] for e in entries] == [d.isoformat() for d in reversed(days)]
+
+async def test_notebook_cursor_relies_on_one_entry_per_day(db, seed):
+    # курсор дневника — одна дата: он корректен, пока (user_id, entry_date) уникален
+    (me,), _, _ = await seed()
+    db.add_all([NotebookEntry(user_id=me, entry_date=date(2026, 1, 1), mood=MoodEnum.ok) for _ in range(2)])
+    with pytest.raises(IntegrityError):
+        await db.commit()
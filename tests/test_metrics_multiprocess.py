@@ -0,0 +1,99 @@
+# user-007: /metrics при нескольких воркерах uvicorn агрегирует счётчики всех процессов
+import http.client
+import os
+import re
+import signal
+import socket
+import subprocess
+import sys
+import time
+
+import pytest
+
+WORKERS = 3
+REQUESTS = 60
+PATH = "/api/v1/health/live"
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def _get(port: int, path: str) -> tuple[int, str]:
+    # новое соединение на каждый запрос — иначе keep-alive держит нас на одном воркере
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+    try:
+        conn.request("GET", path, headers={"Connection": "close"})
+        resp = conn.getresponse()
+        return resp.status, resp.read().decode()
+    finally:
+        conn.close()
+
+def _worker_pids(path: str) -> set[int]:
+    return {int(m.group(1)) for name in os.listdir(path) if (m := re.search(r"_(\d+)\.db$", name))}
+
+@pytest.fixture
+def server(tmp_path):
+    metrics_dir = tmp_path / "prom"
+    metrics_dir.mkdir()
+    # мусор прошлого запуска — мастер должен стереть его до старта воркеров
+    (metrics_dir / "counter_999999.db").write_bytes(b"stale")
+
+    port = _free_port()
+    env = {**os.environ, "PROMETHEUS_MULTIPROC_DIR": str(metrics_dir), "PROGRESS_WRITE_BEHIND": "false"}
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "app.scripts.serve", "--host", "127.0.0.1", "--port", str(port),
+         "--workers", str(WORKERS), "--log-level", "warning"],
+        env=env, cwd=os.path.dirname(os.path.dirname(__file__)),
+    )
+    deadline = time.monotonic() + 30
+    while True:
+        try:
+            if len(_worker_pids(metrics_dir)) >= WORKERS and _get(port, PATH)[0] == 200:
+                break
+        except OSError:
+            pass
+        if proc.poll() is not None or time.monotonic() > deadline:
+            proc.kill()
+            pytest.fail("uvicorn did not start")
+        time.sleep(0.2)
+    yield port, metrics_dir
+    proc.send_signal(signal.SIGINT)
+    try:
+        proc.wait(timeout=15)
+    except subprocess.TimeoutExpired:
+        proc.kill()
+
+def _live_count(body: str) -> float:
+    total = 0.0
+    for line in body.splitlines():
+        if line.startswith("http_requests_total{") and f'path="{PATH}"' in line:
+            total += float(line.rsplit(" ", 1)[1])
+    return total
+
+def _settled_count(port: int, expected: float | None = None) -> float:
+    # счётчик растёт уже после отправки ответа — ждём, пока досчитаются последние запросы
+    deadline = time.monotonic() + 5
+    last = _live_count(_get(port, "/metrics")[1])
+    while time.monotonic() < deadline and last != expected:
+        time.sleep(0.1)
+        current = _live_count(_get(port, "/metrics")[1])
+        if expected is None and current == last:
+            break
+        last = current
+    return last
+
+def test_counts_add_up_across_workers(server):
+    port, metrics_dir = server
+    assert not (metrics_dir / "counter_999999.db").exists()
+    assert len(_worker_pids(metrics_dir)) >= WORKERS
+
+    before = _settled_count(port)
+    for _ in range(REQUESTS):
+        assert _get(port, PATH)[0] == 200
+
+    _settled_count(port, before + REQUESTS)
+
+    # каждый скрейп может попасть в любой воркер — сумма должна сходиться в любом из них
+    for _ in range(WORKERS):
+        assert _live_count(_get(port, "/metrics")[1]) == before + REQUESTS
@@ -0,0 +1,136 @@
+# user-005: накладные расходы «чистых» ASGI-middleware против прежних BaseHTTPMiddleware — на стеке приложения
+import asyncio
+import time
+import uuid
+
+from starlette.middleware import Middleware
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.responses import StreamingResponse
+
+from app.core.observability import REGISTRY, CorrelationIdMiddleware, PrometheusMiddleware
+from app.main import create_app
+
+BATCH = 200
+
+class _LegacyCorrelationId(BaseHTTPMiddleware):
+    # прежняя реализация (до user-005), без метрик — нижняя оценка её стоимости
+    async def dispatch(self, request, call_next):
+        req_id = request.headers.get("X-Request-ID") or str(uuid.uuid4())
+        request.scope["request_id"] = req_id
+        response = await call_next(request)
+        response.headers["X-Request-ID"] = req_id
+        return response
+
+class _LegacyTiming(BaseHTTPMiddleware):
+    async def dispatch(self, request, call_next):
+        start = time.perf_counter()
+        response = await call_next(request)
+        response.headers["X-Elapsed"] = str(time.perf_counter() - start)
+        return response
+
+PATH = "/api/v1/health/live"
+
+def _app(*replacements):
+    # настоящий стек приложения (CORS + метрики + correlation-id); replacements — чем заменить наши две middleware
+    app = create_app()
+    ours = (PrometheusMiddleware, CorrelationIdMiddleware)
+    stack = [m for m in app.user_middleware if m.cls not in ours]
+    app.user_middleware = stack[:1] + [Middleware(m) for m in replacements] + stack[1:]
+    app.middleware_stack = None  # Starlette соберёт стек заново при первом вызове
+    return app
+
+_bare = _app()
+_pure = create_app()
+_legacy = _app(_LegacyCorrelationId, _LegacyTiming)
+
+def _scope(path: str) -> dict:
+    return {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+        "scheme": "http", "path": path, "raw_path": path.encode(), "root_path": "", "query_string": b"",
+        "headers": [(b"host", b"bench")], "client": ("127.0.0.1", 1), "server": ("bench", 80),
+    }
+
+async def _call(app, path: str, sent: list | None = None) -> None:
+    received = False
+
+    async def receive():
+        nonlocal received
+        if received:
+            await asyncio.Event().wait()  # как сервер: дальше только disconnect, которого не будет
+        received = True
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        if sent is not None:
+            sent.append((time.perf_counter(), message))
+
+    await app(_scope(path), receive, send)
+
+def _run_batch(app) -> None:
+    async def batch():
+        for _ in range(BATCH):
+            await _call(app, PATH)
+    asyncio.run(batch())
+
+def test_bench_no_middleware(benchmark):
+    benchmark(_run_batch, _bare)
+
+def test_bench_pure_asgi_middleware(benchmark):
+    benchmark(_run_batch, _pure)
+
+def test_bench_base_http_middleware(benchmark):
+    benchmark(_run_batch, _legacy)
+
+def _per_request(app) -> float:
+    _run_batch(app)  # прогрев
+    best = float("inf")
+    for _ in range(5):
+        t0 = time.perf_counter()
+        _run_batch(app)
+        best = min(best, (time.perf_counter() - t0) / BATCH)
+    return best
+
+def test_pure_asgi_overhead_is_lower_than_base_http():
+    bare = _per_request(_bare)
+    pure = _per_request(_pure) - bare
+    legacy = _per_request(_legacy) - bare
+    # BaseHTTPMiddleware — задачи и anyio-потоки на каждый запрос; «чистый» ASGI заметно дешевле
+    assert pure < legacy / 2
+
+async def test_bench_apps_serve_the_real_route():
+    assert [m.cls for m in _pure.user_middleware] == [CORSMiddleware, PrometheusMiddleware, CorrelationIdMiddleware]
+    assert [m.cls for m in _legacy.user_middleware] == [CORSMiddleware, _LegacyCorrelationId, _LegacyTiming]
+    for app in (_bare, _pure, _legacy):
+        sent: list = []
+        await _call(app, PATH, sent)
+        assert sent[0][1]["status"] == 200
+
+async def test_streaming_body_is_not_buffered():
+    app = create_app()
+
+    async def slow_stream():
+        async def body():
+            yield b"first"
+            await asyncio.sleep(0.2)
+            yield b"last"
+        return StreamingResponse(body(), media_type="text/plain")
+    app.add_api_route("/bench/stream", slow_stream)
+
+    labels = {"method": "GET", "path": "/bench/stream", "status_code": "200"}
+
+    def ttfb(suffix: str) -> float:
+        return REGISTRY.get_sample_value(f"http_request_ttfb_seconds_{suffix}", labels) or 0.0
+
+    count, total = ttfb("count"), ttfb("sum")
+    sent: list = []
+    t0 = time.perf_counter()
+    await _call(app, "/bench/stream", sent)
+
+    start = next(m for _, m in sent if m["type"] == "http.response.start")
+    assert any(k == b"x-request-id" for k, _ in start["headers"])
+    first_chunk_at = next(t for t, m in sent if m.get("body") == b"first")
+    assert first_chunk_at - t0 < 0.1  # первый чанк ушёл до окончания генератора
+    # серия с шаблоном маршрута действительно записана, и TTFB в ней — до первого чанка, а не до конца тела
+    assert ttfb("count") == count + 1
+    assert ttfb("sum") - total < 0.1
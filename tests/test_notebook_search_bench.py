@@ -0,0 +1,131 @@
+# user-024: полнотекстовый поиск по дневнику на миллионе записей — меньше 50 мс на запрос
+import asyncio
+import os
+import time
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app.core.pagination import decode_cursor, encode_cursor
+from app.models.base import Base
+from app.repositories import notebook_repo
+
+pytestmark = pytest.mark.db
+
+ROWS = int(os.getenv("NOTEBOOK_BENCH_ROWS", "1000000"))
+USERS = 1_000  # ~ROWS / USERS записей на пользователя: по одной в день
+USER_ID = 500
+BUDGET_SECONDS = 0.050
+QUERIES = {
+    "rare": "медитация",        # ~1% записей
+    "common": "сон",
+    "phrase": '"сегодня был"',
+    "negation": "радость -работа",
+}
+
+_SEED = """
+WITH words(w) AS (SELECT ARRAY[
+    'сон', 'тревога', 'радость', 'работа', 'семья', 'прогулка', 'усталость', 'спорт', 'друзья', 'море',
+    'книга', 'музыка', 'дождь', 'солнце', 'встреча', 'разговор', 'страх', 'покой', 'дыхание', 'благодарность'])
+INSERT INTO notebook_entries (user_id, entry_date, mood, title, content)
+SELECT (g % :users) + 1, date '2000-01-01' + g / :users, 'ok',
+       w[1 + g * 7 % 20] || ' и ' || w[1 + g * 13 % 20],
+       concat_ws(' ', w[1 + g % 20], w[1 + g * 3 % 20], w[1 + g * 11 % 20], 'сегодня был', w[1 + g * 17 % 19],
+                 CASE WHEN g % 97 = 0 THEN 'медитация помогла' END, 'день', w[1 + g / 7 % 20])
+FROM generate_series(0, :rows - 1) g, words
+"""
+
+async def _seed(engine) -> str | None:
+    async with engine.begin() as conn:
+        await conn.execute(text(
+            "INSERT INTO users (email, password_hash, locale, is_active, role) "
+            "SELECT 'nb' || g || '@test.local', '-', 'ru', true, 'user' FROM generate_series(1, :users) g"
+        ), {"users": USERS})
+        # GIN дешевле построить один раз после загрузки, чем обновлять на каждой строке.
+        # Без btree_gin conftest его не создаёт — тогда меряем путь через btree по user_id
+        index_def = (await conn.execute(text(
+            "SELECT indexdef FROM pg_indexes WHERE indexname = 'ix_notebook_entries_user_search'"
+        ))).scalar_one_or_none()
+        if index_def:
+            await conn.execute(text("DROP INDEX ix_notebook_entries_user_search"))
+        await conn.execute(text(_SEED), {"users": USERS, "rows": ROWS})
+        if index_def:
+            await conn.execute(text(index_def))
+    async with engine.connect() as conn:
+        conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+        await conn.execute(text("VACUUM ANALYZE notebook_entries"))
+    return index_def
+
+@pytest.fixture(scope="module")
+def env(db_schema):
+    from tests.conftest import TEST_DATABASE_URL
+
+    # свой event loop и пул на весь модуль: бенчмарк синхронный, а соединения живут в одном loop
+    loop = asyncio.new_event_loop()
+    engine = create_async_engine(TEST_DATABASE_URL)
+    factory = async_sessionmaker(bind=engine, expire_on_commit=False, autoflush=False)
+    index_def = loop.run_until_complete(_seed(engine))
+    # какой индекс мерили — видно в выводе pytest -s
+    print(f"\nnotebook search: {ROWS} entries, {index_def or 'no btree_gin: user_id btree + filter'}")
+    yield loop, factory
+
+    async def teardown():
+        tables = ", ".join(t.name for t in Base.metadata.sorted_tables)
+        async with engine.begin() as conn:
+            await conn.execute(text(f"TRUNCATE {tables} RESTART IDENTITY CASCADE"))
+        await engine.dispose()
+    loop.run_until_complete(teardown())
+    loop.close()
+
+def _runner(env, q: str, after=None):
+    loop, factory = env
+
+    async def once():
+        async with factory() as db:
+            return await notebook_repo.search(db, USER_ID, q, limit=20, after=after)
+    return lambda: loop.run_until_complete(once())
+
+@pytest.mark.parametrize("kind", QUERIES)
+def test_bench_search(benchmark, env, kind):
+    hits = benchmark(_runner(env, QUERIES[kind]))
+    assert hits
+
+@pytest.mark.parametrize("kind", QUERIES)
+def test_search_under_budget(env, kind):
+    first = _runner(env, QUERIES[kind])
+    entry, rank = first()[-1]
+    # и первая страница, и продолжение по курсору
+    for fn in (first, _runner(env, QUERIES[kind], after=(rank, entry.id))):
+        fn()
+        best = float("inf")
+        for _ in range(5):
+            t0 = time.perf_counter()
+            fn()
+            best = min(best, time.perf_counter() - t0)
+        assert best < BUDGET_SECONDS
+
+def test_cursor_pages_cover_all_matches_once(env):
+    loop, factory = env
+    q = QUERIES["common"]
+
+    async def walk():
+        async with factory() as db:
+            total = (await db.execute(text(
+                "SELECT count(*) FROM notebook_entries "
+                "WHERE user_id = :u AND search_vector @@ websearch_to_tsquery('russian', :q)"
+            ), {"u": USER_ID, "q": q})).scalar_one()
+            seen, after = [], None
+            while True:
+                hits = await notebook_repo.search(db, USER_ID, q, limit=7, after=after)
+                seen += [entry.id for entry, _ in hits]
+                if len(hits) < 7:
+                    return total, seen
+                # курсор проходит через JSON, как X-Next-Cursor у эндпоинта
+                entry, rank = hits[-1]
+                c = decode_cursor(encode_cursor({"r": rank, "id": entry.id}))
+                after = (float(c["r"]), int(c["id"]))
+
+    total, seen = loop.run_until_complete(walk())
+    assert total > 20
+    assert len(seen) == len(set(seen)) == total
@@ -0,0 +1,39 @@
+# user-002: bcrypt в ограниченном пуле — перехэширование при смене стоимости и 503 при переполнении
+import asyncio
+import threading
+
+import pytest
+
+from app.core import security
+from app.core.settings import settings
+
+def _bcrypt(rounds: int) -> str:
+    return f"$2b${rounds:02d}$" + "a" * 21 + "e" + "a" * 30 + "e"
+
+@pytest.mark.parametrize("delta, stale", [(0, False), (-2, True), (2, True)])
+def test_hash_with_other_cost_needs_update(delta, stale):
+    assert security._pwd_ctx.needs_update(_bcrypt(settings.BCRYPT_ROUNDS + delta)) is stale
+
+@pytest.mark.db
+async def test_saturated_pool_returns_503(api, monkeypatch):
+    release = threading.Event()
+    monkeypatch.setattr(security, "hash_password", lambda _: release.wait(5) and "-")
+    monkeypatch.setattr(security, "_capacity", 1)
+
+    async def register(email: str):
+        return await api.post("/api/v1/auth/register", json={"email": email, "password": "secret123"})
+
+    first = asyncio.create_task(register("first@example.com"))
+    for _ in range(100):
+        if security._inflight:
+            break
+        await asyncio.sleep(0.01)
+    assert security._inflight == 1
+
+    busy = await register("second@example.com")
+    assert busy.status_code == 503
+    assert busy.headers["Retry-After"] == "1"
+
+    release.set()
+    assert (await first).status_code == 201
+    assert security._inflight == 0
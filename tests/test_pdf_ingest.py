@@ -0,0 +1,127 @@
+# user-022: ingestion PDF курса на фейковом S3 (moto) с PDF из корня репозитория
+import asyncio
+import time
+from pathlib import Path
+
+import pypdfium2 as pdfium
+import pytest
+from fakeredis import FakeRedis, FakeServer
+
+from app.core.settings import settings
+from app.models.course import Courses
+from app.repositories import course_page_repo
+from app.services import storage
+from app.tasks import pdf_ingest
+from app.tasks.pdf_ingest import ingest_course_pdf
+
+ROOT = Path(__file__).resolve().parent.parent
+PDFS = {name: (ROOT / name).read_bytes() for name in ("stress_part1.pdf", "stress_part2.pdf")}
+KEY = "courses/ingest/course.pdf"
+
+def _page_count(data: bytes) -> int:
+    pdf = pdfium.PdfDocument(data)
+    try:
+        return len(pdf)
+    finally:
+        pdf.close()
+
+@pytest.fixture
+def lock_redis(monkeypatch):
+    r = FakeRedis(server=FakeServer(), decode_responses=True)
+    monkeypatch.setattr(pdf_ingest, "_redis", r)
+    return r
+
+@pytest.fixture
+async def course_id(db, s3):
+    s3.put_object(Bucket=settings.S3_BUCKET, Key=KEY, Body=PDFS["stress_part1.pdf"])
+    course = Courses(slug="ingest", title="Ingest", summary="-", storage_key=KEY)
+    db.add(course)
+    await db.commit()
+    yield course.id
+    # движок воркера создаётся лениво на уровне модуля — не оставляем его следующим тестам
+    pdf_ingest._engine = None
+
+async def _ingest(course_id: int, **kwargs) -> None:
+    # задача синхронная и сама зовёт asyncio.run — в тесте она идёт в отдельном потоке, как в воркере
+    await asyncio.to_thread(lambda: ingest_course_pdf.apply(args=(course_id,), kwargs=kwargs).get())
+
+async def _course(db, course_id: int) -> Courses:
+    db.expire_all()
+    return await db.get(Courses, course_id)
+
+@pytest.mark.db
+async def test_ingest_writes_pages_text_and_thumbnails(db, s3, lock_redis, course_id, monkeypatch):
+    monkeypatch.setattr(settings, "INGEST_RANGE_CHUNK_BYTES", 1024)  # чтобы PDF читался несколькими ranged GET
+    await _ingest(course_id)
+
+    course = await _course(db, course_id)
+    expected = _page_count(PDFS["stress_part1.pdf"])
+    assert course.pdf_pages == expected
+    assert course.pdf_ingested_etag == storage.head_object(KEY)[1]
+
+    pages = await course_page_repo.list_for_course(db, course_id)
+    assert [p.page_no for p in pages] == list(range(1, expected + 1))
+    for page in pages:
+        thumb = s3.get_object(Bucket=settings.S3_BUCKET, Key=page.thumbnail_key)
+        assert thumb["ContentType"] == "image/jpeg"
+        assert thumb["Body"].read()[:2] == b"\xff\xd8"
+    assert lock_redis.keys("ingest:lock:*") == []
+
+@pytest.mark.db
+async def test_ingest_is_idempotent_and_follows_file_replacement(db, s3, lock_redis, course_id, monkeypatch):
+    await _ingest(course_id)
+    first = [(p.page_no, p.text) for p in await course_page_repo.list_for_course(db, course_id)]
+
+    # тот же ETag — PDF повторно не разбирается
+    def fail(*_):
+        raise AssertionError("already ingested file must not be parsed again")
+    with monkeypatch.context() as m:
+        m.setattr(pdf_ingest, "extract_pages", fail)
+        await _ingest(course_id)
+    db.expire_all()
+    assert [(p.page_no, p.text) for p in await course_page_repo.list_for_course(db, course_id)] == first
+
+    # файл под тем же ключом заменили — новый ETag, страницы пересчитываются
+    s3.put_object(Bucket=settings.S3_BUCKET, Key=KEY, Body=PDFS["stress_part2.pdf"])
+    await _ingest(course_id)
+    course = await _course(db, course_id)
+    assert course.pdf_pages == _page_count(PDFS["stress_part2.pdf"])
+    assert course.pdf_ingested_etag == storage.head_object(KEY)[1]
+    pages = await course_page_repo.list_for_course(db, course_id)
+    assert len(pages) == course.pdf_pages
+    assert all(str(course.pdf_ingested_etag) in p.thumbnail_key for p in pages)
+
+@pytest.mark.db
+async def test_replace_pages_beyond_bind_parameter_limit(db, seed):
+    # 4 параметра на страницу: одним INSERT 10 000 страниц упёрлись бы в предел asyncpg (32767)
+    _, course_id, _ = await seed(steps=0)
+    rows = [(no, f"page {no}", None) for no in range(1, 10_001)]
+
+    await course_page_repo.replace_pages(db, course_id, rows)
+    await course_page_repo.replace_pages(db, course_id, rows[:2_500])
+    await db.commit()
+
+    pages = await course_page_repo.list_for_course(db, course_id)
+    assert [(p.page_no, p.text) for p in pages] == [(no, text) for no, text, _ in rows[:2_500]]
+
+def test_contention_requeues_without_spending_retries(lock_redis, monkeypatch):
+    lock_redis.set("ingest:lock:7", "other-worker")
+    calls = []
+    monkeypatch.setattr(ingest_course_pdf, "apply_async", lambda *a, **kw: calls.append((a, kw)))
+    monkeypatch.setattr(pdf_ingest, "_load", lambda _: pytest.fail("must not run under someone else's lock"))
+
+    ingest_course_pdf.apply(args=(7,), retries=3).get()
+
+    assert calls == [(((7,), {"force": False}), {"countdown": 30, "retries": 3})]
+    assert lock_redis.get("ingest:lock:7") == "other-worker"
+
+def test_lock_is_extended_while_working(lock_redis, monkeypatch):
+    monkeypatch.setattr(settings, "INGEST_LOCK_SECONDS", 1)
+    with pdf_ingest._course_lock(7) as acquired:
+        assert acquired
+        token = lock_redis.get("ingest:lock:7")
+        time.sleep(2.5)  # дольше TTL: без продления блокировка бы истекла
+        assert lock_redis.get("ingest:lock:7") == token
+        with pdf_ingest._course_lock(7) as second:
+            assert not second
+    assert lock_redis.get("ingest:lock:7") is None
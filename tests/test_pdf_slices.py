@@ -0,0 +1,100 @@
+# user-023: срезы PDF reading-шагов — ключ от ETag исходника, ограниченное ожидание нарезки
+import asyncio
+import time
+from pathlib import Path
+
+import pypdfium2 as pdfium
+import pytest
+
+from app.core.settings import settings
+from app.services import pdf_slices
+
+ROOT = Path(__file__).resolve().parent.parent
+KEY = "courses/slices/course.pdf"
+
+@pytest.fixture(autouse=True)
+def clean_caches():
+    yield
+    pdf_slices._links.clear()
+    pdf_slices._sources.clear()
+    pdf_slices._inflight.clear()
+
+def _put(s3, name: str) -> None:
+    s3.put_object(Bucket=settings.S3_BUCKET, Key=KEY, Body=(ROOT / name).read_bytes())
+
+def _slice_text(s3, slice_key: str) -> str:
+    pdf = pdfium.PdfDocument(s3.get_object(Bucket=settings.S3_BUCKET, Key=slice_key)["Body"].read())
+    try:
+        return "".join(pdf[i].get_textpage().get_text_range() for i in range(len(pdf)))
+    finally:
+        pdf.close()
+
+async def _slice_key(version: int = 1) -> str:
+    await pdf_slices.get_link(KEY, version, 1, 1, filename="s.pdf")
+    _, etag = pdf_slices._sources.get((KEY, version))
+    return pdf_slices.slice_key(KEY, etag, 1, 1)
+
+async def test_replaced_source_gets_new_slice(s3):
+    _put(s3, "stress_part1.pdf")
+    first = await _slice_key()
+    assert _slice_text(s3, first).startswith("1111")
+
+    # файл шага заменили под тем же ключом, версия курса прежняя
+    _put(s3, "stress_part2.pdf")
+    pdf_slices._sources.clear()  # истёк PDF_SLICE_SOURCE_TTL_SECONDS
+    pdf_slices._links.clear()
+    second = await _slice_key()
+    assert second != first
+    assert _slice_text(s3, second).startswith("2222")
+
+async def test_new_course_version_rereads_source_immediately(s3):
+    _put(s3, "stress_part1.pdf")
+    first = await _slice_key(version=1)
+    _put(s3, "stress_part2.pdf")
+    assert await _slice_key(version=2) != first
+
+async def test_slow_cut_returns_pending_and_finishes_in_background(s3, monkeypatch):
+    _put(s3, "stress_part1.pdf")
+    monkeypatch.setattr(settings, "PDF_SLICE_WAIT_SECONDS", 0.05)
+    cut = pdf_slices._cut
+    monkeypatch.setattr(pdf_slices, "_cut", lambda *a: time.sleep(0.3) or cut(*a))
+
+    with pytest.raises(pdf_slices.SlicePending):
+        await pdf_slices.get_link(KEY, 1, 1, 1, filename="s.pdf")
+    (task,) = pdf_slices._inflight.values()
+    await task  # нарезка не отменилась вместе с запросом
+
+    monkeypatch.setattr(pdf_slices, "_cut", lambda *a: pytest.fail("slice is already in S3"))
+    link = await pdf_slices.get_link(KEY, 1, 1, 1, filename="s.pdf")
+    assert link.expires_in > 0
+
+async def test_concurrent_requests_cut_once(s3, monkeypatch):
+    _put(s3, "stress_part1.pdf")
+    cuts = []
+    cut = pdf_slices._cut
+    monkeypatch.setattr(pdf_slices, "_cut", lambda *a: cuts.append(a) or time.sleep(0.1) or cut(*a))
+    # исходник уже известен — все запросы сразу идут в single-flight
+    pdf_slices._sources.set((KEY, 1), await asyncio.to_thread(pdf_slices.storage.head_object, KEY))
+
+    await asyncio.gather(*(pdf_slices.get_link(KEY, 1, 1, 1, filename="s.pdf") for _ in range(5)))
+    assert len(cuts) == 1
+
+async def test_cuts_of_different_slices_do_not_overlap_in_pdfium(s3, monkeypatch):
+    _put(s3, "stress_part1.pdf")
+    active, peak = 0, 0
+    import_pages = pdfium.PdfDocument.import_pages
+
+    def tracked(self, *args, **kwargs):
+        nonlocal active, peak
+        active += 1
+        peak = max(peak, active)
+        time.sleep(0.05)
+        try:
+            return import_pages(self, *args, **kwargs)
+        finally:
+            active -= 1
+    monkeypatch.setattr(pdfium.PdfDocument, "import_pages", tracked)
+
+    # разные диапазоны — разные ключи, single-flight их не склеивает
+    await asyncio.gather(*(pdf_slices.get_link(KEY, 1, 1, end, filename="s.pdf") for end in range(1, 6)))
+    assert peak == 1
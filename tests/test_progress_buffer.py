@@ -0,0 +1,88 @@
+# user-016: write-behind прогресса — порядок записей по монотонному seq, updated_at — серверное время
+import pytest
+from fakeredis.aioredis import FakeRedis
+from sqlalchemy import func, select
+
+from app.models.course_progress import CourseProgress
+from app.repositories import course_progress_repo
+from app.services import progress_buffer
+
+pytestmark = pytest.mark.db
+
+@pytest.fixture
+async def redis(monkeypatch, session_factory):
+    monkeypatch.setattr(progress_buffer, "AsyncSessionLocal", session_factory)
+    r = FakeRedis(decode_responses=True)
+    yield r
+    await r.aclose()
+
+@pytest.fixture
+async def started(seed, session_factory):
+    (user_id,), course_id, _ = await seed()
+    async with session_factory() as db:
+        await course_progress_repo.create(db, user_id, course_id, 1)
+        await db.commit()
+    return user_id, course_id
+
+async def _row(session_factory, user_id, course_id) -> CourseProgress:
+    async with session_factory() as db:
+        return await course_progress_repo.get(db, user_id, course_id)
+
+async def test_flush_applies_buffer_with_server_time(redis, started, session_factory):
+    user_id, course_id = started
+    async with session_factory() as db:
+        db_before = await db.scalar(select(func.now()))
+
+    await progress_buffer.write(redis, user_id, course_id, current_page=7, status=0)
+    assert await progress_buffer.flush_once(redis) == 1
+
+    row = await _row(session_factory, user_id, course_id)
+    assert row.current_page == 7
+    assert row.progress_seq > 0
+    assert row.updated_at >= db_before  # не «задним числом» по часам app-хоста
+    assert await redis.exists(progress_buffer._key(user_id, course_id)) == 0
+
+async def test_buffered_pause_does_not_undo_completion(redis, seed, session_factory):
+    (user_id,), course_id, step_ids = await seed(steps=2)
+    async with session_factory() as db:
+        await course_progress_repo.create(db, user_id, course_id, 1)
+        await db.commit()
+    await progress_buffer.write(redis, user_id, course_id, current_page=7, status=1)
+
+    # курс завершён по шагам, пока пауза лежала в буфере
+    async with session_factory() as db:
+        await course_progress_repo.add_completed_steps(db, user_id, step_ids)
+        await db.commit()
+
+    await progress_buffer.flush_once(redis)
+    row = await _row(session_factory, user_id, course_id)
+    assert (row.current_page, row.progress_percent, row.status) == (7, 100, 2)
+
+async def test_late_flush_does_not_overwrite_newer_one(redis, started, session_factory):
+    user_id, course_id = started
+    await progress_buffer.write(redis, user_id, course_id, current_page=5, status=0)
+    stale = await progress_buffer.read(redis, user_id, course_id)
+    stale_seq = int(await redis.hget(progress_buffer._key(user_id, course_id), "seq"))
+
+    await progress_buffer.write(redis, user_id, course_id, current_page=9, status=0)
+    await progress_buffer.flush_once(redis)
+
+    # медленный флашер дописывает пачку, прочитанную до второй записи
+    async with session_factory() as db:
+        await course_progress_repo.bulk_update_progress(db, [(
+            user_id, course_id, stale["current_page"], stale["status"], stale_seq)])
+        await db.commit()
+
+    row = await _row(session_factory, user_id, course_id)
+    assert row.current_page == 9
+
+async def test_seq_survives_buffer_recreation(redis, started, session_factory):
+    user_id, course_id = started
+    await progress_buffer.write(redis, user_id, course_id, current_page=3, status=0)
+    await progress_buffer.flush_once(redis)
+    # хэш удалён после сброса; новая запись всё равно получает больший номер и применяется
+    await progress_buffer.write(redis, user_id, course_id, current_page=4, status=0)
+    await progress_buffer.flush_once(redis)
+
+    row = await _row(session_factory, user_id, course_id)
+    assert row.current_page == 4
@@ -0,0 +1,126 @@
+# tests/test_read_routing.py
+# Маршрутизация чтений (app/db/routing.py) на стенд-инах реплик: «зависшая» реплика — TCP-сервер,
+# который принимает соединение и молчит; «живая» — тестовый Postgres (лаг подменяется через _LAG_SQL).
+import asyncio
+import time
+
+import pytest
+from sqlalchemy import text
+
+from app.core.settings import settings
+from app.db import routing
+
+@pytest.fixture
+async def silent_server():
+    # принимает TCP и ничего не отвечает — asyncpg зависает на handshake
+    writers = []
+
+    async def handle(reader, writer):
+        writers.append(writer)
+        await reader.read()
+
+    server = await asyncio.start_server(handle, "127.0.0.1", 0)
+    port = server.sockets[0].getsockname()[1]
+    yield port
+    for w in writers:
+        w.close()
+    server.close()
+
+@pytest.fixture
+def replicas(monkeypatch):
+    def install(*urls: str) -> list[routing._Replica]:
+        reps = [routing._Replica(i, url) for i, url in enumerate(urls)]
+        monkeypatch.setattr(routing, "_replicas", reps)
+        return reps
+    monkeypatch.setattr(routing, "_redis", None)
+    routing._recent_writes.clear()
+    yield install
+    routing._recent_writes.clear()
+
+def _fresh(replica: routing._Replica, lag: float | None) -> None:
+    replica.lag = lag
+    replica.checked_at = time.monotonic()
+
+async def test_hanging_replica_connect_is_bounded_by_timeout(replicas, silent_server, monkeypatch):
+    monkeypatch.setattr(settings, "REPLICA_LAG_CHECK_TIMEOUT_SECONDS", 0.2)
+    (replica,) = replicas(f"postgresql+asyncpg://u:p@127.0.0.1:{silent_server}/db")
+    replica.lag = 0.0
+
+    started = time.monotonic()
+    await replica.refresh_lag()
+    elapsed = time.monotonic() - started
+
+    assert elapsed < 1.0
+    assert replica.lag is None
+    assert await routing.pick_read_engine(1) is routing._primary_readonly
+    await replica.engine.dispose()
+
+async def test_request_never_probes_the_replica(replicas, silent_server, monkeypatch):
+    (replica,) = replicas(f"postgresql+asyncpg://u:p@127.0.0.1:{silent_server}/db")
+
+    async def probe():
+        raise AssertionError("lag probe on the request path")
+    monkeypatch.setattr(replica, "refresh_lag", probe)
+
+    # замера ещё не было — сразу primary, без соединения к реплике
+    assert await routing.pick_read_engine(1) is routing._primary_readonly
+    # устаревший замер тоже не используется и не обновляется запросом
+    _fresh(replica, 0.0)
+    replica.checked_at -= 3 * settings.REPLICA_LAG_CHECK_INTERVAL_SECONDS
+    assert await routing.pick_read_engine(1) is routing._primary_readonly
+
+async def test_fresh_replica_within_lag_is_used(replicas):
+    a, b = replicas("postgresql+asyncpg://u:p@127.0.0.1:1/a", "postgresql+asyncpg://u:p@127.0.0.1:1/b")
+    _fresh(a, 0.1)
+    _fresh(b, settings.REPLICA_MAX_LAG_SECONDS + 1)
+
+    for _ in range(4):
+        assert await routing.pick_read_engine(1) is a.readonly
+
+async def test_all_replicas_lagging_falls_back_to_primary(replicas):
+    a, b = replicas("postgresql+asyncpg://u:p@127.0.0.1:1/a", "postgresql+asyncpg://u:p@127.0.0.1:1/b")
+    _fresh(a, settings.REPLICA_MAX_LAG_SECONDS + 1)
+    _fresh(b, None)
+
+    assert await routing.pick_read_engine(1) is routing._primary_readonly
+
+async def test_recent_writer_reads_from_primary(replicas):
+    (replica,) = replicas("postgresql+asyncpg://u:p@127.0.0.1:1/a")
+    _fresh(replica, 0.0)
+
+    await routing.mark_write(7)
+
+    assert await routing.pick_read_engine(7) is routing._primary_readonly
+    assert await routing.pick_read_engine(8) is replica.readonly
+
+async def _until(cond, timeout: float = 2.0) -> None:
+    async with asyncio.timeout(timeout):
+        while not cond():
+            await asyncio.sleep(0.01)
+
+@pytest.mark.db
+async def test_background_probe_measures_live_replica(replicas, db_schema, monkeypatch):
+    from tests.conftest import TEST_DATABASE_URL
+
+    monkeypatch.setattr(settings, "REPLICA_LAG_CHECK_INTERVAL_SECONDS", 0.05)
+    (replica,) = replicas(TEST_DATABASE_URL)
+    probe = asyncio.create_task(routing.run_lag_probe())
+    try:
+        # тестовый Postgres — не реплика: функции replay дают NULL, лаг 0
+        await _until(lambda: replica.lag is not None)
+        assert replica.lag == 0.0
+        assert await routing.pick_read_engine(1) is replica.readonly
+
+        monkeypatch.setattr(routing, "_LAG_SQL", text("SELECT 30.0"))
+        await _until(lambda: replica.lag != 0.0)
+        assert replica.lag == 30.0
+        assert await routing.pick_read_engine(1) is routing._primary_readonly
+    finally:
+        probe.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await probe
+        await replica.engine.dispose()
+
+async def test_probe_without_replicas_exits(replicas):
+    replicas()
+    await asyncio.wait_for(routing.run_lag_probe(), timeout=1)
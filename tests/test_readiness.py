@@ -0,0 +1,76 @@
+# user-015: /ready — одна проверка зависимостей на шторм проб, закэшированный отказ живёт не дольше TTL
+import asyncio
+
+import httpx
+import pytest
+
+from app.core.settings import settings
+from app.main import create_app
+from app.services import readiness
+
+@pytest.fixture
+def checks(monkeypatch):
+    """Подменённые проверки: счётчик вызовов, задержка и «упавший» Postgres."""
+    state = {"calls": 0, "delay": 0.0, "pg_down": False}
+
+    async def postgres():
+        state["calls"] += 1
+        await asyncio.sleep(state["delay"])
+        if state["pg_down"]:
+            raise ConnectionRefusedError("connection refused")
+        return {"version": "PostgreSQL 16"}
+
+    async def ok():
+        await asyncio.sleep(state["delay"])
+        return {}
+
+    monkeypatch.setattr(readiness, "_check_postgres", postgres)
+    monkeypatch.setattr(readiness, "_check_redis", lambda redis: ok)
+    monkeypatch.setattr(readiness, "_check_s3", ok)
+    monkeypatch.setattr(readiness, "_cached", None)
+    monkeypatch.setattr(readiness, "_cached_at", 0.0)
+    monkeypatch.setattr(readiness, "_refresh_task", None)
+    return state
+
+@pytest.fixture
+async def client():
+    app = create_app()
+    app.state.redis = None  # проверки подменены, lifespan не запускаем
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as c:
+        yield c
+
+async def _ready(client) -> dict:
+    resp = await client.get("/api/v1/health/ready")
+    assert resp.status_code == 200, resp.text
+    return resp.json()
+
+async def test_concurrent_probes_share_one_check(client, checks):
+    checks["delay"] = 0.1
+
+    bodies = await asyncio.gather(*(_ready(client) for _ in range(20)))
+
+    assert checks["calls"] == 1
+    assert {b["status"] for b in bodies} == {"ok"}
+    # в пределах TTL — из кэша, без новой проверки
+    assert (await _ready(client))["status"] == "ok"
+    assert checks["calls"] == 1
+
+async def test_cached_failure_expires_after_ttl(client, checks, monkeypatch):
+    monkeypatch.setattr(settings, "HEALTH_CACHE_SECONDS", 0.2)
+    checks["pg_down"] = True
+    body = await _ready(client)
+    assert body["status"] == "critical"
+    assert body["components"]["postgres"]["error"] == "connection refused"
+
+    checks["pg_down"] = False
+    assert (await _ready(client))["status"] == "critical"  # отказ ещё в кэше
+    assert checks["calls"] == 1
+
+    await asyncio.sleep(0.25)
+    # TTL истёк: проба отдаёт прежний результат сразу и запускает одну проверку в фоне
+    assert (await _ready(client))["status"] == "critical"
+    await readiness._refresh_task
+    assert checks["calls"] == 2
+    body = await _ready(client)
+    assert body["status"] == "ok"
+    assert body["components"]["postgres"]["error"] is None
@@ -0,0 +1,83 @@
+# user-014: атомарная ротация refresh-токенов Lua-скриптами и индекс сессий пользователя
+import asyncio
+
+import pytest
+from fakeredis.aioredis import FakeRedis
+from redis.crc import key_slot
+
+from app.scripts import migrate_refresh_keys
+from app.services import refresh_sessions
+
+UID = 7
+
+@pytest.fixture
+async def redis():
+    r = FakeRedis(decode_responses=True)
+    yield r
+    await r.aclose()
+
+async def _live(redis, user_id: int = UID) -> set[str]:
+    return {jti for jti, _ in await refresh_sessions.list_sessions(redis, user_id)}
+
+async def test_concurrent_rotations_of_one_token_succeed_once(redis):
+    await refresh_sessions.store(redis, "old", UID)
+
+    results = await asyncio.gather(
+        refresh_sessions.rotate(redis, "old", "new-a", UID),
+        refresh_sessions.rotate(redis, "old", "new-b", UID),
+    )
+
+    assert sorted(results) == [False, True]
+    winner = "new-a" if results[0] else "new-b"
+    assert await _live(redis) == {winner}
+    assert await redis.exists(refresh_sessions._refresh_key(UID, "old")) == 0
+
+async def test_reused_token_is_rejected(redis):
+    await refresh_sessions.store(redis, "old", UID)
+    assert await refresh_sessions.rotate(redis, "old", "new", UID)
+
+    # старый токен предъявили повторно (например, украденная копия) — отказ, новую сессию не заводим
+    assert not await refresh_sessions.rotate(redis, "old", "stolen", UID)
+    assert await _live(redis) == {"new"}
+    assert await refresh_sessions.rotate(redis, "new", "newer", UID)
+
+async def test_token_of_another_user_is_rejected(redis):
+    await refresh_sessions.store(redis, "theirs", UID + 1)
+    assert not await refresh_sessions.rotate(redis, "theirs", "mine", UID)
+    assert await _live(redis, UID + 1) == {"theirs"}
+
+async def test_revoke_all_removes_every_session(redis, monkeypatch):
+    monkeypatch.setattr(refresh_sessions, "_REVOKE_BATCH", 2)  # несколько пачек
+    for jti in ("a", "b", "c", "d", "e"):
+        await refresh_sessions.store(redis, jti, UID)
+    await refresh_sessions.store(redis, "other", UID + 1)
+
+    assert await refresh_sessions.revoke_all(redis, UID) == 5
+
+    assert await _live(redis) == set()
+    assert await redis.keys(f"*{{{UID}}}*") == []
+    assert not await refresh_sessions.rotate(redis, "a", "again", UID)
+    assert await _live(redis, UID + 1) == {"other"}  # чужие сессии не тронуты
+
+async def test_revoke_one_session(redis):
+    await refresh_sessions.store(redis, "a", UID)
+    await refresh_sessions.store(redis, "b", UID)
+    await refresh_sessions.revoke(redis, "a", UID)
+    assert await _live(redis) == {"b"}
+
+def test_user_keys_share_a_cluster_slot():
+    keys = [refresh_sessions._refresh_key(UID, "a"), refresh_sessions._refresh_key(UID, "b"),
+            refresh_sessions._sessions_key(UID)]
+    assert len({key_slot(k.encode()) for k in keys}) == 1
+
+async def test_legacy_keys_are_migrated(redis, monkeypatch):
+    await redis.set("refresh:legacy", str(UID), ex=3600)
+    await redis.zadd(f"sessions:{UID}", {"legacy": 1})
+    monkeypatch.setattr(migrate_refresh_keys.Redis, "from_url", lambda *a, **kw: redis)
+    monkeypatch.setattr(redis, "close", lambda: asyncio.sleep(0))
+
+    await migrate_refresh_keys.main()
+
+    assert await redis.exists("refresh:legacy", f"sessions:{UID}") == 0
+    assert await _live(redis) == {"legacy"}
+    assert await refresh_sessions.rotate(redis, "legacy", "new", UID)
@@ -0,0 +1,79 @@
+# user-006: метка path в http-метриках — шаблон маршрута, __unmatched__ для неизвестных путей, бюджет серий
+import httpx
+import pytest
+
+from app.core import observability
+from app.core.observability import (
+    OVERFLOW_PATH, REGISTRY, UNMATCHED_PATH, RouteTemplateResolver, _SeriesBudget,
+)
+from app.main import create_app
+
+app = create_app()
+
+@pytest.fixture
+def resolver() -> RouteTemplateResolver:
+    r = RouteTemplateResolver()
+    r.build(app.routes)
+    return r
+
+@pytest.mark.parametrize(("path", "template"), [
+    ("/api/v1/notebook/42", "/api/v1/notebook/{entry_id}"),
+    ("/api/v1/notebook/search", "/api/v1/notebook/search"),  # статический маршрут раньше параметрического
+    ("/api/v1/health/live", "/api/v1/health/live"),
+    ("/wp-login.php", UNMATCHED_PATH),
+    ("/api/v1/notebook/42/extra", UNMATCHED_PATH),
+])
+def test_resolver_maps_paths_to_templates(resolver, path, template):
+    assert resolver.resolve(path) == template
+
+def test_resolver_before_build_is_unmatched():
+    assert RouteTemplateResolver().resolve("/api/v1/health/live") == UNMATCHED_PATH
+
+def test_budget_stops_admitting_new_series_at_limit():
+    budget = _SeriesBudget(limit=2)
+    a, b, c = ("GET", "/a", "200"), ("GET", "/b", "200"), ("GET", "/c", "200")
+
+    assert budget.admit(a) and budget.admit(b)
+    assert not budget.admit(c)
+    assert budget.admit(a)  # уже заведённые серии пишутся и дальше
+    assert not budget.admit(c)
+
+def _count(method: str, path: str, status: int) -> float:
+    labels = {"method": method, "path": path, "status_code": str(status)}
+    return REGISTRY.get_sample_value("http_requests_total", labels) or 0.0
+
+async def _get(path: str, method: str = "GET") -> int:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        return (await client.request(method, path)).status_code
+
+async def test_requests_are_labelled_by_template(monkeypatch):
+    monkeypatch.setattr(observability, "_series_budget", _SeriesBudget(limit=1000))
+    template = "/api/v1/notebook/{entry_id}"
+    before = {
+        "param": _count("GET", template, 401),
+        "method": _count("PUT", template, 405),
+        "unmatched": _count("GET", UNMATCHED_PATH, 404),
+    }
+
+    for entry_id in (1, 2, 3):
+        assert await _get(f"/api/v1/notebook/{entry_id}") == 401
+    assert await _get("/api/v1/notebook/1", method="PUT") == 405  # 405 — та же метка шаблона
+    for path in ("/.env", "/admin/config.php"):
+        assert await _get(path) == 404
+
+    assert _count("GET", template, 401) - before["param"] == 3
+    assert _count("PUT", template, 405) - before["method"] == 1
+    assert _count("GET", UNMATCHED_PATH, 404) - before["unmatched"] == 2
+    assert _count("GET", "/api/v1/notebook/1", 401) == 0
+
+async def test_new_series_past_budget_go_to_overflow(monkeypatch):
+    monkeypatch.setattr(observability, "_series_budget", _SeriesBudget(limit=1))
+    overflow = REGISTRY.get_sample_value("http_metrics_series_overflow_total")
+    before = _count("GET", OVERFLOW_PATH, 404)
+
+    assert await _get("/api/v1/health/live") == 200  # первая серия занимает весь бюджет
+    assert await _get("/missing") == 404
+
+    assert _count("GET", OVERFLOW_PATH, 404) - before == 1
+    assert REGISTRY.get_sample_value("http_metrics_series_overflow_total") - overflow == 1
@@ -0,0 +1,53 @@
+# user-011: версионированный кэш каталога шагов
+import json
+
+import pytest
+from fakeredis import FakeServer
+from fakeredis.aioredis import FakeRedis
+
+from app.core.settings import settings
+from app.models.course_step import CourseStep, StepType
+from app.services import step_cache
+
+@pytest.fixture
+async def redis():
+    step_cache._versions.clear()
+    step_cache._bodies.clear()
+    r = FakeRedis(server=FakeServer())
+    yield r
+    await r.aclose()
+    step_cache._versions.clear()
+    step_cache._bodies.clear()
+
+async def test_bump_survives_redis_outage(redis):
+    server = FakeServer()
+    server.connected = False
+    broken = FakeRedis(server=server)
+    await step_cache.bump_version(broken, 1)  # шаг уже закоммичен — не 500
+    await broken.aclose()
+
+@pytest.mark.db
+async def test_version_key_outlives_bodies(redis, db, seed, session_factory):
+    _, course_id, _ = await seed(steps=2)
+
+    body = await step_cache.get_steps_json(db, redis, course_id)
+    assert len(json.loads(body)) == 2
+
+    await step_cache.bump_version(redis, course_id)
+    await step_cache.get_steps_json(db, redis, course_id)
+    ver_ttl = await redis.ttl(step_cache._version_key(course_id))
+    body_ttl = await redis.ttl(step_cache._body_key(course_id, 1))
+    assert body_ttl <= settings.STEP_CACHE_REDIS_TTL_SECONDS < ver_ttl
+
+@pytest.mark.db
+async def test_new_step_visible_after_bump(redis, db, seed, session_factory):
+    _, course_id, _ = await seed(steps=1)
+    assert len(json.loads(await step_cache.get_steps_json(db, redis, course_id))) == 1
+
+    async with session_factory() as s:
+        s.add(CourseStep(course_id=course_id, order_index=5, title="New", type=StepType.reading,
+                         config={"type": "reading", "start_page": 1, "end_page": 2}))
+        await s.commit()
+    await step_cache.bump_version(redis, course_id)
+
+    assert len(json.loads(await step_cache.get_steps_json(db, redis, course_id))) == 2
@@ -0,0 +1,84 @@
+# user-010: POST /steps/complete:batch — смешанная пачка (новые, повторные, чужие шаги) и лимит размера
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import select
+
+from app.models.course_progress import CourseProgress
+from app.models.course_step_progress import CourseStepProgress, StepStatus
+from app.repositories import course_progress_repo, course_step_progress_repo
+from app.schemas.steps import MAX_BATCH_COMPLETE
+
+pytestmark = pytest.mark.db
+
+URL = "/api/v1/course_steps/steps/complete:batch"
+
+def _item(step_id: int, pages: int = 1, completed_at: datetime | None = None) -> dict:
+    item = {"step_id": step_id, "metrics": {"pages_read": pages}}
+    if completed_at is not None:
+        item["completed_at"] = completed_at.isoformat()
+    return item
+
+async def _progress(db, user_id: int) -> dict[int, CourseStepProgress]:
+    res = await db.execute(select(CourseStepProgress).where(CourseStepProgress.user_id == user_id))
+    return {p.step_id: p for p in res.scalars()}
+
+async def test_mixed_batch(api, api_user, db, seed):
+    (me,), course_id, (done, fresh, other_fresh, stale) = await seed(steps=4)
+    api_user.id = me
+    now = datetime.now(timezone.utc)
+    # done и stale уже завершены раньше, stale — позже, чем придёт в пачке
+    for step_id, ts in ((done, now - timedelta(hours=2)), (stale, now)):
+        await course_step_progress_repo.complete_many(db, me, [(step_id, ts, {"type": "reading", "pages_read": 1})])
+    await course_progress_repo.add_completed_steps(db, me, [done, stale])
+    await db.commit()
+    foreign = other_fresh + 1000
+
+    resp = await api.post(URL, json={"items": [
+        _item(fresh, completed_at=now - timedelta(minutes=5)),
+        _item(done, pages=7),
+        _item(foreign),
+        _item(fresh, pages=3),  # более поздняя запись того же шага — она и применяется
+        _item(stale, completed_at=now - timedelta(hours=1)),
+        _item(other_fresh),
+    ]})
+
+    assert resp.status_code == 200, resp.text
+    assert [(r["step_id"], r["status"]) for r in resp.json()] == [
+        (fresh, "duplicate"), (done, "applied"), (foreign, "not_found"),
+        (fresh, "applied"), (stale, "stale"), (other_fresh, "applied"),
+    ]
+    db.expire_all()
+    rows = await _progress(db, me)
+    assert set(rows) == {done, fresh, other_fresh, stale}
+    assert all(r.status == StepStatus.completed for r in rows.values())
+    assert rows[fresh].metrics["pages_read"] == 3
+    assert rows[done].metrics["pages_read"] == 7  # повтор обновляет метрики
+    assert rows[stale].completed_at == now  # более старое завершение не перетирает
+    # в счётчик курса попадают только впервые завершённые шаги, повтор — не второй раз
+    progress = (await db.execute(select(CourseProgress).where(CourseProgress.user_id == me))).scalar_one()
+    assert (progress.course_id, progress.completed_steps) == (course_id, 4)
+
+async def test_repeated_batch_does_not_count_twice(api, api_user, db, seed):
+    (me,), _, step_ids = await seed(steps=2)
+    api_user.id = me
+    body = {"items": [_item(s) for s in step_ids]}
+
+    for _ in range(2):
+        resp = await api.post(URL, json=body)
+        assert resp.status_code == 200, resp.text
+        assert {r["status"] for r in resp.json()} == {"applied"}
+
+    progress = (await db.execute(select(CourseProgress).where(CourseProgress.user_id == me))).scalar_one()
+    assert progress.completed_steps == 2
+
+@pytest.mark.parametrize(("size", "status"), [(MAX_BATCH_COMPLETE, 200), (MAX_BATCH_COMPLETE + 1, 422), (0, 422)])
+async def test_batch_size_limit(api, api_user, db, seed, size, status):
+    (me,), _, (step_id, *_) = await seed()
+    api_user.id = me
+
+    resp = await api.post(URL, json={"items": [_item(step_id) for _ in range(size)]})
+
+    assert resp.status_code == status, resp.text
+    if status == 422:
+        assert await _progress(db, me) == {}  # отклонённая пачка ничего не пишет
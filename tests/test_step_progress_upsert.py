@@ -0,0 +1,111 @@
+# user-009: upsert_start/complete под гонкой — одна строка, без IntegrityError, «впервые» ровно один раз
+import asyncio
+from datetime import datetime, timezone
+
+import pytest
+from sqlalchemy import event, func, select
+
+from app.models.course_step_progress import CourseStepProgress, StepStatus
+from app.repositories import course_step_progress_repo as repo
+
+pytestmark = pytest.mark.db
+
+PARALLEL = 16
+
+async def _in_tx(session_factory, fn):
+    async with session_factory() as db:
+        result = await fn(db)
+        await db.commit()
+        return result
+
+async def _rows(db, user_id: int, step_id: int) -> list[CourseStepProgress]:
+    res = await db.execute(select(CourseStepProgress).where(
+        CourseStepProgress.user_id == user_id, CourseStepProgress.step_id == step_id))
+    return list(res.scalars())
+
+async def test_concurrent_start_creates_single_row(session_factory, seed, db):
+    (user_id,), _, (step_id, *_) = await seed()
+
+    rows = await asyncio.gather(*(
+        _in_tx(session_factory, lambda s: repo.upsert_start(s, user_id, step_id)) for _ in range(PARALLEL)
+    ))
+
+    assert {r.id for r in rows} == {rows[0].id}
+    assert {r.started_at for r in rows} == {rows[0].started_at}  # первое started_at не перетирается
+    (row,) = await _rows(db, user_id, step_id)
+    assert row.status == StepStatus.in_progress
+
+async def test_concurrent_complete_counts_once(session_factory, seed, db):
+    (user_id,), _, (step_id, *_) = await seed()
+
+    results = await asyncio.gather(*(
+        _in_tx(session_factory, lambda s, i=i: repo.complete(s, user_id, step_id, {"attempt": i}))
+        for i in range(PARALLEL)
+    ))
+
+    assert sum(newly for _, newly in results) == 1
+    (row,) = await _rows(db, user_id, step_id)
+    assert row.status == StepStatus.completed
+
+async def test_start_and_complete_race_never_downgrades(session_factory, seed, db):
+    (user_id,), _, step_ids = await seed(steps=4)
+
+    async def start(s, step_id):
+        return await repo.upsert_start(s, user_id, step_id)
+
+    async def complete(s, step_id):
+        return await repo.complete(s, user_id, step_id, {})
+
+    jobs = []
+    for step_id in step_ids:
+        for i in range(PARALLEL // 2):
+            fn = complete if i % 2 else start
+            jobs.append(_in_tx(session_factory, lambda s, fn=fn, step_id=step_id: fn(s, step_id)))
+    await asyncio.gather(*jobs)
+
+    res = await db.execute(
+        select(CourseStepProgress.status, func.count())
+        .where(CourseStepProgress.user_id == user_id)
+        .group_by(CourseStepProgress.status)
+    )
+    # upsert_start после завершения не откатывает completed -> in_progress
+    assert dict(res.all()) == {StepStatus.completed: len(step_ids)}
+
+async def test_complete_many_counts_each_step_once(session_factory, seed):
+    (user_id,), _, step_ids = await seed(steps=5)
+    now = datetime.now(timezone.utc)
+    items = [(step_id, now, {}) for step_id in step_ids]
+
+    results = await asyncio.gather(*(
+        _in_tx(session_factory, lambda s: repo.complete_many(s, user_id, items)) for _ in range(PARALLEL // 2)
+    ))
+
+    newly = [step for _, n in results for step in n]
+    assert sorted(newly) == sorted(step_ids)
+    assert all(written == set(step_ids) for written, _ in results)
+
+async def test_complete_is_a_single_statement(db, seed):
+    (user_id,), _, (step_id, *_) = await seed()
+    statements = []
+
+    def count(*_):
+        statements.append(1)
+
+    engine = db.bind.sync_engine
+    event.listen(engine, "before_cursor_execute", count)
+    try:
+        started = await repo.upsert_start(db, user_id, step_id)
+        statements.clear()
+        first, newly = await repo.complete(db, user_id, step_id, {"score": 1})
+        assert (newly, len(statements)) == (True, 1)  # in_progress -> completed тоже переход
+
+        statements.clear()
+        again, newly = await repo.complete(db, user_id, step_id, {"score": 2})
+        assert (newly, len(statements)) == (False, 1)
+    finally:
+        event.remove(engine, "before_cursor_execute", count)
+
+    assert again.id == first.id
+    assert again.started_at == started.started_at
+    assert again.metrics == {"score": 2}
+    assert again.completed_at >= first.completed_at
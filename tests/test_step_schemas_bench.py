@@ -0,0 +1,79 @@
+# user-012: tagged-union валидация конфигов/метрик шагов против перебора всех вариантов Union
+import time
+from typing import Union
+
+import pytest
+from pydantic import TypeAdapter, ValidationError
+
+from app.schemas import steps
+from app.schemas.steps import StepConfig, parse_metrics
+
+CONFIGS = {
+    "meditation": {"type": "meditation", "duration_min": 15},
+    "reading": {"type": "reading", "start_page": 3, "end_page": 9},
+    "quiz": {"type": "quiz", "questions_key": "intro-quiz"},
+    "reflection": {"type": "reflection", "prompt": "What did you notice?"},
+    "video": {"type": "video", "url": "https://cdn.example/v.mp4", "duration_sec": 300},
+    "exercise": {"type": "exercise", "reps": 10},
+}
+# как шлют клиенты: без type
+METRICS = {
+    "meditation": {"actual_duration_sec": 540},
+    "reading": {"pages_read": 7},
+    "quiz": {"correct": 4, "total": 5},
+    "reflection": {"notebook_entry_id": 42},
+    "video": {"watched_sec": 280},
+    "exercise": {"done_reps": 10},
+}
+TYPES = list(CONFIGS)
+
+_tagged_config = TypeAdapter(StepConfig)
+# прежний вариант: обычный Union, pydantic пробует все члены
+_plain_config = TypeAdapter(Union[
+    steps.MeditationConfig, steps.ReadingConfig, steps.QuizConfig,
+    steps.ReflectionConfig, steps.VideoConfig, steps.ExerciseConfig,
+])
+
+@pytest.mark.parametrize("step_type", TYPES)
+def test_bench_config_tagged(benchmark, step_type):
+    benchmark(_tagged_config.validate_python, CONFIGS[step_type])
+
+@pytest.mark.parametrize("step_type", TYPES)
+def test_bench_config_plain_union(benchmark, step_type):
+    benchmark(_plain_config.validate_python, CONFIGS[step_type])
+
+@pytest.mark.parametrize("step_type", TYPES)
+def test_bench_metrics_by_step_type(benchmark, step_type):
+    benchmark(parse_metrics, METRICS[step_type], step_type)
+
+def _best(fn, arg, n=2_000) -> float:
+    best = float("inf")
+    for _ in range(5):
+        t0 = time.perf_counter()
+        for _ in range(n):
+            fn(arg)
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+def test_tagged_config_is_not_slower_than_plain_union():
+    tagged = sum(_best(_tagged_config.validate_python, c) for c in CONFIGS.values())
+    plain = sum(_best(_plain_config.validate_python, c) for c in CONFIGS.values())
+    assert tagged < plain
+
+@pytest.mark.parametrize("step_type", TYPES)
+def test_metrics_tagged_by_step_type(step_type):
+    assert parse_metrics(METRICS[step_type], step_type).type == step_type
+
+def test_metrics_type_mismatch_rejected():
+    with pytest.raises(ValidationError):
+        parse_metrics({"type": "video", "watched_sec": 1}, "reading")
+
+def test_metrics_wrong_shape_for_step_type_rejected():
+    # раньше {"pages_read": 3} на quiz-шаге молча сохранялся как reading-метрики
+    with pytest.raises(ValidationError):
+        parse_metrics(METRICS["reading"], "quiz")
+
+def test_empty_exercise_metrics_allowed():
+    assert parse_metrics({}, "exercise").type == "exercise"
+    with pytest.raises(ValidationError):
+        parse_metrics({}, "meditation")
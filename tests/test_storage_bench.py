@@ -0,0 +1,75 @@
+# user-003: один долгоживущий S3-клиент (presign без пересоздания клиента) и HEAD вне event loop
+import asyncio
+import time
+
+import boto3
+import pytest
+
+from app.core.settings import settings
+from app.services import storage
+
+KEY = "courses/bench/course.pdf"
+PRESIGN = {
+    "get": lambda: storage.presign_get(KEY, filename="course.pdf"),
+    "put": lambda: storage.presign_put(KEY),
+}
+
+def _new_client():
+    return boto3.client(
+        "s3", endpoint_url=settings.S3_ENDPOINT, region_name=settings.S3_REGION,
+        aws_access_key_id=settings.S3_ACCESS_KEY, aws_secret_access_key=settings.S3_SECRET_KEY,
+    )
+
+@pytest.fixture
+def client_per_call(monkeypatch):
+    # как было: новый клиент на каждый запрос
+    monkeypatch.setattr(storage, "_s3", _new_client)
+
+@pytest.fixture
+def shared_client(monkeypatch):
+    monkeypatch.setattr(storage, "_client", None)
+    storage._s3()
+
+@pytest.mark.parametrize("op", PRESIGN)
+def test_bench_presign_client_per_call(benchmark, client_per_call, op):
+    assert KEY in benchmark(PRESIGN[op])
+
+@pytest.mark.parametrize("op", PRESIGN)
+def test_bench_presign_shared_client(benchmark, shared_client, op):
+    assert KEY in benchmark(PRESIGN[op])
+
+def _per_call(fn, n: int = 20) -> float:
+    fn()
+    t0 = time.perf_counter()
+    for _ in range(n):
+        fn()
+    return (time.perf_counter() - t0) / n
+
+@pytest.mark.parametrize("op", PRESIGN)
+def test_presign_with_shared_client_is_cheaper(monkeypatch, op):
+    with monkeypatch.context() as m:
+        m.setattr(storage, "_s3", _new_client)
+        per_new = _per_call(PRESIGN[op])
+    monkeypatch.setattr(storage, "_client", None)
+    per_shared = _per_call(PRESIGN[op])
+    # подпись — доли миллисекунды, создание клиента — миллисекунды
+    assert per_shared * 5 < per_new
+
+async def test_head_bucket_does_not_block_loop(monkeypatch):
+    monkeypatch.setattr(storage, "head_bucket", lambda: time.sleep(0.5) or True)
+    ticks = 0
+
+    async def ticker():
+        nonlocal ticks
+        while True:
+            await asyncio.sleep(0.01)
+            ticks += 1
+
+    task = asyncio.create_task(ticker())
+    t0 = time.perf_counter()
+    ok = await storage.head_bucket_async(timeout=0.2)
+    elapsed = time.perf_counter() - t0
+    task.cancel()
+    assert ok is False  # таймаут, а не зависание на медленном S3
+    assert elapsed < 0.4
+    assert ticks >= 5  # event loop всё это время жил
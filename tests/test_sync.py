@@ -0,0 +1,81 @@
+# user-019: дельта-синхронизация — водяной знак по xmin снимка, инкрементальные ответы, tombstones
+from datetime import date, datetime, timedelta, timezone
+
+import pytest
+
+from app.core.pagination import encode_cursor
+from app.models.notebook_entry import MoodEnum, NotebookEntry
+
+pytestmark = pytest.mark.db
+
+@pytest.fixture
+async def me(api_user, seed):
+    (user_id, other), _, _ = await seed(users=2)
+    api_user.id = user_id
+    return user_id, other
+
+async def _sync(api, since: str | None = None) -> dict:
+    resp = await api.get("/api/v1/sync", params={"since": since} if since else {})
+    assert resp.status_code == 200, resp.text
+    return resp.json()
+
+async def _write(api, day: int, **fields) -> int:
+    resp = await api.post("/api/v1/notebook", json={"entry_date": date(2026, 1, day).isoformat(), "mood": "ok", **fields})
+    assert resp.status_code == 201, resp.text
+    return resp.json()["id"]
+
+async def test_incremental_pages_return_only_new_changes(api, me, session_factory):
+    first, second = await _write(api, 1), await _write(api, 2)
+    async with session_factory() as s:
+        # чужие записи в ответ не попадают
+        s.add(NotebookEntry(user_id=me[1], entry_date=date(2026, 1, 1), mood=MoodEnum.ok))
+        await s.commit()
+
+    full = await _sync(api)
+    assert {e["id"] for e in full["notebook"]} == {first, second}
+    assert full["deleted"] == []
+
+    empty = await _sync(api, full["watermark"])
+    assert (empty["notebook"], empty["deleted"]) == ([], [])
+
+    resp = await api.patch(f"/api/v1/notebook/{second}", json={"title": "changed"})
+    assert resp.status_code == 200
+    third = await _write(api, 3)
+    delta = await _sync(api, empty["watermark"])
+    assert {e["id"]: e["title"] for e in delta["notebook"]} == {second: "changed", third: None}
+
+    assert (await _sync(api, delta["watermark"]))["notebook"] == []
+
+async def test_deletion_is_delivered_as_tombstone(api, me):
+    entry = await _write(api, 1)
+    watermark = (await _sync(api))["watermark"]
+
+    assert (await api.delete(f"/api/v1/notebook/{entry}")).status_code == 204
+    delta = await _sync(api, watermark)
+
+    assert delta["notebook"] == []
+    assert [(d["entity"], d["id"]) for d in delta["deleted"]] == [("notebook", entry)]
+    assert (await _sync(api, delta["watermark"]))["deleted"] == []
+
+async def test_long_transaction_committed_after_watermark_is_not_lost(api, me, session_factory):
+    async with session_factory() as long_tx:
+        long_tx.add(NotebookEntry(user_id=me[0], entry_date=date(2026, 1, 1), mood=MoodEnum.ok))
+        await long_tx.flush()  # xid выдан, строка ещё не видна
+        before = await _sync(api)
+        assert before["notebook"] == []
+        await long_tx.commit()
+
+    # строка записана раньше, чем взят водяной знак, но закоммичена позже — приходит в следующей дельте
+    after = await _sync(api, before["watermark"])
+    assert [e["entry_date"] for e in after["notebook"]] == ["2026-01-01"]
+
+async def test_time_based_watermark_requires_full_sync(api, me):
+    legacy = encode_cursor({"t": datetime.now(timezone.utc).isoformat()})
+    assert (await api.get("/api/v1/sync", params={"since": legacy})).status_code == 410
+
+async def test_watermark_older_than_tombstone_retention_requires_full_sync(api, me):
+    old = encode_cursor({"x": 1, "t": (datetime.now(timezone.utc) - timedelta(days=365)).isoformat()})
+    assert (await api.get("/api/v1/sync", params={"since": old})).status_code == 410
+
+async def test_garbage_watermark_is_400(api, me):
+    assert (await api.get("/api/v1/sync", params={"since": "garbage"})).status_code == 400
@@ -0,0 +1,97 @@
+# user-001: кэш принципала сбрасывается после commit изменения профиля — и в других воркерах
+import asyncio
+
+import pytest
+from fakeredis import FakeServer
+from fakeredis.aioredis import FakeRedis
+
+from app.api.v1 import user as user_api
+from app.schemas.user import UserCreate, UserUpdate
+from app.services import user_cache
+
+@pytest.fixture(autouse=True)
+def local_only(monkeypatch):
+    monkeypatch.setattr(user_cache, "_redis", None)
+    user_cache._local.clear()
+    yield
+    user_cache._local.clear()
+
+@pytest.mark.db
+async def test_update_drops_cached_principal(db, session_factory, monkeypatch):
+    async def fake_hash(_: str) -> str:
+        return "-"
+    monkeypatch.setattr(user_api, "hash_password_async", fake_hash)  # bcrypt тут ни при чём
+    created = await user_api.create_user(UserCreate(email="cache@example.com", password="secret123"), db=db)
+
+    async with session_factory() as s:
+        cached = await user_cache.get_user(s, created.id)
+    assert cached.city is None
+    assert user_cache._local.get(created.id) is not None
+
+    await user_api.update_user(created.id, UserUpdate(city="Riga"), db=db, current_user=cached)
+
+    assert user_cache._local.get(created.id) is None
+    async with session_factory() as s:
+        assert (await user_cache.get_user(s, created.id)).city == "Riga"
+
+@pytest.fixture
+async def workers():
+    """Два клиента одного Redis — как два воркера uvicorn."""
+    server = FakeServer()
+    a, b = FakeRedis(server=server, decode_responses=True), FakeRedis(server=server, decode_responses=True)
+    yield a, b
+    await a.aclose()
+    await b.aclose()
+
+async def _until(cond, timeout: float = 2.0) -> None:
+    async with asyncio.timeout(timeout):
+        while not cond():
+            await asyncio.sleep(0.01)
+
+async def test_invalidate_in_one_worker_drops_l1_in_another(workers, monkeypatch):
+    this, other = workers
+    listener = asyncio.create_task(user_cache.run_invalidation_listener(this))
+    try:
+        async with asyncio.timeout(2):  # ждём, пока слушатель подпишется
+            while (await other.pubsub_numsub(user_cache._INVALIDATE_CHANNEL))[0][1] == 0:
+                await asyncio.sleep(0.01)
+        user_cache._local.set(7, {"id": 7})
+        user_cache._local.set(8, {"id": 8})
+
+        # invalidate выполняется в «другом» воркере, со своим Redis-клиентом
+        monkeypatch.setattr(user_cache, "_redis", other)
+        await other.set(user_cache._key(7), "{}")
+        await user_cache.invalidate(7)
+
+        await _until(lambda: user_cache._local.get(7) is None)
+        assert user_cache._local.get(8) is not None
+        assert await other.exists(user_cache._key(7)) == 0
+    finally:
+        listener.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await listener
+
+async def test_listener_resubscribes_and_forgets_l1(workers, monkeypatch):
+    this, _ = workers
+    monkeypatch.setattr(user_cache, "_RESUBSCRIBE_DELAY_SECONDS", 0.01)
+    attempts = 0
+    pubsub = this.pubsub
+
+    def flaky_pubsub():
+        nonlocal attempts
+        attempts += 1
+        if attempts == 1:
+            raise ConnectionError("redis is down")
+        return pubsub()
+    monkeypatch.setattr(this, "pubsub", flaky_pubsub)
+    user_cache._local.set(7, {"id": 7})
+
+    listener = asyncio.create_task(user_cache.run_invalidation_listener(this))
+    try:
+        # сообщения за время обрыва потеряны — после переподписки L1 очищен целиком
+        await _until(lambda: user_cache._local.get(7) is None)
+        assert attempts == 2
+    finally:
+        listener.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await listener